@@ -0,0 +1,196 @@
+"""
+Analytics rollups for detection history.
+Hourly aggregates per detection type and label, maintained as detections are inserted.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+BUCKET_SECONDS = 3600
+# Fixed-width confidence histogram; doubles as the quantile sketch (error below one bin width)
+HISTOGRAM_BINS = 20
+HISTOGRAM_COLUMNS = [f"h{i:02d}" for i in range(HISTOGRAM_BINS)]
+
+_COLUMNS = [
+    "detection_count", "confidence_sum", "confidence_sq_sum", "confidence_min", "confidence_max",
+] + HISTOGRAM_COLUMNS
+
+ROLLUP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS detection_rollups (
+        detection_type VARCHAR(20) NOT NULL,
+        prediction_label VARCHAR(20) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        detection_count INT NOT NULL,
+        confidence_sum DOUBLE NOT NULL,
+        confidence_sq_sum DOUBLE NOT NULL,
+        confidence_min FLOAT NOT NULL,
+        confidence_max FLOAT NOT NULL,
+        {histogram},
+        PRIMARY KEY (detection_type, prediction_label, bucket_start)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+""".format(histogram=",\n        ".join(f"{c} INT NOT NULL DEFAULT 0" for c in HISTOGRAM_COLUMNS))
+
+_UPDATES = [
+    "detection_count = detection_count + VALUES(detection_count)",
+    "confidence_sum = confidence_sum + VALUES(confidence_sum)",
+    "confidence_sq_sum = confidence_sq_sum + VALUES(confidence_sq_sum)",
+    "confidence_min = LEAST(confidence_min, VALUES(confidence_min))",
+    "confidence_max = GREATEST(confidence_max, VALUES(confidence_max))",
+] + [f"{c} = {c} + VALUES({c})" for c in HISTOGRAM_COLUMNS]
+
+# Buckets are hours of the database clock, the clock created_at is stamped with; sessions
+# run in UTC (see FakeDetectionDB), so bucket_start is a UTC time whatever the server's zone
+ROLLUP_UPSERT_SQL = """
+    INSERT INTO detection_rollups (detection_type, prediction_label, bucket_start, {columns})
+    VALUES (%s, %s, FROM_UNIXTIME(UNIX_TIMESTAMP() DIV {bucket} * {bucket}), {placeholders})
+    ON DUPLICATE KEY UPDATE {updates}
+""".format(
+    columns=", ".join(_COLUMNS),
+    bucket=BUCKET_SECONDS,
+    placeholders=", ".join(["%s"] * len(_COLUMNS)),
+    updates=", ".join(_UPDATES),
+)
+
+ROLLUP_SELECT_COLUMNS = "bucket_start, " + ", ".join(_COLUMNS)
+
+# Buckets of the last %s hours, the current one included, by the same database clock
+ROLLUP_RECENT_CONDITION = "bucket_start >= FROM_UNIXTIME((UNIX_TIMESTAMP() DIV {bucket} + 1 - %s) * {bucket})".format(
+    bucket=BUCKET_SECONDS
+)
+
+# Taken first by a rebuild: shared locks on every detection (and the gap after the last) make
+# new inserts wait, and lock the two tables in the same order as an insert does
+ROLLUP_REBUILD_LOCK_SQL = "SELECT COUNT(*) FROM detections LOCK IN SHARE MODE"
+
+# Recomputes every bucket from the detections table (for history logged before rollups existed)
+ROLLUP_REBUILD_SQL = """
+    INSERT INTO detection_rollups (detection_type, prediction_label, bucket_start, {columns})
+    SELECT detection_type, prediction_label,
+           FROM_UNIXTIME(UNIX_TIMESTAMP(created_at) DIV {bucket} * {bucket}) AS bucket,
+           COUNT(*), SUM(detection_percent), SUM(detection_percent * detection_percent),
+           MIN(detection_percent), MAX(detection_percent),
+           {histogram}
+    FROM detections
+    GROUP BY detection_type, prediction_label, bucket
+""".format(
+    columns=", ".join(_COLUMNS),
+    bucket=BUCKET_SECONDS,
+    histogram=", ".join(
+        f"SUM(LEAST(GREATEST(FLOOR(detection_percent * {HISTOGRAM_BINS}), 0), {HISTOGRAM_BINS - 1}) = {i})"
+        for i in range(HISTOGRAM_BINS)
+    ),
+)
+
+
+def histogram_bin(confidence: float) -> int:
+    """Histogram bin of a confidence in [0, 1]."""
+    return min(max(int(confidence * HISTOGRAM_BINS), 0), HISTOGRAM_BINS - 1)
+
+
+class RollupBucket:
+    """Count, sums, extremes and histogram of the confidences in one bucket."""
+
+    __slots__ = ("count", "total", "total_sq", "minimum", "maximum", "histogram")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.histogram = [0] * HISTOGRAM_BINS
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "RollupBucket":
+        """Build from the values of ROLLUP_SELECT_COLUMNS after bucket_start."""
+        bucket = cls()
+        bucket.count = int(row[0])
+        bucket.total, bucket.total_sq = float(row[1]), float(row[2])
+        bucket.minimum, bucket.maximum = float(row[3]), float(row[4])
+        bucket.histogram = [int(n) for n in row[5:5 + HISTOGRAM_BINS]]
+        return bucket
+
+    def add(self, confidence: float) -> None:
+        self.count += 1
+        self.total += confidence
+        self.total_sq += confidence * confidence
+        self.minimum = min(self.minimum, confidence)
+        self.maximum = max(self.maximum, confidence)
+        self.histogram[histogram_bin(confidence)] += 1
+
+    def merge(self, other: "RollupBucket") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def values(self) -> list:
+        """Column values in ROLLUP_UPSERT_SQL order."""
+        return [self.count, self.total, self.total_sq, self.minimum, self.maximum] + self.histogram
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        return math.sqrt(max(self.total_sq / self.count - self.mean ** 2, 0.0))
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, interpolated inside the histogram bin that holds it."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            if n and seen + n >= target:
+                value = (i + (target - seen) / n) / HISTOGRAM_BINS
+                return min(max(value, self.minimum), self.maximum)
+            seen += n
+        return self.maximum
+
+
+def summarize(rows: Iterable[Tuple[str, str, float, str]]) -> Dict[Tuple[str, str], RollupBucket]:
+    """Aggregate (input_text, prediction_label, confidence, detection_type) rows per type and label."""
+    buckets: Dict[Tuple[str, str], RollupBucket] = {}
+    for _, prediction_label, confidence, detection_type in rows:
+        key = (detection_type, prediction_label)
+        if key not in buckets:
+            buckets[key] = RollupBucket()
+        buckets[key].add(confidence)
+    return buckets
+
+
+def upsert_params(rows: Iterable[Tuple[str, str, float, str]]) -> List[tuple]:
+    """
+    ROLLUP_UPSERT_SQL parameters for a batch of inserted detection rows.
+
+    Sorted by key, so concurrent writers lock the rollup rows in the same order.
+    """
+    return [key + tuple(bucket.values()) for key, bucket in sorted(summarize(rows).items())]
+
+
+def by_day(buckets: List[Tuple[datetime, RollupBucket]]) -> List[Tuple[datetime, RollupBucket]]:
+    """Merge time-ordered hourly buckets into daily ones."""
+    merged: List[Tuple[datetime, RollupBucket]] = []
+    for start, bucket in buckets:
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        if not merged or merged[-1][0] != day:
+            merged.append((day, RollupBucket()))
+        merged[-1][1].merge(bucket)
+    return merged
+
+
+def total(buckets: Iterable[Tuple[datetime, RollupBucket]]) -> RollupBucket:
+    """All buckets merged into one."""
+    result = RollupBucket()
+    for _, bucket in buckets:
+        result.merge(bucket)
+    return result
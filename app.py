@@ -3,18 +3,22 @@ Flask Web Application for Fake Message and Link Detection
 Modern web interface for the AI detection system
 """
 
-import base64
-import io
+import atexit
+import json
+import time
 from functools import wraps
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from fake_detector import FakeDetector
-from fake_detection_db import FakeDetectionDB
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for, stream_with_context
+import metrics
+from analytics_rollup import by_day as rollup_by_day, total as rollup_total
+from background_job import PeriodicJob
+from chart_renderer import ChartQueueFull, ChartRenderPool, ChartRenderTimeout, chart_data
+from detector_registry import get_detector
+from fake_detector import models_available
+from micro_batcher import MicroBatcher
+from url_rules import RULE_MODES
+from fake_detection_db import FakeDetectionDB, detection_row
+from verdict_cache import VerdictCache
 import os
 
 app = Flask(__name__)
@@ -28,8 +32,69 @@ USERS = {
 }
 
 # Initialize detector and database
-detector = FakeDetector()
-db = FakeDetectionDB()
+# Repeated links/messages (e.g. one campaign sent thousands of times) are served from the verdict cache
+verdict_cache = VerdictCache(
+    max_size=int(os.getenv("VERDICT_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("VERDICT_CACHE_TTL", "600")),
+)
+url_rules_mode = os.getenv("URL_RULES", "audit")
+if url_rules_mode not in RULE_MODES:
+    raise ValueError(f"URL_RULES must be one of {', '.join(RULE_MODES)}")
+# Options of the app's detector; the registry keeps one detector per set of options, so
+# helpers and tools asking for a default detector in this process are not affected
+detector_options = dict(
+    # The flat tree engine scores from memory-mapped arrays without importing scikit-learn
+    use_flat_engine=os.getenv("USE_FLAT_ENGINE", "1") != "0",
+    verdict_cache=verdict_cache,
+    # Clear-cut URLs (malformed, known legitimate domains, IP hosts with login paths, shorteners)
+    # can skip the ensemble; the default audit mode only measures agreement with the model
+    url_rules=url_rules_mode,
+    # Optional two-stage cascade: a few shallow trees answer confident inputs, the rest escalate
+    use_cascade=os.getenv("USE_CASCADE", "0") == "1",
+)
+detector = get_detector(**detector_options)
+# Retrained models are picked up without a restart: the detector polls the bundle versions
+# every MODEL_RELOAD_INTERVAL seconds (0 disables) and swaps new models in off the request path;
+# started per process by the first detection or warm_up()
+model_reloader = PeriodicJob(
+    "model-reload", detector.reload_models, interval=float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+)
+# Concurrent /detect requests are coalesced into one vectorized predict_proba call;
+# a request waits at most DETECT_BATCH_WAIT_MS for others to join its batch
+url_batcher = MicroBatcher(
+    detector.detect_urls,
+    max_batch_size=int(os.getenv("DETECT_BATCH_SIZE", "32")),
+    max_wait=float(os.getenv("DETECT_BATCH_WAIT_MS", "2")) / 1000,
+    name="url-batcher",
+    timeout=float(os.getenv("DETECT_BATCH_TIMEOUT", "30")),
+)
+message_batcher = MicroBatcher(
+    detector.detect_messages,
+    max_batch_size=int(os.getenv("DETECT_BATCH_SIZE", "32")),
+    max_wait=float(os.getenv("DETECT_BATCH_WAIT_MS", "2")) / 1000,
+    name="message-batcher",
+    timeout=float(os.getenv("DETECT_BATCH_TIMEOUT", "30")),
+)
+# Detection logging is write-behind by default, so MySQL latency stays out of the response path
+db = FakeDetectionDB(
+    write_behind=os.getenv("DB_WRITE_BEHIND", "1") != "0",
+    queue_size=int(os.getenv("DB_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("DB_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("DB_FLUSH_INTERVAL", "0.5")),
+)
+atexit.register(db.close)
+# Charts render in separate worker processes so they never hold the GIL of request threads
+chart_renderer = ChartRenderPool(
+    workers=int(os.getenv("CHART_WORKERS", "2")),
+    max_pending=int(os.getenv("CHART_QUEUE_SIZE", "8")),
+    timeout=float(os.getenv("CHART_RENDER_TIMEOUT", "10")),
+)
+atexit.register(chart_renderer.shutdown)
+# Rendered analytics charts; keys include a data version, so new detections invalidate them
+chart_cache = VerdictCache(
+    max_size=int(os.getenv("CHART_CACHE_SIZE", "128")),
+    ttl_seconds=float(os.getenv("CHART_CACHE_TTL", "3600")),
+)
 
 FILTER_MAP = {
     "fake_link": ("link", "FAKE"),
@@ -40,6 +105,32 @@ FILTER_MAP = {
 
 CHART_TYPES = {"bar", "histogram", "scatter", "box", "line"}
 
+DEFAULT_ANALYTICS_DAYS = 7
+MAX_ANALYTICS_DAYS = 365
+
+# /detect/batch: ?type= value -> (detector type, detection_type column)
+BATCH_TYPES = {
+    "url": ("url", "link"),
+    "link": ("url", "link"),
+    "message": ("message", "message"),
+    "msg": ("message", "message"),
+}
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+# Items scored (and logged with one bulk insert) per step of the response stream
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+
+# Request counters and latency; stage timings live in metrics.STAGE_SECONDS and metrics.DB_SECONDS.
+# METRICS=0 turns all recording off (the timers become shared no-ops)
+REQUESTS = metrics.REGISTRY.register(metrics.Counter(
+    "fake_detection_http_requests_total", "HTTP requests by endpoint and status code", ("endpoint", "status")
+))
+REQUEST_SECONDS = metrics.REGISTRY.register(metrics.Histogram(
+    "fake_detection_http_request_seconds", "Time until the response is returned, by endpoint", ("endpoint",)
+))
+# Endpoints answering with a Server-Timing header (/detect/batch streams its body after the headers)
+SERVER_TIMING_ENDPOINTS = {"detect_url", "detect_message"}
+
 
 def login_required(f):
     """Decorator to require login for routes"""
@@ -51,41 +142,6 @@ def login_required(f):
     return decorated_function
 
 
-def _generate_chart_image(df: pd.DataFrame, chart_type: str, title: str) -> str:
-    plt.clf()
-    sns.set_theme(style="darkgrid")
-    fig, ax = plt.subplots(figsize=(8, 4))
-
-    if chart_type == "bar":
-        sns.barplot(data=df, x="index", y="percent", ax=ax, color="#6366f1")
-        ax.set_xlabel("Detection #")
-        ax.set_ylabel("Confidence (%)")
-    elif chart_type == "histogram":
-        sns.histplot(x=df["percent"], bins=10, ax=ax, color="#8b5cf6")
-        ax.set_xlabel("Confidence (%)")
-        ax.set_ylabel("Frequency")
-    elif chart_type == "scatter":
-        ax.scatter(df["index"], df["percent"], color="#10b981")
-        ax.set_xlabel("Detection #")
-        ax.set_ylabel("Confidence (%)")
-    elif chart_type == "box":
-        sns.boxplot(y=df["percent"], ax=ax, color="#fbbf24")
-        ax.set_ylabel("Confidence (%)")
-    elif chart_type == "line":
-        ax.plot(df["index"], df["percent"], color="#3b82f6", marker="o")
-        ax.set_xlabel("Detection #")
-        ax.set_ylabel("Confidence (%)")
-
-    ax.set_title(title)
-    ax.set_ylim(0, 100)
-    plt.tight_layout()
-
-    buffer = io.BytesIO()
-    fig.savefig(buffer, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode("utf-8")
-
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
@@ -142,7 +198,8 @@ def detect_url():
                 'error': 'URL is required'
             }), 400
         
-        result = detector.detect_url(url)
+        model_reloader.start()
+        result = url_batcher.submit(url)
         prediction = "FAKE" if result["is_fake"] else "LEGITIMATE"
         db.insert_detection(url, prediction, float(result.get("confidence", 0.0)), detection_type="link")
         
@@ -173,7 +230,8 @@ def detect_message():
                 'error': 'Message is required'
             }), 400
         
-        result = detector.detect_message(message)
+        model_reloader.start()
+        result = message_batcher.submit(message)
         prediction = "FAKE" if result["is_fake"] else "LEGITIMATE"
         db.insert_detection(message, prediction, float(result.get("confidence", 0.0)), detection_type="message")
         
@@ -190,6 +248,270 @@ def detect_message():
             'error': str(e)
         }), 500
 
+@app.route('/detect/batch', methods=['POST'])
+@login_required
+def detect_batch():
+    """
+    API endpoint for scoring many URLs or messages in one request
+    
+    The body is a JSON array or NDJSON (one item per line); items are strings
+    or objects with a 'url' / 'message' field. Results stream back as NDJSON,
+    one line per item, in input order.
+    """
+    kind = request.args.get('type', 'url').lower()
+    if kind not in BATCH_TYPES:
+        return jsonify({'success': False, 'error': "type must be 'url' or 'message'"}), 400
+    detector_type, detection_type = BATCH_TYPES[kind]
+    
+    too_large = jsonify({
+        'success': False,
+        'error': f'Batch bodies are limited to {BATCH_MAX_BYTES} bytes and {BATCH_MAX_ITEMS} items'
+    }), 413
+    if request.content_length is not None and request.content_length > BATCH_MAX_BYTES:
+        return too_large
+    body = request.stream.read(BATCH_MAX_BYTES + 1)
+    if len(body) > BATCH_MAX_BYTES:
+        return too_large
+    
+    try:
+        items = _parse_batch_body(body)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid batch body: {e}'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return too_large
+    
+    model_reloader.start()
+    return Response(
+        stream_with_context(_stream_batch(items, detector_type, detection_type)),
+        mimetype='application/x-ndjson'
+    )
+
+
+def _parse_batch_body(body):
+    """Items of a JSON array or NDJSON body"""
+    text = body.decode('utf-8')
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    items = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if line.strip():
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                raise ValueError(f'line {line_number}: {e}')
+    return items
+
+
+def _stream_batch(items, detector_type, detection_type):
+    """Score items chunk by chunk, logging each chunk with one insert and then yielding its NDJSON lines"""
+    score = detector.detect_urls if detector_type == 'url' else detector.detect_messages
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk = items[start:start + BATCH_CHUNK_SIZE]
+        lines = []
+        texts = []
+        for index, item in enumerate(chunk, start):
+            if isinstance(item, dict):
+                item = item.get(detector_type)
+            if isinstance(item, str) and item.strip():
+                texts.append((index, item.strip()))
+            else:
+                lines.append((index, {
+                    'index': index,
+                    'error': f'Item must be a non-empty string or have a "{detector_type}" field'
+                }))
+        
+        rows = []
+        for (index, text), result in zip(texts, score([text for _, text in texts])):
+            prediction = "FAKE" if result["is_fake"] else "LEGITIMATE"
+            rows.append(detection_row(text, prediction, result.get("confidence", 0.0), detection_type))
+            lines.append((index, {
+                'index': index,
+                'is_fake': result['is_fake'],
+                'confidence': round(result['confidence'] * 100, 2),
+                'reasons': result['reasons'],
+                detector_type: text
+            }))
+        lines.sort(key=lambda line: line[0])
+        body = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for _, record in lines)
+        
+        # Queue the chunk for logging before yielding it, so a client that disconnects mid-stream
+        # still leaves every scored chunk logged
+        try:
+            db.insert_detections(rows)
+        except Exception as e:
+            # Scoring goes on; the client learns which items were not logged
+            body += json.dumps({'error': f'Detections {start}-{start + len(chunk) - 1} could not be logged: {e}'}) + '\n'
+        yield body
+
+@app.route('/detect/stats')
+@login_required
+def detect_stats():
+    """Micro-batching statistics (batch size distribution, queue wait), URL rule and cascade counters"""
+    return jsonify({
+        'url': url_batcher.stats(),
+        'message': message_batcher.stats(),
+        'url_rules': detector.url_rules.stats() if detector.url_rules is not None else None,
+        'cascade': detector.cascade_stats()
+    })
+
+
+# Synthetic inputs scored by warm_up() before a worker takes traffic
+WARMUP_URL = "https://www.example.com/"
+WARMUP_MESSAGE = "Hi, just checking that the service is up."
+
+# Set by warm_up() in each process; reported by /healthz and /readyz
+warmup_state = {"pid": None, "ms": None}
+
+
+def warm_up():
+    """
+    Run one synthetic URL and message detection through this process's request path
+    
+    Loads any model that is not loaded yet and starts the micro-batcher threads,
+    so the first real request pays for neither. Nothing is written to the database.
+    
+    Returns:
+        dict: Warm-up latency in milliseconds per detector type
+    """
+    timings = {}
+    for detector_type, batcher, sample in (("url", url_batcher, WARMUP_URL),
+                                           ("message", message_batcher, WARMUP_MESSAGE)):
+        start = time.perf_counter()
+        batcher.submit(sample)
+        timings[detector_type] = round((time.perf_counter() - start) * 1000, 2)
+    warmup_state.update(pid=os.getpid(), ms=timings)
+    model_reloader.start()
+    return timings
+
+
+def _health():
+    models = detector.model_state()
+    warmed = warmup_state["pid"] == os.getpid()
+    return {
+        "pid": os.getpid(),
+        "models": models,
+        "warmed_up": warmed,
+        "warmup_ms": warmup_state["ms"] if warmed else None,
+        "ready": warmed and all(state["loaded"] for state in models.values()),
+        "model_reload": {
+            "interval": model_reloader.interval,
+            "checks": model_reloader.runs,
+            "errors": model_reloader.errors,
+            "last_error": model_reloader.last_error,
+        },
+    }
+
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the worker answers; includes model load state and warm-up latency"""
+    return jsonify({"status": "ok", **_health()})
+
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once both models are loaded and this worker is warmed up, else 503"""
+    health = _health()
+    return jsonify({"status": "ready" if health["ready"] else "not ready", **health}), 200 if health["ready"] else 503
+
+
+@app.before_request
+def _start_request_timing():
+    if metrics.enabled():
+        g.request_started = time.perf_counter()
+        metrics.begin_timing()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    timings = metrics.end_timing()
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or "unknown"
+    seconds = time.perf_counter() - started
+    REQUESTS.inc((endpoint, str(response.status_code)))
+    REQUEST_SECONDS.observe(seconds, (endpoint,))
+    if endpoint in SERVER_TIMING_ENDPOINTS:
+        response.headers["Server-Timing"] = metrics.server_timing_header(dict(timings, total=seconds))
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics (404 when METRICS=0); under serve.py, totals across all worker processes"""
+    if not metrics.enabled():
+        return jsonify({"success": False, "error": "Metrics are disabled."}), 404
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def _stats_metrics():
+    """Counters kept by the cache, pools, batchers, cascade and URL rules, as metric families"""
+    families = []
+
+    def add(name, kind, help, samples):
+        families.append((f"fake_detection_{name}", kind, help, samples))
+
+    cache = verdict_cache.stats()
+    add("verdict_cache_hits_total", "counter", "Verdict cache hits", [({}, cache["hits"])])
+    add("verdict_cache_misses_total", "counter", "Verdict cache misses", [({}, cache["misses"])])
+    add("verdict_cache_evictions_total", "counter", "Verdicts evicted to make room", [({}, cache["evictions"])])
+    add("verdict_cache_size", "gauge", "Cached verdicts", [({}, cache["size"])])
+
+    pools = db.pool_stats()
+    for key, name, kind, help in (
+            ("open", "db_pool_open", "gauge", "Open connections"),
+            ("in_use", "db_pool_in_use", "gauge", "Connections checked out"),
+            ("acquisitions", "db_pool_acquisitions_total", "counter", "Connections handed out"),
+            ("waits", "db_pool_waits_total", "counter", "Acquisitions that had to wait for a connection"),
+            ("wait_seconds", "db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection"),
+            ("timeouts", "db_pool_timeouts_total", "counter", "Acquisitions that timed out")):
+        add(name, kind, f"{help} per pool", [({"pool": pool}, stats[key]) for pool, stats in pools.items()])
+
+    writer = db.writer_stats()
+    if writer is not None:
+        add("db_queue_depth", "gauge", "Detections waiting to be written", [({}, writer["queue_depth"])])
+        for key in ("written", "dropped", "failed"):
+            add(f"db_rows_{key}_total", "counter", f"Detection rows {key} by the write-behind queue",
+                [({}, writer[key])])
+
+    batchers = {"url": url_batcher.stats(), "message": message_batcher.stats()}
+    add("batches_total", "counter", "Micro-batches scored",
+        [({"detector": t}, stats["batches"]) for t, stats in batchers.items()])
+    add("batch_items_total", "counter", "Items scored in micro-batches",
+        [({"detector": t}, stats["items"]) for t, stats in batchers.items()])
+    add("batch_queue_depth", "gauge", "Items waiting for a micro-batch",
+        [({"detector": t}, stats["queue_depth"]) for t, stats in batchers.items()])
+    add("batch_timeouts_total", "counter", "Submitted items that got no result within the timeout",
+        [({"detector": t}, stats["timeouts"]) for t, stats in batchers.items()])
+
+    cascade = {t: stats for t, stats in detector.cascade_stats().items() if stats is not None}
+    add("cascade_inputs_total", "counter", "Inputs answered by the cascade's first stage or escalated",
+        [({"detector": t, "outcome": outcome}, stats[outcome])
+         for t, stats in cascade.items() for outcome in ("answered", "escalated")])
+
+    if detector.url_rules is not None:
+        rules = detector.url_rules.stats()["rules"]
+        add("url_rule_fired_total", "counter", "URLs decided by each rule",
+            [({"rule": rule}, counts["fired"]) for rule, counts in rules.items()])
+        add("url_rule_agreed_total", "counter", "Audited rule verdicts that matched the model",
+            [({"rule": rule}, counts["agreed"]) for rule, counts in rules.items()])
+
+    models = detector.model_state()
+    add("model_loaded", "gauge", "1 once the model is loaded",
+        [({"detector": t}, state["loaded"]) for t, state in models.items()])
+    add("model_generation", "gauge", "Model snapshots installed so far",
+        [({"detector": t}, state["generation"]) for t, state in models.items()])
+    add("model_reload_errors_total", "counter", "Failed model reload checks", [({}, model_reloader.errors)])
+
+    charts = chart_renderer.stats()
+    for key in ("rendered", "rejected", "timeouts"):
+        add(f"charts_{key}_total", "counter", f"Analytics charts {key}", [({}, charts[key])])
+    return families
+
+
+metrics.REGISTRY.add_collector(_stats_metrics)
+
 
 @app.route('/analytics', methods=['POST'])
 @login_required
@@ -204,25 +526,94 @@ def analytics():
     if chart_type not in CHART_TYPES:
         return jsonify({"success": False, "error": "Invalid chart type."}), 400
 
-    detection_type, prediction_label = FILTER_MAP[filter_key]
-    rows = db.fetch_by_filter(detection_type=detection_type, prediction_label=prediction_label, limit=200)
-
-    if not rows:
+    try:
+        days = int(data.get("days", DEFAULT_ANALYTICS_DAYS))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid period."}), 400
+    days = min(max(days, 1), MAX_ANALYTICS_DAYS)
+
+    chart_prerender.start()
+    buckets = _fetch_analytics_buckets(filter_key, days)
+    if not buckets:
         return jsonify({"success": False, "error": "No data available for this selection."}), 404
 
-    df = pd.DataFrame(rows)
-    df["percent"] = df["detection_percent"] * 100
-    df["index"] = range(1, len(df) + 1)
+    try:
+        chart, cached = _analytics_chart(filter_key, chart_type, days, buckets)
+    except ChartQueueFull:
+        return jsonify({"success": False, "error": "Analytics is busy, please try again shortly."}), 503
+    except ChartRenderTimeout:
+        return jsonify({"success": False, "error": "Generating the chart took too long."}), 504
+    response = jsonify({"success": True, **chart})
+    response.headers["X-Chart-Cache"] = "hit" if cached else "miss"
+    response.headers["X-Chart-Render-Ms"] = f"{chart['render_ms']:.1f}"
+    response.headers["X-Chart-Bytes"] = str(chart["image_bytes"])
+    return response
+
+
+def _fetch_analytics_buckets(filter_key, days):
+    """Rollup buckets for a dataset and period (hourly for one day, daily otherwise)"""
+    # Rollups keep this O(buckets) no matter how many detections were logged; the window
+    # is whole hours of the database clock that stamps the buckets, not this host's
+    detection_type, prediction_label = FILTER_MAP[filter_key]
+    buckets = db.fetch_rollups(detection_type, prediction_label, last_hours=days * 24)
+    if days > 1:
+        buckets = rollup_by_day(buckets)
+    return buckets
 
-    title = f"{prediction_label.title()} {detection_type.title()}s ({chart_type.title()} Chart)"
-    image_data = _generate_chart_image(df, chart_type, title)
 
-    return jsonify({"success": True, "image": image_data})
+def _analytics_chart(filter_key, chart_type, days, buckets):
+    """
+    Rendered chart payload for /analytics, served from the chart cache when the data is unchanged
+    
+    Returns:
+        tuple: (payload dict, whether it came from the cache)
+    """
+    summary = rollup_total(buckets)
+    # Any newly logged detection changes the totals, so stale charts are never served
+    data_version = (buckets[0][0], buckets[-1][0], summary.count, summary.total)
+    key = (filter_key, chart_type, days, data_version)
+    chart = chart_cache.get(key)
+    if chart is not None:
+        return chart, True
+
+    detection_type, prediction_label = FILTER_MAP[filter_key]
+    period = "Last 24 Hours" if days == 1 else f"Last {days} Days"
+    title = f"{prediction_label.title()} {detection_type.title()}s ({chart_type.title()} Chart, {period})"
+    start = time.perf_counter()
+    image_data = chart_renderer.render(chart_data(buckets), chart_type, title)
+    chart = {
+        "image": image_data,
+        "summary": {
+            "count": summary.count,
+            "mean": round(summary.mean * 100, 2),
+            "median": round(summary.quantile(0.5) * 100, 2),
+            "p90": round(summary.quantile(0.9) * 100, 2),
+        },
+        "render_ms": round((time.perf_counter() - start) * 1000, 1),
+        "image_bytes": len(image_data),
+    }
+    chart_cache.put(key, chart)
+    return chart, False
+
+
+def _prerender_charts():
+    """Render the default-period charts of every dataset whose data changed since the last run"""
+    for filter_key in FILTER_MAP:
+        buckets = _fetch_analytics_buckets(filter_key, DEFAULT_ANALYTICS_DAYS)
+        if buckets:
+            for chart_type in sorted(CHART_TYPES):
+                _analytics_chart(filter_key, chart_type, DEFAULT_ANALYTICS_DAYS, buckets)
+
+
+# Keeps the common dashboard charts warm; started by the first analytics request of each process
+chart_prerender = PeriodicJob(
+    "chart-prerender", _prerender_charts, interval=float(os.getenv("CHART_PRERENDER_INTERVAL", "60"))
+)
 
 
 if __name__ == '__main__':
     # Check if models exist
-    if not os.path.exists('models/url_model.pkl'):
+    if not models_available():
         print("Warning: Models not found. Please run 'python train_models.py' first.")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
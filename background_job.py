@@ -0,0 +1,64 @@
+"""
+Background Job
+Runs a function periodically in a daemon thread of the current process
+"""
+
+import os
+import threading
+
+
+class PeriodicJob:
+    """
+    Call a function every ``interval`` seconds from a daemon thread
+
+    start() is idempotent and per process: calling it in a forked worker
+    starts a fresh thread there, so a job can be created at import time
+    by an app that a pre-fork server loads before forking.
+    """
+
+    def __init__(self, name, func, interval):
+        """
+        Args:
+            name: Thread name
+            func: Callable run on every tick; exceptions are counted, not raised
+            interval: Seconds between the end of one run and the start of the next;
+                      0 or less disables the job
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.runs = 0
+        self.errors = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the thread in this process (no-op if it is already running)"""
+        with self._lock:
+            if self.interval <= 0 or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            thread = threading.Thread(target=self._run, args=(self._stop,), name=self.name, daemon=True)
+            thread.start()
+
+    def stop(self):
+        """Ask the thread to exit after its current run"""
+        self._stop.set()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            self.run_once()
+            stop.wait(self.interval)
+
+    def run_once(self):
+        """Run the function now, in the calling thread"""
+        try:
+            self.func()
+        except Exception as exc:  # a failed run (e.g. database down) must not kill the job
+            self.errors += 1
+            self.last_error = repr(exc)
+        finally:
+            self.runs += 1
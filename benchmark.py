@@ -0,0 +1,293 @@
+"""
+Benchmark Script
+Measures throughput of the fake detection system
+Usage: python benchmark.py batch [--count N] [--batch-sizes 1,32,256]
+       python benchmark.py features [--lengths 100,1000,10000]
+       python benchmark.py engine [--batch-sizes 1,10,100] [--repeat N]
+       python benchmark.py parallel [--batch-sizes 1,64,1024,8192] [--workers 2,4] [--sklearn] [--save]
+"""
+
+import argparse
+import copy
+import itertools
+import math
+import os
+import time
+
+import numpy as np
+
+from fake_detector import FakeDetector
+from message_feature_extractor import MessageFeatureExtractor
+from parallelism import POLICY_FILE, ParallelismPolicy, calibrate, sklearn_predict_proba
+from text_scanner import SPECIAL_CHARS, scan_chars
+
+SAMPLE_URLS = [
+    'https://www.google.com/search?q=python',
+    'https://github.com/user/repo',
+    'http://bit.ly/verify-account-now',
+    'https://verify-payment.tk/urgent',
+    'http://192.168.1.100/login',
+    'https://www.amazon.com/product/123',
+    'https://update-account.ml/secure',
+    'https://blog.example.org/2024/01/15/post-name',
+]
+
+SAMPLE_MESSAGES = [
+    'Hello, how are you doing today?',
+    'URGENT! Your account has been SUSPENDED! Click here NOW to verify: http://bit.ly/verify-now',
+    'Thank you for your email. I will get back to you soon.',
+    'CONGRATULATIONS! You won $1,000,000! Claim your prize NOW!',
+    'The meeting is scheduled for tomorrow at 3 PM.',
+    'Your payment has EXPIRED! Update immediately or your account will be LOCKED!',
+]
+
+
+def sample_inputs(samples, count):
+    """Repeat the sample inputs until there are ``count`` of them"""
+    return list(itertools.islice(itertools.cycle(samples), count))
+
+
+def items_per_second(func, items):
+    """Run ``func`` over ``items`` and return the achieved items/sec"""
+    start = time.perf_counter()
+    func(items)
+    elapsed = time.perf_counter() - start
+    return len(items) / elapsed if elapsed > 0 else float('inf')
+
+
+def microseconds_per_call(func, arg, repeat):
+    """Average wall time of ``func(arg)`` in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def multi_pass_char_stats(text):
+    """Reference: one generator pass per character class plus count()-based entropy"""
+    uppercase = sum(1 for c in text if c.isupper())
+    lowercase = sum(1 for c in text if c.islower())
+    digits = sum(1 for c in text if c.isdigit())
+    special = sum(1 for c in text if c in SPECIAL_CHARS)
+    prob = [float(text.count(c)) / len(text) for c in dict.fromkeys(list(text))]
+    entropy = -sum([p * math.log2(p) for p in prob if p > 0])
+    return uppercase, lowercase, digits, special, entropy
+
+
+def bench_features(lengths):
+    """Per-input cost of character scanning and message feature extraction"""
+    extractor = MessageFeatureExtractor()
+    text = ' '.join(SAMPLE_MESSAGES)
+    print(f"\n{'length':>8}{'multi-pass us':>16}{'scan_chars us':>16}{'speedup':>10}{'extract_features us':>22}")
+    print("-" * 72)
+    for length in lengths:
+        message = (text * (length // len(text) + 1))[:length]
+        repeat = max(10, 200000 // length)
+        reference = microseconds_per_call(multi_pass_char_stats, message, repeat)
+        scanned = microseconds_per_call(scan_chars, message, repeat)
+        extract = microseconds_per_call(extractor.extract_features, message, repeat)
+        print(f"{length:>8}{reference:>16.1f}{scanned:>16.1f}{reference / scanned:>9.1f}x{extract:>22.1f}")
+
+
+def latency_percentiles(func, arg, repeat):
+    """p50 and p99 latency of ``func(arg)`` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def bench_engine(detector, batch_sizes, repeat):
+    """Compare scikit-learn predict_proba with the flat-array tree engine"""
+    suites = [
+        ('url', SAMPLE_URLS, lambda xs: detector.url_extractor.extract_matrix(xs)),
+        ('message', SAMPLE_MESSAGES,
+         lambda xs: np.array([list(detector.message_extractor.extract_features(x).values()) for x in xs])),
+    ]
+    for detector_type, samples, featurize in suites:
+        engine = detector.export_flat_engine(detector_type)
+        if engine is None:
+            print(f"\n{detector_type}: model not trained, skipping")
+            continue
+        if detector_type == 'url':
+            model, scaler = detector.url_model, detector.url_scaler
+        else:
+            model, scaler = detector.message_model, detector.message_scaler
+
+        def sklearn_proba(X):
+            return model.predict_proba(scaler.transform(X))
+
+        print(f"\n{detector_type.title()} model ({len(engine.arrays['roots'])} trees, depth {engine.depth})")
+        print(f"{'batch':>6}{'sklearn p50':>14}{'sklearn p99':>14}{'flat p50':>12}{'flat p99':>12}{'max |diff|':>14}")
+        print("-" * 72)
+        for batch_size in batch_sizes:
+            X = featurize(sample_inputs(samples, batch_size))
+            diff = np.abs(sklearn_proba(X) - engine.predict_proba(X)).max()
+            sk50, sk99 = latency_percentiles(sklearn_proba, X, repeat)
+            fl50, fl99 = latency_percentiles(engine.predict_proba, X, repeat)
+            print(f"{batch_size:>6}{sk50:>12.2f}ms{sk99:>12.2f}ms{fl50:>10.2f}ms{fl99:>10.2f}ms{diff:>14.2e}")
+
+
+def bench_parallel(detector, batch_sizes, worker_counts, use_sklearn, save):
+    """
+    Time serial against multi-threaded scoring per batch size and derive the inference policy
+
+    The widest worker count is what the pickled n_jobs=-1 forests used on every call.
+    """
+    suites = [
+        ('url', SAMPLE_URLS, lambda xs: detector.url_extractor.extract_matrix(xs)),
+        ('message', SAMPLE_MESSAGES,
+         lambda xs: np.array([list(detector.message_extractor.extract_features(x).values()) for x in xs])),
+    ]
+    policies = []
+    for detector_type, samples, featurize in suites:
+        if not detector._ensure_model(detector_type):
+            print(f"\n{detector_type}: model not trained, skipping")
+            continue
+        if use_sklearn:
+            model = getattr(detector, f'{detector_type}_model')
+            scaler = getattr(detector, f'{detector_type}_scaler')
+
+            def predict(X, n_jobs):
+                return sklearn_predict_proba(model, scaler, X, n_jobs)
+        else:
+            engine = detector.export_flat_engine(detector_type)
+
+            def predict(X, n_jobs):
+                return engine.predict_proba(X, n_jobs=n_jobs)
+
+        X = featurize(sample_inputs(samples, 256))
+        policy, timings = calibrate(predict, X, batch_sizes, worker_counts)
+        policies.append(policy)
+
+        print(f"\n{'URL' if detector_type == 'url' else 'Message'} model, {'scikit-learn' if use_sklearn else 'flat engine'} (ms per batch)")
+        print(f"{'batch':>8}{'serial':>10}" + ''.join(f"{f'{w} threads':>12}" for w in worker_counts))
+        print("-" * (18 + 12 * len(worker_counts)))
+        for timing in timings:
+            print(f"{timing['rows']:>8}{timing['serial_ms']:>10.2f}"
+                  + ''.join(f"{timing['parallel_ms'][w]:>12.2f}" for w in worker_counts))
+        if policy.max_workers > 1:
+            print(f"policy: serial below {policy.min_parallel_rows} rows, then {policy.max_workers} threads")
+        else:
+            print("policy: always serial (no thread count paid off)")
+
+    if not policies:
+        return
+    # One policy for both models: parallel only where it pays off for each of them
+    combined = ParallelismPolicy(
+        min_parallel_rows=max(policy.min_parallel_rows for policy in policies),
+        max_workers=min(policy.max_workers for policy in policies),
+    )
+    print(f"\nCombined policy: {combined.to_dict()}")
+    if save:
+        path = os.path.join(detector.model_dir, POLICY_FILE)
+        combined.save(path)
+        print(f"Saved to {path}")
+
+
+def original_detect(detector, detector_type):
+    """
+    Copy of the per-item detect_url/detect_message from before the batch API, as the baseline
+
+    Each input gets its own feature dict, scaler transform, predict and a second
+    predict_proba call on the scikit-learn ensemble. Loaded models have their
+    n_jobs cleared (parallelism.reset_n_jobs); the copy scored here gets back the
+    n_jobs=-1 its forests were trained and pickled with, as the original ran.
+    """
+    detector._ensure_model(detector_type)
+    if detector_type == 'url':
+        extractor, explain = detector.url_extractor, detector._explain_url_result
+        model, scaler = detector.url_model, detector.url_scaler
+    else:
+        extractor, explain = detector.message_extractor, detector._explain_message_result
+        model, scaler = detector.message_model, detector.message_scaler
+    model = copy.deepcopy(model)
+    for estimator in getattr(model, 'estimators_', ()):
+        if hasattr(estimator, 'n_jobs'):
+            estimator.n_jobs = -1
+
+    def detect(item):
+        features = extractor.extract_features(item)
+        feature_vector = np.array([list(features.values())])
+        feature_vector_scaled = scaler.transform(feature_vector)
+        prediction = int(model.predict(feature_vector_scaled)[0])
+        proba_array = model.predict_proba(feature_vector_scaled)[0]
+        confidence = float(proba_array[1] if prediction == 1 else proba_array[0])
+        return {
+            'is_fake': bool(prediction),
+            'confidence': confidence,
+            'reasons': explain(features, prediction, confidence),
+            detector_type: item
+        }
+    return detect
+
+
+def bench_batch(detector, count, batch_sizes):
+    """Compare the original per-item scoring with detect_url/detect_message and the batch API"""
+    suites = [
+        ('URL', 'url', SAMPLE_URLS, detector.detect_url, detector.detect_urls),
+        ('Message', 'message', SAMPLE_MESSAGES, detector.detect_message, detector.detect_messages),
+    ]
+    for name, detector_type, samples, detect_one, detect_many in suites:
+        items = sample_inputs(samples, count)
+        detect_many(items[:1])  # load the model before timing
+        original = original_detect(detector, detector_type)
+
+        print(f"\n{name} detection ({count} items)")
+        print("-" * 60)
+        per_item = items_per_second(lambda xs: [original(x) for x in xs], items)
+        print(f"{'original per-item':<20}{per_item:>12.1f} items/sec")
+        rate = items_per_second(lambda xs: [detect_one(x) for x in xs], items)
+        label = f"detect_{detector_type}"
+        print(f"{label:<20}{rate:>12.1f} items/sec  ({rate / per_item:.1f}x)")
+
+        for batch_size in batch_sizes:
+            def run(xs):
+                for i in range(0, len(xs), batch_size):
+                    detect_many(xs[i:i + batch_size])
+            rate = items_per_second(run, items)
+            label = f"batch={batch_size}"
+            print(f"{label:<20}{rate:>12.1f} items/sec  ({rate / per_item:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake detection benchmarks')
+    parser.add_argument('suite', choices=['batch', 'features', 'engine', 'parallel'], help='benchmark to run')
+    parser.add_argument('--count', type=int, default=1000, help='number of inputs to score')
+    parser.add_argument('--batch-sizes', help='comma-separated batch sizes '
+                        '(default: 1,32,256,1024 for batch, 1,10,100 for engine, '
+                        '1,64,1024,8192,32768 for parallel)')
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per batch size (engine)')
+    parser.add_argument('--lengths', default='100,1000,10000',
+                        help='comma-separated message lengths for the features benchmark')
+    parser.add_argument('--model-dir', default='models', help='directory holding trained models')
+    parser.add_argument('--workers', help='comma-separated thread counts to try (parallel; '
+                        'default: powers of two up to the CPU count, and the CPU count)')
+    parser.add_argument('--sklearn', action='store_true', help='calibrate the scikit-learn path (parallel)')
+    parser.add_argument('--save', action='store_true',
+                        help=f'write the calibrated policy to <model-dir>/{POLICY_FILE} (parallel)')
+    args = parser.parse_args()
+
+    if args.suite == 'batch':
+        batch_sizes = [int(size) for size in (args.batch_sizes or '1,32,256,1024').split(',') if size]
+        bench_batch(FakeDetector(model_dir=args.model_dir), args.count, batch_sizes)
+    elif args.suite == 'engine':
+        batch_sizes = [int(size) for size in (args.batch_sizes or '1,10,100').split(',') if size]
+        bench_engine(FakeDetector(model_dir=args.model_dir), batch_sizes, args.repeat)
+    elif args.suite == 'parallel':
+        batch_sizes = [int(size) for size in (args.batch_sizes or '1,64,1024,8192,32768').split(',') if size]
+        cpus = os.cpu_count() or 1
+        if args.workers:
+            worker_counts = [int(w) for w in args.workers.split(',') if w]
+        else:
+            worker_counts = sorted(({2 ** i for i in range(1, cpus.bit_length())} | {cpus}) - {1})
+        detector = FakeDetector(model_dir=args.model_dir, use_flat_engine=not args.sklearn)
+        bench_parallel(detector, batch_sizes, worker_counts, args.sklearn, args.save)
+    elif args.suite == 'features':
+        bench_features([int(length) for length in args.lengths.split(',') if length])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Model Cascade
+Small first-stage model that answers confident inputs before the full ensemble
+"""
+
+import time
+
+import numpy as np
+
+from parallelism import reset_n_jobs, sklearn_predict_proba
+
+# Largest drop in held-out accuracy the gate may cost compared with the full model
+DEFAULT_MAX_ACCURACY_LOSS = 0.005
+
+# Share of the training split held back (from both stages) to choose the gate on
+CALIBRATION_SIZE = 0.1
+
+# First stage: a handful of shallow trees, flattened like the full ensemble
+FAST_STAGE_TREES = 16
+FAST_STAGE_DEPTH = 6
+
+
+class FastStage:
+    """
+    First stage of a cascade
+
+    Inputs whose top class probability reaches the gate threshold are
+    answered here; the rest are escalated to the full ensemble.
+    """
+
+    def __init__(self, gate, model=None, scaler=None, engine=None):
+        """
+        Args:
+            gate: Gate report from choose_gate() (holds 'threshold')
+            model: Fitted first-stage VotingClassifier (used if there is no engine)
+            scaler: StandardScaler the model was trained behind
+            engine: FlatEnsemble of the model (including the scaler)
+        """
+        self.gate = gate
+        self.threshold = gate['threshold']
+        self.model = model
+        self.scaler = scaler
+        self.engine = engine
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        """First stage from a model bundle saved with its gate in the manifest metadata"""
+        gate = bundle.manifest['metadata']['gate']
+        if bundle.engine is not None:
+            return cls(gate, engine=bundle.engine)
+        return cls(gate, model=bundle.model, scaler=bundle.scaler)
+
+    def predict_proba(self, rows, n_jobs=1):
+        """
+        Returns:
+            tuple: (probabilities, classes)
+        """
+        if self.engine is not None:
+            return self.engine.predict_proba(rows, n_jobs=n_jobs), self.engine.classes_
+        return sklearn_predict_proba(self.model, self.scaler, rows, n_jobs), self.model.classes_
+
+
+def train_fast_stage(X_train_scaled, y_train):
+    """
+    Fit the first-stage model on the (scaled) training split of the full model
+
+    Returns:
+        VotingClassifier: One shallow Random Forest, so the tree engine can flatten it
+    """
+    from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+
+    forest = RandomForestClassifier(
+        n_estimators=FAST_STAGE_TREES,
+        max_depth=FAST_STAGE_DEPTH,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1
+    )
+    return reset_n_jobs(VotingClassifier(estimators=[('rf', forest)], voting='soft').fit(X_train_scaled, y_train))
+
+
+def choose_gate(labels, full_proba, fast_proba, classes, max_accuracy_loss=DEFAULT_MAX_ACCURACY_LOSS):
+    """
+    Pick the lowest confidence threshold whose cascade accuracy stays within
+    max_accuracy_loss of the full model on held-out data
+
+    The lowest such threshold answers the most inputs in the first stage.
+
+    Args:
+        labels: True labels of the held-out rows
+        full_proba: Full model probabilities for the rows
+        fast_proba: First-stage probabilities for the rows
+        classes: Class labels of both models' probability columns
+
+    Returns:
+        dict: threshold, escalation_rate, full_accuracy, cascade_accuracy, max_accuracy_loss
+    """
+    classes = np.asarray(classes)
+    labels = np.asarray(labels)
+    full_correct = classes[full_proba.argmax(axis=1)] == labels
+    fast_correct = classes[fast_proba.argmax(axis=1)] == labels
+    confidence = fast_proba.max(axis=1)
+    full_accuracy = float(full_correct.mean()) if len(labels) else 1.0
+
+    # Candidate thresholds: every distinct first-stage confidence, plus "never answer" (> 1)
+    best = {'threshold': 1.0 + 1e-9, 'escalation_rate': 1.0, 'cascade_accuracy': full_accuracy}
+    for threshold in np.unique(confidence)[::-1]:
+        answered = confidence >= threshold
+        accuracy = float(np.where(answered, fast_correct, full_correct).mean())
+        if full_accuracy - accuracy > max_accuracy_loss:
+            break
+        best = {
+            'threshold': float(threshold),
+            'escalation_rate': float(1 - answered.mean()),
+            'cascade_accuracy': accuracy,
+        }
+    return dict(best, full_accuracy=full_accuracy, max_accuracy_loss=max_accuracy_loss)
+
+
+def gate_accuracy(threshold, labels, full_proba, fast_proba, classes):
+    """
+    Escalation rate and accuracy of a chosen gate on other rows, e.g. the test split
+
+    Returns:
+        dict: escalation_rate, full_accuracy, cascade_accuracy
+    """
+    classes = np.asarray(classes)
+    labels = np.asarray(labels)
+    if not len(labels):
+        return {'escalation_rate': 0.0, 'full_accuracy': 1.0, 'cascade_accuracy': 1.0}
+    full_correct = classes[full_proba.argmax(axis=1)] == labels
+    fast_correct = classes[fast_proba.argmax(axis=1)] == labels
+    answered = fast_proba.max(axis=1) >= threshold
+    return {
+        'escalation_rate': float(1 - answered.mean()),
+        'full_accuracy': float(full_correct.mean()),
+        'cascade_accuracy': float(np.where(answered, fast_correct, full_correct).mean()),
+    }
+
+
+def measure_latency(gate, full_engine, fast_engine, rows, repeat=3):
+    """
+    Add per-row scoring times and the estimated latency saving to a gate report
+
+    Escalated inputs pay for both stages, so the cascade costs
+    fast + escalation_rate * full per input.
+    """
+    def per_row_ms(engine):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine.predict_proba(rows)
+            best = min(best, time.perf_counter() - start)
+        return best / max(len(rows), 1) * 1000
+
+    full_ms = per_row_ms(full_engine)
+    fast_ms = per_row_ms(fast_engine)
+    cascade_ms = fast_ms + gate['escalation_rate'] * full_ms
+    return dict(
+        gate,
+        full_ms_per_row=full_ms,
+        fast_ms_per_row=fast_ms,
+        cascade_ms_per_row=cascade_ms,
+        latency_saved=1 - cascade_ms / full_ms if full_ms else 0.0,
+    )
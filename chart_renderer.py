@@ -0,0 +1,238 @@
+"""
+Chart Renderer
+Renders analytics charts in a small pool of worker processes
+"""
+
+import base64
+import io
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from analytics_rollup import HISTOGRAM_BINS, total
+
+# Extra time the caller waits beyond the in-worker deadline before giving up on a render
+TIMEOUT_GRACE_SECONDS = 5.0
+
+
+class ChartQueueFull(RuntimeError):
+    """Raised when too many renders are already queued or running"""
+
+
+class ChartRenderTimeout(RuntimeError):
+    """Raised when a render did not finish within its timeout"""
+
+
+def chart_data(buckets):
+    """
+    Reduce rollup buckets (oldest first) to the plain values a chart needs
+
+    Returns:
+        dict: Picklable chart input (times, means, histogram and box statistics)
+    """
+    times = [start for start, _ in buckets]
+    summary = total(buckets)
+    return {
+        'times': times,
+        'means': [bucket.mean * 100 for _, bucket in buckets],
+        'hourly': len(times) > 1 and (times[1] - times[0]).total_seconds() < 86400,
+        'histogram': list(summary.histogram),
+        # Box from the rollup quantile sketch; whiskers span the observed min and max
+        'box': {
+            'med': summary.quantile(0.5) * 100,
+            'q1': summary.quantile(0.25) * 100,
+            'q3': summary.quantile(0.75) * 100,
+            'whislo': summary.minimum * 100,
+            'whishi': summary.maximum * 100,
+            'fliers': [],
+            'label': '',
+        },
+    }
+
+
+def render_chart(data, chart_type, title, timeout=None):
+    """
+    Render a chart as a base64-encoded PNG with the object-oriented Figure API
+
+    Uses no pyplot state, so it is safe in any thread or process.
+
+    Args:
+        data: Output of chart_data()
+        chart_type: 'bar', 'histogram', 'scatter', 'box' or 'line'
+        title: Chart title
+        timeout: Seconds before the render is aborted (worker processes only)
+
+    Returns:
+        str: Base64-encoded PNG
+    """
+    with _deadline(timeout):
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+        import seaborn as sns
+
+        with sns.axes_style("darkgrid"):
+            fig = Figure(figsize=(8, 4))
+            ax = fig.subplots()
+            times, means = data['times'], data['means']
+
+            if chart_type == "bar":
+                labels = [t.strftime("%H:00" if data['hourly'] else "%b %d") for t in times]
+                sns.barplot(x=labels, y=means, ax=ax, color="#6366f1")
+                ax.set_xlabel("Hour" if data['hourly'] else "Day")
+                ax.set_ylabel("Mean Confidence (%)")
+                ax.tick_params(axis="x", labelrotation=45)
+            elif chart_type == "histogram":
+                width = 100 / HISTOGRAM_BINS
+                ax.bar([i * width for i in range(HISTOGRAM_BINS)], data['histogram'], width=width,
+                       align="edge", color="#8b5cf6", edgecolor="white")
+                ax.set_xlim(0, 100)
+                ax.set_xlabel("Confidence (%)")
+                ax.set_ylabel("Frequency")
+            elif chart_type == "scatter":
+                ax.scatter(times, means, color="#10b981")
+                ax.set_xlabel("Time")
+                ax.set_ylabel("Mean Confidence (%)")
+                fig.autofmt_xdate()
+            elif chart_type == "box":
+                ax.bxp([data['box']], patch_artist=True, boxprops={"facecolor": "#fbbf24"})
+                ax.set_ylabel("Confidence (%)")
+            elif chart_type == "line":
+                ax.plot(times, means, color="#3b82f6", marker="o")
+                ax.set_xlabel("Time")
+                ax.set_ylabel("Mean Confidence (%)")
+                fig.autofmt_xdate()
+
+            ax.set_title(title)
+            if chart_type != "histogram":
+                ax.set_ylim(0, 100)
+            fig.tight_layout()
+
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=150, bbox_inches="tight")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+class _deadline:
+    """Abort the block with ChartRenderTimeout after ``seconds`` (main thread on POSIX only)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.enabled = (
+            seconds is not None and hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    def __enter__(self):
+        if self.enabled:
+            self.previous = signal.signal(signal.SIGALRM, self._expired)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+        return False
+
+    def _expired(self, signum, frame):
+        raise ChartRenderTimeout(f"Chart render exceeded {self.seconds}s")
+
+
+class ChartRenderPool:
+    """
+    Dedicated worker processes for chart rendering
+
+    Rendering holds the GIL for hundreds of milliseconds, so it runs
+    outside the web process's threads. At most ``max_pending`` renders
+    are queued or running at a time; further requests fail fast with
+    ChartQueueFull instead of piling up behind each other.
+    """
+
+    def __init__(self, workers=2, max_pending=8, timeout=10.0):
+        """
+        Args:
+            workers: Worker processes; 0 renders in the calling thread
+            max_pending: Renders allowed to be queued or running at once
+            timeout: Seconds a single render may take
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def render(self, data, chart_type, title):
+        """
+        Render a chart, waiting at most the render timeout
+
+        Raises:
+            ChartQueueFull: If max_pending renders are already in flight
+            ChartRenderTimeout: If the render took longer than the timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise ChartQueueFull(f"{self.max_pending} chart renders already in flight")
+
+        if self.workers <= 0:
+            try:
+                image = render_chart(data, chart_type, title)
+            finally:
+                self._slots.release()
+        else:
+            try:
+                future = self._get_executor().submit(render_chart, data, chart_type, title, self.timeout)
+            except BaseException:
+                self._slots.release()
+                raise
+            # The slot is held until the worker is really done, even if the caller gives up
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                image = future.result(timeout=self.timeout + TIMEOUT_GRACE_SECONDS)
+            except (ChartRenderTimeout, FutureTimeoutError):
+                self.timeouts += 1
+                raise ChartRenderTimeout(f"Chart render exceeded {self.timeout}s")
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool next time
+                with self._lock:
+                    self._executor = None
+                raise
+        self.rendered += 1
+        return image
+
+    def _get_executor(self):
+        # Created on first use in each process; workers are spawned, not forked
+        # from a threaded web server
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        """Render, rejection and timeout counters"""
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'rendered': self.rendered,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+        }
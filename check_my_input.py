@@ -4,11 +4,11 @@ Detects fake links and messages using machine learning
 Analyzes URL/message characteristics - works for all links, not just known domains
 """
 
-from fake_detector import FakeDetector
+from detector_registry import get_detector
 
 def check_url(url, simple=False):
     """Check if a URL is fake"""
-    detector = FakeDetector()
+    detector = get_detector()
     result = detector.detect_url(url)
     
     if simple:
@@ -35,7 +35,7 @@ def check_url(url, simple=False):
 
 def check_message(message, simple=False):
     """Check if a message is fake"""
-    detector = FakeDetector()
+    detector = get_detector()
     result = detector.detect_message(message)
     
     if simple:
@@ -67,7 +67,7 @@ def main():
     print("Check your own URLs and messages for fake/spam content")
     print("=" * 70)
     
-    detector = FakeDetector()
+    detector = get_detector()
     
     # Ask for simple or detailed mode
     print("\nChoose display mode:")
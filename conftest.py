@@ -0,0 +1,46 @@
+"""
+Shared Test Fixtures
+A small URL model trained on sample URLs, for tests that need real predictions
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.preprocessing import StandardScaler
+
+from fake_detector import FakeDetector
+
+URLS = [
+    'https://www.google.com', 'https://github.com/login', 'http://paypal-verify.tk/login',
+    'http://192.168.1.1/bank/update', 'https://bit.ly/abc123', 'http://secure-account-update.xyz',
+    'https://docs.python.org/3/', 'http://free-prize-winner.ml/claim?id=1',
+]
+LABELS = [0, 0, 1, 1, 0, 1, 0, 1]
+
+
+@pytest.fixture
+def urls():
+    """The sample URLs, half of them fake"""
+    return list(URLS)
+
+
+@pytest.fixture
+def train_url_detector():
+    """Factory saving a URL model trained on the sample URLs to model_dir; returns its detector"""
+    def train(model_dir):
+        detector = FakeDetector(model_dir=model_dir)
+        X = detector.url_extractor.extract_matrix(URLS * 5)
+        y = np.array(LABELS * 5)
+        detector.url_scaler = StandardScaler().fit(X)
+        detector.url_model = VotingClassifier(
+            estimators=[
+                ('rf', RandomForestClassifier(n_estimators=10, random_state=0)),
+                ('gb', GradientBoostingClassifier(n_estimators=10, random_state=0)),
+            ],
+            voting='soft',
+            weights=[2, 1]
+        ).fit(detector.url_scaler.transform(X), y)
+        detector._save_url_model()
+        return detector
+
+    return train
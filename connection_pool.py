@@ -0,0 +1,164 @@
+"""
+Connection pool for the detection database.
+Connections are created lazily, per process, and handed out one caller at a time.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections with wait-time metrics."""
+
+    def __init__(
+        self,
+        connect: Callable[..., Any],
+        config: Dict[str, Any],
+        size: int = 5,
+        timeout: float = 10.0,
+        name: str = "pool",
+        broken_errors: tuple = (),
+    ) -> None:
+        """
+        Args:
+            connect: Connection factory, called with config as keyword arguments
+            config: Connection settings
+            size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection before PoolTimeout
+            name: Label used in stats
+            broken_errors: Exception types after which a connection is discarded
+                instead of being returned to the pool
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self._connect = connect
+        self._config = config
+        self.size = size
+        self.timeout = timeout
+        self.name = name
+        self._broken_errors = broken_errors
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Connections inherited from a parent process share its sockets; never reuse or close them
+        self._pid = os.getpid()
+        self._idle: List[Any] = []
+        self._open = 0
+        self.created = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection for the duration of the with-block."""
+        conn = self._acquire()
+        try:
+            conn.ping(reconnect=True, attempts=3, delay=2)
+        except self._broken_errors:
+            # Replace a connection the server dropped while it sat idle
+            self._discard(conn)
+            conn = self._acquire()
+        try:
+            yield conn
+        except self._broken_errors:
+            self._discard(conn)
+            raise
+        except BaseException:
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def _acquire(self) -> Any:
+        start = time.monotonic()
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+            waited = False
+            while not self._idle and self._open >= self.size:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No {self.name} connection free after {self.timeout}s")
+                self._cond.wait(remaining)
+            self.acquisitions += 1
+            if waited:
+                elapsed = time.monotonic() - start
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            conn = self._connect(**self._config)
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _release(self, conn: Any) -> None:
+        with self._cond:
+            if self._pid == os.getpid():
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def _discard(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            if self._pid == os.getpid():
+                self._open -= 1
+                self._cond.notify()
+
+    def close(self) -> None:
+        """Close idle connections; connections still checked out are returned as usual."""
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+                return
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Pool size, usage and wait-time counters."""
+        with self._cond:
+            in_use = self._open - len(self._idle)
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "created": self.created,
+                "acquisitions": self.acquisitions,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "avg_wait_seconds": self.wait_seconds / self.waits if self.waits else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+                "timeouts": self.timeouts,
+            }
@@ -3,8 +3,8 @@ Demo Script
 Demonstrates the fake message and link detection system
 """
 
-from fake_detector import FakeDetector
-import os
+from detector_registry import get_detector
+from fake_detector import models_available
 
 def print_result(result, item_type="URL"):
     """Pretty print detection result"""
@@ -32,13 +32,13 @@ def main():
     print("=" * 70)
     
     # Check if models exist
-    if not os.path.exists('models/url_model.pkl') or not os.path.exists('models/message_model.pkl'):
+    if not models_available():
         print("\n⚠️  Models not found. Training models first...")
         print("This may take a few moments.\n")
         import train_models
         detector_instance = train_models.detector
     else:
-        detector_instance = FakeDetector()
+        detector_instance = get_detector()
     
     print("\n" + "=" * 70)
     print("URL Detection Examples")
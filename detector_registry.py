@@ -0,0 +1,105 @@
+"""
+Detector Registry
+One shared FakeDetector per model directory for the whole process
+"""
+
+import os
+import threading
+
+from fake_detector import FakeDetector
+from url_rules import RULE_MODES, URLRuleClassifier
+
+DETECTOR_TYPES = ('url', 'message')
+
+_lock = threading.Lock()
+_detectors = {}
+
+
+def _key(model_dir, use_flat_engine, verdict_cache, url_rules, use_cascade):
+    # The cache is keyed by identity: callers passing their own cache get their own detector
+    return os.path.abspath(model_dir), bool(use_flat_engine), verdict_cache, url_rules, bool(use_cascade)
+
+
+def get_detector(model_dir='models', use_flat_engine=True, verdict_cache=None, url_rules='off', use_cascade=False):
+    """
+    Return the process-wide detector for model_dir and options, creating it on first use
+
+    Models are still loaded lazily, on the first detection (or by warm_up()),
+    and only once per process no matter how many callers share the detector.
+    Processes forked after warm_up() keep the loaded models (copy-on-write)
+    instead of loading their own.
+
+    Every combination of options has its own detector, so a caller asking
+    for the defaults never inherits another caller's cache, rules or cascade.
+
+    Args:
+        model_dir: Directory holding the trained models
+        use_flat_engine: Score with the flat tree engine (see FakeDetector)
+        verdict_cache: VerdictCache serving repeated inputs, or None
+        url_rules: URL rule mode, one of RULE_MODES ('off', 'audit' or 'on')
+        use_cascade: Answer confident inputs with the cascade's first stage
+
+    Returns:
+        FakeDetector: Shared detector
+    """
+    if url_rules not in RULE_MODES:
+        raise ValueError(f"url_rules must be one of {', '.join(RULE_MODES)}")
+    key = _key(model_dir, use_flat_engine, verdict_cache, url_rules, use_cascade)
+    with _lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = FakeDetector(model_dir=model_dir, use_flat_engine=use_flat_engine,
+                                    verdict_cache=verdict_cache, use_cascade=use_cascade)
+            if url_rules != 'off':
+                detector.url_rules = URLRuleClassifier(detector.url_extractor, audit=url_rules == 'audit')
+            _detectors[key] = detector
+        return detector
+
+
+def warm_up(model_dir='models', use_flat_engine=True, detector_types=DETECTOR_TYPES, **options):
+    """
+    Load models now instead of on the first detection
+
+    Args:
+        options: verdict_cache, url_rules and use_cascade, as for get_detector()
+
+    Returns:
+        dict: {detector_type: True if a trained model was loaded}
+    """
+    detector = get_detector(model_dir, use_flat_engine, **options)
+    return {detector_type: detector._ensure_model(detector_type) for detector_type in detector_types}
+
+
+def reload(model_dir='models', use_flat_engine=True, **options):
+    """
+    Re-read the models from disk (e.g. after retraining)
+
+    The shared detector loads the new models while it keeps scoring with
+    the old ones, then swaps each detector type's snapshot in one step (see
+    FakeDetector.reload_models), so every caller holding the detector sees
+    the new models and requests already scoring finish on the old ones.
+
+    Returns:
+        FakeDetector: The shared detector
+    """
+    detector = get_detector(model_dir, use_flat_engine, **options)
+    detector.reload_models(changed_only=False)
+    return detector
+
+
+def clear():
+    """Forget all shared detectors; the next get_detector() loads from disk again"""
+    with _lock:
+        _detectors.clear()
+
+
+def _reset_locks_after_fork():
+    # Another thread may have held a lock at the moment of the fork; in the child it never will
+    global _lock
+    _lock = threading.Lock()
+    for detector in _detectors.values():
+        detector._load_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
@@ -0,0 +1,102 @@
+"""
+Domain Index
+Hashed-suffix index for large domain allow/block lists
+Usage: python domain_index.py build <domains.txt> <index.npy>
+"""
+
+import hashlib
+import sys
+
+import numpy as np
+
+
+def domain_hash(domain):
+    """Stable 64-bit hash of a domain name (same value in every process)"""
+    digest = hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class DomainIndex:
+    """
+    Set of domain names with parent-domain lookups
+
+    A lookup checks each label suffix of the domain (a.b.example.com,
+    b.example.com, example.com, com), so its cost depends on the number of
+    labels, not the list size. Indexes built in memory keep the domain
+    strings in a set; indexes saved with save() store sorted 64-bit hashes
+    that load() memory-maps read-only, so worker processes share one
+    page-cache copy of even very large lists.
+    """
+
+    def __init__(self, domains=None, hashes=None):
+        self._domains = domains
+        self._hashes = hashes
+
+    @classmethod
+    def from_domains(cls, domains):
+        """Build an in-memory index from an iterable of domain names"""
+        return cls(domains=frozenset(domain for domain in map(cls._normalize_entry, domains) if domain))
+
+    @classmethod
+    def from_file(cls, path):
+        """Build an index from a text file with one domain per line ('#' starts a comment)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_domains(line.split('#', 1)[0] for line in f)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save() (memory-mapped), or build one from a text file"""
+        if path.endswith('.npy'):
+            return cls(hashes=np.load(path, mmap_mode='r').view(np.ndarray))
+        return cls.from_file(path)
+
+    def save(self, path):
+        """Save the index as a sorted .npy hash array that load() can memory-map"""
+        if self._hashes is None:
+            hashes = np.array(sorted({domain_hash(domain) for domain in self._domains}), dtype=np.uint64)
+        else:
+            hashes = np.asarray(self._hashes)
+        np.save(path, hashes)
+
+    def __len__(self):
+        return len(self._domains) if self._domains is not None else len(self._hashes)
+
+    def contains(self, domain):
+        """Check if exactly this domain is in the index"""
+        return self._lookup([domain])
+
+    def matches(self, domain):
+        """Check if the domain or any of its parent domains is in the index"""
+        if not domain:
+            return False
+        labels = domain.split('.')
+        return self._lookup(['.'.join(labels[i:]) for i in range(len(labels))])
+
+    def _lookup(self, candidates):
+        if self._domains is not None:
+            return any(candidate in self._domains for candidate in candidates)
+        if len(self._hashes) == 0:
+            return False
+        keys = np.array([domain_hash(candidate) for candidate in candidates], dtype=np.uint64)
+        positions = np.searchsorted(self._hashes, keys)
+        positions[positions == len(self._hashes)] = 0
+        return bool(np.any(self._hashes[positions] == keys))
+
+    @staticmethod
+    def _normalize_entry(domain):
+        return domain.strip().lower().strip('.')
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != 'build':
+        print("Usage:")
+        print("  python domain_index.py build <domains.txt> <index.npy>")
+        return
+
+    index = DomainIndex.from_file(sys.argv[2])
+    index.save(sys.argv[3])
+    print(f"Indexed {len(index)} domains into {sys.argv[3]}")
+
+
+if __name__ == '__main__':
+    main()
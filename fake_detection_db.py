@@ -7,38 +7,143 @@ from __future__ import annotations
 
 import os
 import threading
-from typing import Optional
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
 
 import mysql.connector
 
+from analytics_rollup import (
+    ROLLUP_REBUILD_LOCK_SQL,
+    ROLLUP_REBUILD_SQL,
+    ROLLUP_RECENT_CONDITION,
+    ROLLUP_SELECT_COLUMNS,
+    ROLLUP_TABLE_SQL,
+    ROLLUP_UPSERT_SQL,
+    RollupBucket,
+    upsert_params,
+)
+from connection_pool import ConnectionPool
+from metrics import DB_SECONDS
+from write_behind import WriteBehindQueue
+
+DetectionRow = Tuple[str, str, float, str]
+
+# Keyset cursor: (created_at, id) of the last row of a page
+PageCursor = Tuple[datetime, int]
+
+# InnoDB picked the transaction as a deadlock victim and rolled it back
+ER_LOCK_DEADLOCK = 1213
+
+# Secondary indexes, added to tables created before they existed by migrate(). InnoDB appends
+# the primary key to each, so "ORDER BY created_at DESC, id DESC" is read straight off the index.
+INDEXES = {
+    "idx_type_label_created": "(detection_type, prediction_label, created_at)",
+    "idx_created": "(created_at)",
+}
+
+
+def detection_row(
+    input_text: str,
+    prediction_label: str,
+    detection_percent: float,
+    detection_type: str = "link",
+) -> DetectionRow:
+    """Build a detections row, truncating values to their column sizes."""
+    return (
+        (input_text or "")[:4000],
+        (prediction_label or "UNKNOWN")[:20],
+        float(detection_percent),
+        detection_type,
+    )
+
 
 class FakeDetectionDB:
-    """Simple MySQL helper to persist detection outcomes."""
+    """
+    Simple MySQL helper to persist detection outcomes.
+
+    Inserts and analytics reads use separate connection pools, so a slow
+    report never holds up detection logging. No connection is opened until
+    the first query, and each process opens its own (pre-fork safe).
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        write_behind: bool = False,
+        connect: Optional[Callable] = None,
+        queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        read_pool_size: Optional[int] = None,
+        write_pool_size: Optional[int] = None,
+        pool_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            write_behind: Queue inserts and write them in batches from a background
+                thread instead of inside the calling request
+            connect: Connection factory called with the config keyword arguments
+                (defaults to mysql.connector.connect)
+            queue_size: Rows buffered in write-behind mode before new rows are dropped
+            batch_size: Maximum rows per executemany in write-behind mode
+            flush_interval: Seconds a queued row may wait before its batch is written
+            read_pool_size: Connections for analytics reads (MYSQL_READ_POOL_SIZE, default 4)
+            write_pool_size: Connections for inserts (MYSQL_WRITE_POOL_SIZE, default 2)
+            pool_timeout: Seconds to wait for a free connection (MYSQL_POOL_TIMEOUT, default 10)
+        """
         self._config = {
             "host": os.getenv("MYSQL_HOST", "localhost"),
             "port": int(os.getenv("MYSQL_PORT", "3306")),
             "user": os.getenv("MYSQL_USER", "root"),
             "password": os.getenv("MYSQL_PASSWORD", "root"),
             "database": os.getenv("MYSQL_DATABASE", "fake_detection_db"),
+            # Timestamps and rollup buckets are read and written in UTC, whatever the server's zone
+            "time_zone": "+00:00",
         }
-        self._lock = threading.Lock()
-        self._connect()
-        self._ensure_table()
-
-    def _connect(self) -> None:
-        self._conn = mysql.connector.connect(**self._config)
+        # Reads can go to a replica; by default they use the same server
+        read_config = dict(self._config, host=os.getenv("MYSQL_READ_HOST", self._config["host"]))
+        if pool_timeout is None:
+            pool_timeout = float(os.getenv("MYSQL_POOL_TIMEOUT", "10"))
+        connect = connect or mysql.connector.connect
+        self._write_pool = ConnectionPool(
+            connect,
+            self._config,
+            size=write_pool_size or int(os.getenv("MYSQL_WRITE_POOL_SIZE", "2")),
+            timeout=pool_timeout,
+            name="write",
+            broken_errors=(mysql.connector.Error,),
+        )
+        self._read_pool = ConnectionPool(
+            connect,
+            read_config,
+            size=read_pool_size or int(os.getenv("MYSQL_READ_POOL_SIZE", "4")),
+            timeout=pool_timeout,
+            name="read",
+            broken_errors=(mysql.connector.Error,),
+        )
+        self._table_lock = threading.Lock()
+        self._table_ready = False
+        self._writer: Optional[WriteBehindQueue] = None
+        if write_behind:
+            self._writer = WriteBehindQueue(
+                self.insert_detections,
+                max_size=queue_size,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+            )
 
-    def _ensure_connection(self):
-        try:
-            self._conn.ping(reconnect=True, attempts=3, delay=2)
-        except mysql.connector.Error:
-            self._connect()
-        return self._conn
+    def _ensure_table_once(self) -> None:
+        if self._table_ready:
+            return
+        with self._table_lock:
+            if not self._table_ready:
+                self._ensure_table()
+                self._table_ready = True
 
     def _ensure_table(self) -> None:
-        conn = self._ensure_connection()
+        with self._write_pool.connection() as conn:
+            self._create_table(conn)
+
+    def _create_table(self, conn) -> None:
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -49,7 +154,9 @@ class FakeDetectionDB:
                     prediction_label VARCHAR(20) NOT NULL,
                     detection_percent FLOAT NOT NULL,
                     detection_type VARCHAR(20) NOT NULL DEFAULT 'link',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_type_label_created (detection_type, prediction_label, created_at),
+                    INDEX idx_created (created_at)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
                 """
             )
@@ -61,42 +168,136 @@ class FakeDetectionDB:
                 conn.commit()
             except mysql.connector.Error:
                 conn.rollback()
+            cursor.execute(ROLLUP_TABLE_SQL)
+            conn.commit()
         finally:
             cursor.close()
 
-    def insert_detection(
-        self,
-        input_text: str,
-        prediction_label: str,
-        detection_percent: float,
-        detection_type: str = "link",
-    ) -> None:
-        """Insert a detection row into MySQL."""
-        input_text = (input_text or "")[:4000]
-        prediction_label = (prediction_label or "UNKNOWN")[:20]
+    def migrate(self) -> List[str]:
+        """
+        Bring tables created by older versions up to date; returns the indexes added.
 
-        with self._lock:
-            conn = self._ensure_connection()
+        Adding an index rebuilds a large table, so this is a setup step
+        (python fake_detection_db.py migrate), never part of a request.
+        """
+        self._ensure_table_once()
+        added = []
+        with self._write_pool.connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute(
                     """
-                    INSERT INTO detections (input_text, prediction_label, detection_percent, detection_type)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (input_text, prediction_label, float(detection_percent), detection_type),
+                    SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'detections'
+                    """
                 )
-                conn.commit()
+                existing = {row[0] for row in cursor.fetchall()}
+                for name, columns in INDEXES.items():
+                    if name not in existing:
+                        cursor.execute(f"ALTER TABLE detections ADD INDEX {name} {columns};")
+                        conn.commit()
+                        added.append(name)
             finally:
                 cursor.close()
+        return added
+
+    def insert_detection(
+        self,
+        input_text: str,
+        prediction_label: str,
+        detection_percent: float,
+        detection_type: str = "link",
+    ) -> None:
+        """Insert a detection row into MySQL (queued in write-behind mode)."""
+        row = detection_row(input_text, prediction_label, detection_percent, detection_type)
+
+        # In write-behind mode this times the enqueue; the batch write is timed as insert_detections
+        with DB_SECONDS.time(("insert_detection",), timing_name="db"):
+            if self._writer is not None:
+                self._writer.submit(row)
+            else:
+                self.insert_detections([row])
+
+    def insert_detections(self, rows: Iterable[DetectionRow]) -> None:
+        """
+        Insert detection rows and update their rollups in a single commit.
+
+        Workers of a pre-fork server write concurrently; a transaction lost
+        to an InnoDB deadlock is retried once.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with DB_SECONDS.time(("insert_detections",)):
+            self._ensure_table_once()
+            with self._write_pool.connection() as conn:
+                for attempt in range(2):
+                    try:
+                        self._write_rows(conn, rows)
+                        return
+                    except mysql.connector.Error as e:
+                        if e.errno != ER_LOCK_DEADLOCK or attempt:
+                            raise
+                        conn.rollback()
+
+    def _write_rows(self, conn, rows: List[DetectionRow]) -> None:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                """
+                INSERT INTO detections (input_text, prediction_label, detection_percent, detection_type)
+                VALUES (%s, %s, %s, %s)
+                """,
+                rows,
+            )
+            cursor.executemany(ROLLUP_UPSERT_SQL, upsert_params(rows))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued rows are written; returns False on timeout."""
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Write queued rows, stop the writer thread and close pooled connections."""
+        if self._writer is not None:
+            self._writer.close(timeout)
+        self._write_pool.close()
+        self._read_pool.close()
+
+    def pool_stats(self) -> dict:
+        """Connection usage and pool wait times of the read and write pools."""
+        return {"read": self._read_pool.stats(), "write": self._write_pool.stats()}
+
+    def writer_stats(self) -> Optional[dict]:
+        """Write-behind queue depth and counters (None if writes are synchronous)."""
+        if self._writer is None:
+            return None
+        return self._writer.stats()
 
     def fetch_by_filter(
         self,
         detection_type: str | None = None,
         prediction_label: str | None = None,
         limit: int = 200,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        before: PageCursor | None = None,
+        flush_first: bool = False,
     ):
-        """Fetch rows filtered by detection type and prediction label."""
+        """
+        Fetch rows filtered by detection type and prediction label, newest first.
+
+        Args:
+            since: Only rows created at or after this time
+            until: Only rows created before this time
+            before: Keyset cursor from next_page_cursor() to fetch the following page
+            flush_first: Write this process's queued rows before reading (waits for
+                the write-behind drain; reads never wait for writes by default)
+        """
         conditions = []
         params = []
         if detection_type:
@@ -105,6 +306,16 @@ class FakeDetectionDB:
         if prediction_label:
             conditions.append("prediction_label = %s")
             params.append(prediction_label)
+        if since is not None:
+            conditions.append("created_at >= %s")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < %s")
+            params.append(until)
+        if before is not None:
+            # Expanded form of (created_at, id) < (%s, %s), which MySQL can range-scan
+            conditions.append("(created_at < %s OR (created_at = %s AND id < %s))")
+            params.extend([before[0], before[0], before[1]])
 
         where_clause = ""
         if conditions:
@@ -114,13 +325,15 @@ class FakeDetectionDB:
             SELECT id, input_text, prediction_label, detection_percent, detection_type, created_at
             FROM detections
             {where_clause}
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT %s
         """
         params.append(limit)
 
-        with self._lock:
-            conn = self._ensure_connection()
+        if flush_first:
+            self.flush(timeout=5.0)
+        self._ensure_table_once()
+        with self._read_pool.connection() as conn:
             cursor = conn.cursor(dictionary=True)
             try:
                 cursor.execute(query, tuple(params))
@@ -129,5 +342,106 @@ class FakeDetectionDB:
                 cursor.close()
         return rows
 
+    def fetch_rollups(
+        self,
+        detection_type: str,
+        prediction_label: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        flush_first: bool = False,
+        last_hours: int | None = None,
+    ) -> List[Tuple[datetime, RollupBucket]]:
+        """
+        Hourly rollup buckets for a type and label, oldest first.
+
+        Bucket starts are UTC. last_hours keeps the buckets of the last N hours, the
+        current one included, by the database clock that stamps the buckets (see
+        fetch_by_filter for flush_first).
+        """
+        conditions = ["detection_type = %s", "prediction_label = %s"]
+        params: list = [detection_type, prediction_label]
+        if last_hours is not None:
+            conditions.append(ROLLUP_RECENT_CONDITION)
+            params.append(last_hours)
+        if since is not None:
+            conditions.append("bucket_start >= %s")
+            params.append(since)
+        if until is not None:
+            conditions.append("bucket_start < %s")
+            params.append(until)
+        query = f"""
+            SELECT {ROLLUP_SELECT_COLUMNS}
+            FROM detection_rollups
+            WHERE {" AND ".join(conditions)}
+            ORDER BY bucket_start
+        """
+
+        if flush_first:
+            self.flush(timeout=5.0)
+        self._ensure_table_once()
+        with self._read_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, tuple(params))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        return [(row[0], RollupBucket.from_row(row[1:])) for row in rows]
+
+    def rebuild_rollups(self) -> None:
+        """
+        Recompute all rollups from the detections table (e.g. after upgrading).
+
+        Runs as one transaction: readers keep seeing the old rollups until it
+        commits, and inserts wait for it rather than updating buckets that are
+        being recomputed, so no detection is lost or counted twice.
+        """
+        self.flush(timeout=30.0)
+        self._ensure_table_once()
+        with self._write_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(ROLLUP_REBUILD_LOCK_SQL)
+                cursor.fetchall()
+                cursor.execute("DELETE FROM detection_rollups")
+                cursor.execute(ROLLUP_REBUILD_SQL)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def next_page_cursor(rows, limit: int) -> Optional[PageCursor]:
+        """Cursor for the page after rows, or None if rows was the last page."""
+        if len(rows) < limit or not rows:
+            return None
+        return rows[-1]["created_at"], rows[-1]["id"]
+
+
+def main(argv=None) -> int:
+    """Command line: python fake_detection_db.py migrate"""
+    import sys
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["migrate"]:
+        print("Usage: python fake_detection_db.py migrate", file=sys.stderr)
+        return 2
+    db = FakeDetectionDB()
+    try:
+        added = db.migrate()
+    except mysql.connector.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f"Added indexes: {', '.join(added)}" if added else "Schema is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
 
 
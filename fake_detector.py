@@ -6,47 +6,138 @@ Main AI module for detecting fake messages and links using machine learning
 import numpy as np
 import pickle
 import os
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
-from url_feature_extractor import URLFeatureExtractor
+from url_feature_extractor import URLFeatureExtractor, MALFORMED_PROTOCOL_PATTERN
 from message_feature_extractor import MessageFeatureExtractor
+from message_feature_extractor import FEATURE_SCHEMA_VERSION as MESSAGE_SCHEMA_VERSION
+from url_feature_extractor import FEATURE_SCHEMA_VERSION as URL_SCHEMA_VERSION
+from tree_engine import FlatEnsemble
+from cascade import (CALIBRATION_SIZE, DEFAULT_MAX_ACCURACY_LOSS, FastStage, choose_gate, gate_accuracy,
+                     measure_latency, train_fast_stage)
+from model_bundle import bundle_exists, current_version, load_bundle, save_bundle
+from model_snapshot import ModelSnapshot
+from parallelism import POLICY_FILE, ParallelismPolicy, reset_n_jobs, sklearn_predict_proba
+from metrics import stage
+
+
+def models_available(model_dir='models'):
+    """Check if both trained models (bundles or legacy pickles) exist in model_dir"""
+    for detector_type in ('url', 'message'):
+        if not (bundle_exists(os.path.join(model_dir, f'{detector_type}_bundle'))
+                or os.path.exists(os.path.join(model_dir, f'{detector_type}_model.pkl'))):
+            return False
+    return True
+
+
+def _training_modules():
+    """
+    scikit-learn pieces used only for training, imported on demand
+    
+    Importing scikit-learn takes about a second; scoring with the flat
+    engine never needs it, so it stays out of the inference import path.
+    """
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    return (RandomForestClassifier, GradientBoostingClassifier, VotingClassifier,
+            accuracy_score, classification_report, train_test_split, StandardScaler)
+
+
+DETECTOR_TYPES = ('url', 'message')
+
+
+class _SnapshotAttribute:
+    """
+    Attribute of the current model snapshot of one detector type
+    
+    Assigning it swaps in a new snapshot with that field replaced.
+    """
+    
+    def __init__(self, detector_type, field):
+        self.detector_type = detector_type
+        self.field = field
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj._snapshots[self.detector_type], self.field)
+    
+    def __set__(self, obj, value):
+        obj._install(obj._snapshots[self.detector_type].replace(**{self.field: value}))
 
 
 class FakeDetector:
     """Main AI module for fake message and link detection"""
     
-    def __init__(self):
+    def __init__(self, model_dir='models', use_flat_engine=False, verdict_cache=None, url_rules=None,
+                 use_cascade=False, parallelism=None):
+        """
+        Args:
+            model_dir: Directory holding the trained models
+            use_flat_engine: Score with flattened tree arrays (tree_engine.py)
+                             instead of the scikit-learn predict path
+            verdict_cache: Optional VerdictCache serving repeated inputs
+            url_rules: Optional URLRuleClassifier (url_rules.py) deciding clear-cut
+                       URLs before the model
+            use_cascade: Answer confident inputs with the small first-stage model
+                         (cascade.py) and run the full ensemble only for the rest
+            parallelism: ParallelismPolicy for predict calls (default: the calibrated
+                         policy in model_dir/parallelism.json, else serial below 4096 rows)
+        """
         self.url_extractor = URLFeatureExtractor()
         self.message_extractor = MessageFeatureExtractor()
-        self.url_model = None
-        self.message_model = None
-        self.url_scaler = StandardScaler()
-        self.message_scaler = StandardScaler()
-        self.model_dir = 'models'
+        # Model, scaler, engine and first stage per detector type (model_snapshot.py),
+        # replaced as a unit when models are trained or reloaded
+        self._snapshots = {detector_type: ModelSnapshot(detector_type) for detector_type in DETECTOR_TYPES}
+        self.model_dir = model_dir
+        self.use_flat_engine = use_flat_engine
+        self.verdict_cache = verdict_cache
+        self.url_rules = url_rules
+        self.use_cascade = use_cascade
+        self.parallelism = parallelism or ParallelismPolicy.load(os.path.join(model_dir, POLICY_FILE))
+        self.cascade_counts = {
+            'url': {'answered': 0, 'escalated': 0},
+            'message': {'answered': 0, 'escalated': 0},
+        }
+        # Guards cascade_counts, updated by every scoring thread
+        self._counts_lock = threading.Lock()
+        # Serializes loading and reloading, so threads sharing a detector load each model once;
+        # scoring never takes it
+        self._load_lock = threading.Lock()
         
         # Create models directory if it doesn't exist
         os.makedirs(self.model_dir, exist_ok=True)
     
-    def train_url_model(self, urls, labels):
+    # With the flat engine the model and scaler stay on disk until something asks for them
+    url_model = _SnapshotAttribute('url', 'model')
+    url_scaler = _SnapshotAttribute('url', 'scaler')
+    url_engine = _SnapshotAttribute('url', 'engine')
+    url_bundle = _SnapshotAttribute('url', 'bundle')
+    url_fast_stage = _SnapshotAttribute('url', 'fast_stage')
+    message_model = _SnapshotAttribute('message', 'model')
+    message_scaler = _SnapshotAttribute('message', 'scaler')
+    message_engine = _SnapshotAttribute('message', 'engine')
+    message_bundle = _SnapshotAttribute('message', 'bundle')
+    message_fast_stage = _SnapshotAttribute('message', 'fast_stage')
+    
+    def train_url_model(self, urls, labels, max_cascade_loss=DEFAULT_MAX_ACCURACY_LOSS):
         """
         Train the URL detection model
         
         Args:
             urls: List of URLs (strings)
             labels: List of labels (1 for fake, 0 for legitimate)
+            max_cascade_loss: Held-out accuracy the cascade gate may give up
         """
-        print("Extracting URL features...")
-        features = []
-        for url in urls:
-            feat_dict = self.url_extractor.extract_features(url)
-            features.append(list(feat_dict.values()))
+        (RandomForestClassifier, GradientBoostingClassifier, VotingClassifier,
+         accuracy_score, classification_report, train_test_split, StandardScaler) = _training_modules()
         
-        X = np.array(features)
+        print("Extracting URL features...")
+        X = self.url_extractor.extract_matrix(urls)
         y = np.array(labels)
         
         # Split data
@@ -55,8 +146,14 @@ class FakeDetector:
         )
         
         # Scale features
-        X_train_scaled = self.url_scaler.fit_transform(X_train)
-        X_test_scaled = self.url_scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        # Rows neither stage is fitted on, for choosing the cascade gate
+        X_train_scaled, X_calibration, y_train, y_calibration = train_test_split(
+            X_train_scaled, y_train, test_size=CALIBRATION_SIZE, random_state=42, stratify=y_train
+        )
         
         # Create ensemble model for higher accuracy
         rf = RandomForestClassifier(
@@ -76,34 +173,50 @@ class FakeDetector:
         )
         
         # Voting classifier for ensemble
-        self.url_model = VotingClassifier(
+        model = VotingClassifier(
             estimators=[('rf', rf), ('gb', gb)],
             voting='soft',
             weights=[2, 1]
         )
         
         print("Training URL detection model...")
-        self.url_model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
+        # Trained on all cores; predict calls choose their own parallelism
+        reset_n_jobs(model)
         
         # Evaluate
-        y_pred = self.url_model.predict(X_test_scaled)
+        y_pred = model.predict(X_test_scaled)
         accuracy = accuracy_score(y_test, y_pred)
         print(f"URL Model Accuracy: {accuracy:.4f}")
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred, target_names=['Legitimate', 'Fake']))
         
+        fast_stage = self._train_fast_stage(
+            'url', model, scaler, X_train_scaled, y_train, X_calibration, y_calibration, X_test, y_test,
+            max_cascade_loss
+        )
+        
+        # The new model, scaler, engine and first stage replace the old ones together
+        self._install(ModelSnapshot(
+            'url', model=model, scaler=scaler, engine=self._compile_engine(model, scaler), fast_stage=fast_stage
+        ))
+        
         # Save model
         self._save_url_model()
         return accuracy
     
-    def train_message_model(self, messages, labels):
+    def train_message_model(self, messages, labels, max_cascade_loss=DEFAULT_MAX_ACCURACY_LOSS):
         """
         Train the message detection model
         
         Args:
             messages: List of messages (strings)
             labels: List of labels (1 for fake, 0 for legitimate)
+            max_cascade_loss: Held-out accuracy the cascade gate may give up
         """
+        (RandomForestClassifier, GradientBoostingClassifier, VotingClassifier,
+         accuracy_score, classification_report, train_test_split, StandardScaler) = _training_modules()
+        
         print("Extracting message features...")
         features = []
         for message in messages:
@@ -119,8 +232,14 @@ class FakeDetector:
         )
         
         # Scale features
-        X_train_scaled = self.message_scaler.fit_transform(X_train)
-        X_test_scaled = self.message_scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        # Rows neither stage is fitted on, for choosing the cascade gate
+        X_train_scaled, X_calibration, y_train, y_calibration = train_test_split(
+            X_train_scaled, y_train, test_size=CALIBRATION_SIZE, random_state=42, stratify=y_train
+        )
         
         # Create ensemble model with better parameters for message detection
         rf = RandomForestClassifier(
@@ -141,22 +260,34 @@ class FakeDetector:
             subsample=0.8
         )
         
-        self.message_model = VotingClassifier(
+        model = VotingClassifier(
             estimators=[('rf', rf), ('gb', gb)],
             voting='soft',
             weights=[3, 2]  # Give more weight to Random Forest
         )
         
         print("Training message detection model...")
-        self.message_model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
+        # Trained on all cores; predict calls choose their own parallelism
+        reset_n_jobs(model)
         
         # Evaluate
-        y_pred = self.message_model.predict(X_test_scaled)
+        y_pred = model.predict(X_test_scaled)
         accuracy = accuracy_score(y_test, y_pred)
         print(f"Message Model Accuracy: {accuracy:.4f}")
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred, target_names=['Legitimate', 'Fake']))
         
+        fast_stage = self._train_fast_stage(
+            'message', model, scaler, X_train_scaled, y_train, X_calibration, y_calibration, X_test, y_test,
+            max_cascade_loss
+        )
+        
+        # The new model, scaler, engine and first stage replace the old ones together
+        self._install(ModelSnapshot(
+            'message', model=model, scaler=scaler, engine=self._compile_engine(model, scaler), fast_stage=fast_stage
+        ))
+        
         # Save model
         self._save_message_model()
         return accuracy
@@ -168,41 +299,72 @@ class FakeDetector:
         Returns:
             dict: Detection result with prediction, probability, and reasons
         """
-        if not self.url_model:
-            self._load_url_model()
+        return self.detect_urls([url])[0]
+    
+    def detect_urls(self, urls):
+        """
+        Detect fake URLs in batch
         
-        if not self.url_model:
-            return {
-                'is_fake': False,
-                'confidence': 0.0,
-                'reasons': ['Model not trained. Please train the model first.']
-            }
+        Builds one feature matrix for the whole batch and makes a single
+        predict_proba call, so the ensemble overhead is paid once per batch.
         
-        # Extract features
-        features = self.url_extractor.extract_features(url)
-        feature_vector = np.array([list(features.values())])
-        feature_vector_scaled = self.url_scaler.transform(feature_vector)
+        Args:
+            urls: List of URLs (strings)
         
-        # Predict using AI model
-        predictions = self.url_model.predict(feature_vector_scaled)
-        prediction = int(predictions[0])  # type: ignore
-        probabilities = self.url_model.predict_proba(feature_vector_scaled)
-        proba_array = probabilities[0]  # type: ignore
-        confidence = float(proba_array[1] if prediction == 1 else proba_array[0])
+        Returns:
+            list: Detection results (same format as detect_url), in input order
+        """
+        # The whole batch scores with one snapshot, even if a reload swaps it meanwhile
+        snapshot = self._snapshot('url')
+        if not snapshot.loaded:
+            return [self._model_not_trained_result() for _ in urls]
+        
+        score = self._score_urls if self.url_rules is None else self._score_urls_with_rules
+        return self._detect_with_cache(snapshot, urls, score)
+    
+    def _score_urls_with_rules(self, urls, snapshot):
+        """Decide URLs with the rule pre-classifier and score only the rest with the model"""
+        with stage('url', 'rules'):
+            decisions = [self.url_rules.classify(url) for url in urls]
+        if self.url_rules.audit:
+            results = self._score_urls(urls, snapshot)
+            for decision, result in zip(decisions, results):
+                if decision is not None:
+                    self.url_rules.record_audit(decision[0], decision[1], result)
+            return results
+        
+        results = [decision[1] if decision is not None else None for decision in decisions]
+        undecided = [i for i, decision in enumerate(decisions) if decision is None]
+        if undecided:
+            for i, result in zip(undecided, self._score_urls([urls[i] for i in undecided], snapshot)):
+                results[i] = result
+        return results
+    
+    def _score_urls(self, urls, snapshot):
+        """Score URLs with the URL model snapshot"""
+        # Extract features
+        with stage('url', 'extract_features'):
+            # Explanations compare the exact values against their thresholds; the model takes float32
+            feature_matrix = self.url_extractor.extract_matrix(urls, dtype=np.float64)
+            features = [self.url_extractor.features_from_row(row) for row in feature_matrix]
+        predictions, confidences = self._predict_batch(snapshot, feature_matrix.astype(np.float32))
         
         # Use AI prediction directly - no whitelist override
         # The model analyzes URL characteristics to determine if it's fake
         # This works for all links, not just known domains
         
-        # Generate reasons
-        reasons = self._explain_url_result(features, prediction, confidence)
-        
-        return {
-            'is_fake': bool(prediction),
-            'confidence': float(confidence),
-            'reasons': reasons,
-            'url': url
-        }
+        results = []
+        with stage('url', 'explain'):
+            for url, feat, prediction, confidence in zip(urls, features, predictions, confidences):
+                # Generate reasons
+                reasons = self._explain_url_result(feat, prediction, confidence)
+                results.append({
+                    'is_fake': bool(prediction),
+                    'confidence': float(confidence),
+                    'reasons': reasons,
+                    'url': url
+                })
+        return results
     
     def detect_message(self, message):
         """
@@ -211,36 +373,328 @@ class FakeDetector:
         Returns:
             dict: Detection result with prediction, probability, and reasons
         """
-        if not self.message_model:
-            self._load_message_model()
+        return self.detect_messages([message])[0]
+    
+    def detect_messages(self, messages):
+        """
+        Detect fake messages in batch
         
-        if not self.message_model:
-            return {
-                'is_fake': False,
-                'confidence': 0.0,
-                'reasons': ['Model not trained. Please train the model first.']
-            }
+        Args:
+            messages: List of messages (strings)
+        
+        Returns:
+            list: Detection results (same format as detect_message), in input order
+        """
+        snapshot = self._snapshot('message')
+        if not snapshot.loaded:
+            return [self._model_not_trained_result() for _ in messages]
         
+        return self._detect_with_cache(snapshot, messages, self._score_messages)
+    
+    def _score_messages(self, messages, snapshot):
+        """Score messages with the message model snapshot"""
         # Extract features
-        features = self.message_extractor.extract_features(message)
-        feature_vector = np.array([list(features.values())])
-        feature_vector_scaled = self.message_scaler.transform(feature_vector)
+        with stage('message', 'extract_features'):
+            features = [self.message_extractor.extract_features(message) for message in messages]
+        predictions, confidences = self._predict_batch(
+            snapshot, [list(feat.values()) for feat in features]
+        )
+        
+        results = []
+        with stage('message', 'explain'):
+            for message, feat, prediction, confidence in zip(messages, features, predictions, confidences):
+                # Generate reasons
+                reasons = self._explain_message_result(feat, prediction, confidence)
+                results.append({
+                    'is_fake': bool(prediction),
+                    'confidence': float(confidence),
+                    'reasons': reasons,
+                    'message': message
+                })
+        return results
+    
+    def _detect_with_cache(self, snapshot, inputs, score):
+        """
+        Serve repeated inputs from the verdict cache and score the rest in one batch
+        
+        Args:
+            snapshot: ModelSnapshot to score with; its detector type ('url' or
+                      'message') is also the result key holding the input
+            inputs: List of URLs or messages
+            score: Function scoring a list of inputs with a snapshot
+        """
+        if self.verdict_cache is None:
+            return score(inputs, snapshot)
+        
+        detector_type = snapshot.detector_type
+        results = [None] * len(inputs)
+        missing = []
+        with stage(detector_type, 'cache_lookup'):
+            keys = [self._cache_key(snapshot, item) for item in inputs]
+            for i, key in enumerate(keys):
+                cached = self.verdict_cache.get(key) if key is not None else None
+                if cached is None:
+                    missing.append(i)
+                    continue
+                is_fake, confidence, reasons = cached
+                results[i] = {
+                    'is_fake': is_fake,
+                    'confidence': confidence,
+                    'reasons': list(reasons),
+                    detector_type: inputs[i]
+                }
+        
+        if missing:
+            scored = score([inputs[i] for i in missing], snapshot)
+            for i, result in zip(missing, scored):
+                results[i] = result
+                if keys[i] is not None:
+                    self.verdict_cache.put(
+                        keys[i], (result['is_fake'], result['confidence'], tuple(result['reasons']))
+                    )
+        return results
+    
+    def _cache_key(self, snapshot, item):
+        """
+        Verdict cache key: detector type, snapshot generation and normalized input
+        
+        URLs are keyed with the protocol the extractor would add, so
+        'example.com' and 'https://example.com' share one entry.
+        """
+        if not isinstance(item, str) or not item:
+            return None
+        if (snapshot.detector_type == 'url' and not item.startswith(('http://', 'https://'))
+                and not MALFORMED_PROTOCOL_PATTERN.match(item)):
+            item = 'https://' + item
+        return (snapshot.detector_type, snapshot.generation, item)
+    
+    def _install(self, snapshot):
+        """
+        Swap in a new snapshot for its detector type and drop stale cached verdicts
+        
+        Replacing one dict entry is atomic, so a detection sees either the old
+        snapshot or the new one, never a mix of both.
+        """
+        previous = self._snapshots[snapshot.detector_type]
+        self._snapshots[snapshot.detector_type] = snapshot.replace(generation=previous.generation + 1)
+        if self.verdict_cache is not None:
+            self.verdict_cache.invalidate()
+    
+    def _ensure_model(self, detector_type):
+        """Load a model on first use; returns True if it can score inputs"""
+        return self._snapshot(detector_type).loaded
+    
+    def _snapshot(self, detector_type):
+        """Current snapshot of a detector type, loading it on first use"""
+        snapshot = self._snapshots[detector_type]
+        if not snapshot.loaded:
+            with self._load_lock:
+                snapshot = self._snapshots[detector_type]
+                if not snapshot.loaded:
+                    loaded = self._read_snapshot(detector_type)
+                    if loaded is not None:
+                        self._install(loaded)
+                        snapshot = self._snapshots[detector_type]
+        return snapshot
+    
+    def reload_models(self, changed_only=True):
+        """
+        Re-read models from model_dir and swap in the ones that changed
+        
+        Loading happens in the calling thread (e.g. a background job) while
+        requests keep scoring with the current snapshots; each detector type
+        is then swapped in one step. Detector types that were never loaded
+        stay lazy, and a type whose models were removed keeps its snapshot.
+        
+        Args:
+            changed_only: Skip detector types whose bundle versions on disk
+                          match the loaded ones (legacy pickles are only
+                          re-read with changed_only=False)
+        
+        Returns:
+            list: Detector types that were swapped
+        
+        Raises:
+            ModelSchemaError: If a new bundle does not match the feature schema;
+                              the current snapshot stays in place
+        """
+        swapped = []
+        with self._load_lock:
+            for detector_type in DETECTOR_TYPES:
+                current = self._snapshots[detector_type]
+                if not current.loaded:
+                    continue
+                if changed_only and current.source == self._disk_source(detector_type):
+                    continue
+                snapshot = self._read_snapshot(detector_type)
+                if snapshot is not None:
+                    self._install(snapshot)
+                    swapped.append(detector_type)
+        return swapped
+    
+    def _predict_batch(self, snapshot, rows):
+        """
+        Score a batch of feature rows with a single predict_proba call
         
-        # Predict
-        predictions = self.message_model.predict(feature_vector_scaled)
-        prediction = int(predictions[0])  # type: ignore
-        probabilities = self.message_model.predict_proba(feature_vector_scaled)
-        proba_array = probabilities[0]  # type: ignore
-        confidence = float(proba_array[1] if prediction == 1 else proba_array[0])
+        Soft-voting predict() is the argmax of predict_proba(), so the label
+        is derived from the probabilities instead of running the ensemble twice.
+        The flat engine is used when loaded, so the model is never unpickled.
         
-        # Generate reasons
-        reasons = self._explain_message_result(features, prediction, confidence)
+        Returns:
+            tuple: (list of int predictions, list of float confidences)
+        """
+        if len(rows) == 0:
+            return [], []
+        
+        fast_stage = snapshot.fast_stage if self.use_cascade else None
+        if fast_stage is not None:
+            # Cascade: confident first-stage answers stand, the rest go to the full ensemble
+            with stage(snapshot.detector_type, 'fast_stage'):
+                probabilities, classes = fast_stage.predict_proba(rows, self.parallelism.workers(len(rows)))
+            escalate = np.flatnonzero(probabilities.max(axis=1) < fast_stage.threshold)
+            counts = self.cascade_counts[snapshot.detector_type]
+            with self._counts_lock:
+                counts['answered'] += len(rows) - len(escalate)
+                counts['escalated'] += len(escalate)
+            if len(escalate):
+                probabilities = probabilities.copy()
+                probabilities[escalate] = self._full_predict_proba(snapshot, np.asarray(rows)[escalate])[0]
+        else:
+            probabilities, classes = self._full_predict_proba(snapshot, rows)
+        best = probabilities.argmax(axis=1)
+        predictions = [int(label) for label in classes[best]]
+        confidences = [float(p) for p in probabilities[np.arange(len(best)), best]]
+        return predictions, confidences
+    
+    def _full_predict_proba(self, snapshot, rows):
+        """
+        Probabilities of the full ensemble (flat engine when loaded)
+        
+        The flat engine applies the scaler inside its arrays, so its time is
+        all 'predict_proba'; the scikit-learn path also reports 'transform'.
         
+        Returns:
+            tuple: (probabilities, classes)
+        """
+        detector_type = snapshot.detector_type
+        n_jobs = self.parallelism.workers(len(rows))
+        if snapshot.engine is not None:
+            with stage(detector_type, 'predict_proba'):
+                return snapshot.engine.predict_proba(rows, n_jobs=n_jobs), snapshot.engine.classes_
+        model = snapshot.model
+        with stage(detector_type, 'transform'):
+            scaled = snapshot.scaler.transform(np.asarray(rows))
+        with stage(detector_type, 'predict_proba'):
+            return sklearn_predict_proba(model, None, scaled, n_jobs), model.classes_
+    
+    def model_state(self):
+        """
+        Load state of both models, without loading anything
+        
+        Returns:
+            dict: {detector_type: {'loaded', 'version', 'generation', 'flat_engine', 'loaded_at'}}
+        """
+        return {detector_type: snapshot.state() for detector_type, snapshot in self._snapshots.items()}
+    
+    def cascade_stats(self):
+        """
+        Cascade gate and traffic split per detector type
+        
+        Returns:
+            dict: {detector_type: threshold, answered/escalated counts, escalation
+                   rate and the training-time gate report, or None without a first stage}
+        """
+        stats = {}
+        with self._counts_lock:
+            cascade_counts = {detector_type: dict(counts) for detector_type, counts in self.cascade_counts.items()}
+        for detector_type, counts in cascade_counts.items():
+            fast_stage = self._snapshots[detector_type].fast_stage
+            if fast_stage is None:
+                stats[detector_type] = None
+                continue
+            total = counts['answered'] + counts['escalated']
+            stats[detector_type] = dict(
+                counts,
+                enabled=self.use_cascade,
+                threshold=fast_stage.threshold,
+                escalation_rate=counts['escalated'] / total if total else None,
+                gate=fast_stage.gate,
+            )
+        return stats
+    
+    def export_flat_engine(self, detector_type):
+        """
+        Flatten a trained ensemble into contiguous NumPy arrays
+        
+        Args:
+            detector_type: 'url' or 'message'
+        
+        Returns:
+            FlatEnsemble: Engine that reproduces the model's predict_proba
+                          (including the scaler), or None if no model is trained
+        """
+        if detector_type not in DETECTOR_TYPES:
+            raise ValueError(f"Unknown detector type: {detector_type}")
+        
+        snapshot = self._snapshot(detector_type)
+        if not snapshot.model:
+            return None
+        return FlatEnsemble.from_voting_classifier(snapshot.model, scaler=snapshot.scaler)
+    
+    def _compile_engine(self, model, scaler):
+        """Build the flat engine for a model if enabled; fall back to scikit-learn if it cannot be flattened"""
+        if not self.use_flat_engine:
+            return None
+        try:
+            return FlatEnsemble.from_voting_classifier(model, scaler=scaler)
+        except ValueError:
+            return None
+    
+    def _train_fast_stage(self, detector_type, model, scaler, X_train_scaled, y_train, X_calibration, y_calibration,
+                          X_test, y_test, max_accuracy_loss):
+        """
+        Train the cascade's first stage, pick its gate on the calibration split
+        and report the gate's accuracy on the test split
+        
+        Returns:
+            FastStage: First stage with its gate report (threshold and calibration
+                       accuracies, 'test' accuracies and, when both stages flatten,
+                       the latency saving)
+        """
+        fast_model = train_fast_stage(X_train_scaled, y_train)
+        gate = choose_gate(
+            y_calibration, model.predict_proba(X_calibration), fast_model.predict_proba(X_calibration),
+            model.classes_, max_accuracy_loss
+        )
+        X_test_scaled = scaler.transform(X_test)
+        gate['test'] = gate_accuracy(
+            gate['threshold'], y_test, model.predict_proba(X_test_scaled), fast_model.predict_proba(X_test_scaled),
+            model.classes_
+        )
+        try:
+            fast_engine = FlatEnsemble.from_voting_classifier(fast_model, scaler=scaler)
+            full_engine = FlatEnsemble.from_voting_classifier(model, scaler=scaler)
+        except ValueError:
+            fast_engine = None
+        else:
+            gate = measure_latency(gate, full_engine, fast_engine, X_test)
+        
+        label = 'URL' if detector_type == 'url' else 'Message'
+        test = gate['test']
+        print(f"{label} cascade gate {gate['threshold']:.3f}: "
+              f"{test['escalation_rate']:.1%} of test inputs escalated, accuracy "
+              f"{test['cascade_accuracy']:.4f} (full model {test['full_accuracy']:.4f})")
+        if 'latency_saved' in gate:
+            print(f"  {gate['cascade_ms_per_row']:.3f} ms/input vs {gate['full_ms_per_row']:.3f} ms/input "
+                  f"for the full model ({gate['latency_saved']:.1%} saved)")
+        return FastStage(gate, model=fast_model, scaler=scaler, engine=fast_engine)
+    
+    def _model_not_trained_result(self):
+        """Result returned when no trained model is available"""
         return {
-            'is_fake': bool(prediction),
-            'confidence': float(confidence),
-            'reasons': reasons,
-            'message': message
+            'is_fake': False,
+            'confidence': 0.0,
+            'reasons': ['Model not trained. Please train the model first.']
         }
     
     def _explain_url_result(self, features, prediction, confidence):
@@ -351,40 +805,88 @@ class FakeDetector:
         return reasons
     
     def _save_url_model(self):
-        """Save URL model and scaler"""
+        """Save URL model and scaler as a new model bundle version"""
         if self.url_model:
-            with open(os.path.join(self.model_dir, 'url_model.pkl'), 'wb') as f:
-                pickle.dump(self.url_model, f)
-            with open(os.path.join(self.model_dir, 'url_scaler.pkl'), 'wb') as f:
-                pickle.dump(self.url_scaler, f)
+            save_bundle(
+                os.path.join(self.model_dir, 'url_bundle'), 'url', self.url_model, self.url_scaler,
+                self.url_extractor.get_feature_names(), URL_SCHEMA_VERSION
+            )
+            self._save_fast_stage('url', self.url_fast_stage, self.url_extractor, URL_SCHEMA_VERSION)
     
     def _save_message_model(self):
-        """Save message model and scaler"""
+        """Save message model and scaler as a new model bundle version"""
         if self.message_model:
-            with open(os.path.join(self.model_dir, 'message_model.pkl'), 'wb') as f:
-                pickle.dump(self.message_model, f)
-            with open(os.path.join(self.model_dir, 'message_scaler.pkl'), 'wb') as f:
-                pickle.dump(self.message_scaler, f)
-    
-    def _load_url_model(self):
-        """Load URL model and scaler"""
-        model_path = os.path.join(self.model_dir, 'url_model.pkl')
-        scaler_path = os.path.join(self.model_dir, 'url_scaler.pkl')
-        
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
-            with open(model_path, 'rb') as f:
-                self.url_model = pickle.load(f)
-            with open(scaler_path, 'rb') as f:
-                self.url_scaler = pickle.load(f)
-    
-    def _load_message_model(self):
-        """Load message model and scaler"""
-        model_path = os.path.join(self.model_dir, 'message_model.pkl')
-        scaler_path = os.path.join(self.model_dir, 'message_scaler.pkl')
-        
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
-            with open(model_path, 'rb') as f:
-                self.message_model = pickle.load(f)
-            with open(scaler_path, 'rb') as f:
-                self.message_scaler = pickle.load(f)
-
+            save_bundle(
+                os.path.join(self.model_dir, 'message_bundle'), 'message', self.message_model,
+                self.message_scaler, self.message_extractor.get_feature_names(), MESSAGE_SCHEMA_VERSION
+            )
+            self._save_fast_stage('message', self.message_fast_stage, self.message_extractor, MESSAGE_SCHEMA_VERSION)
+    
+    def _save_fast_stage(self, detector_type, fast_stage, extractor, schema_version):
+        """Save a freshly trained first stage as its own bundle, with the gate in the manifest"""
+        if fast_stage is not None and fast_stage.model is not None:
+            save_bundle(
+                os.path.join(self.model_dir, f'{detector_type}_fast_bundle'), detector_type, fast_stage.model,
+                fast_stage.scaler, extractor.get_feature_names(), schema_version, metadata={'gate': fast_stage.gate}
+            )
+    
+    def _read_snapshot(self, detector_type):
+        """
+        Read a detector type's model and first stage into a new snapshot
+        
+        Returns:
+            ModelSnapshot: Not yet installed, or None if no model exists
+        """
+        extractor = self.url_extractor if detector_type == 'url' else self.message_extractor
+        # Versions are read first: a bundle saved while loading is picked up by the next reload
+        source = self._disk_source(detector_type)
+        loaded = self._read_model(detector_type, extractor)
+        if not loaded:
+            return None
+        bundle, model, scaler, engine = loaded
+        return ModelSnapshot(detector_type, source=source, bundle=bundle, model=model, scaler=scaler,
+                             engine=engine, fast_stage=self._read_fast_stage(detector_type, extractor))
+    
+    def _disk_source(self, detector_type):
+        """Active bundle versions (model, first stage) of a detector type in model_dir"""
+        fast_root = os.path.join(self.model_dir, f'{detector_type}_fast_bundle')
+        return (current_version(os.path.join(self.model_dir, f'{detector_type}_bundle')),
+                current_version(fast_root) if self.use_cascade else None)
+    
+    def _read_model(self, detector_type, extractor):
+        """
+        Read a model from model_dir
+        
+        A bundle is preferred over legacy pickles. With the flat engine
+        enabled, its memory-mapped arrays are used and the scikit-learn
+        model is left on disk until something asks for it.
+        
+        Returns:
+            tuple: (bundle, model, scaler, engine), or None if no model exists
+        
+        Raises:
+            ModelSchemaError: If the bundle was trained on a different feature schema
+        """
+        bundle_root = os.path.join(self.model_dir, f'{detector_type}_bundle')
+        if bundle_exists(bundle_root):
+            bundle = load_bundle(bundle_root, extractor.get_feature_names())
+            if self.use_flat_engine and bundle.engine is not None:
+                return bundle, None, None, bundle.engine
+            return bundle, bundle.model, bundle.scaler, self._compile_engine(bundle.model, bundle.scaler)
+        
+        model_path = os.path.join(self.model_dir, f'{detector_type}_model.pkl')
+        scaler_path = os.path.join(self.model_dir, f'{detector_type}_scaler.pkl')
+        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+            return None
+        with open(model_path, 'rb') as f:
+            model = reset_n_jobs(pickle.load(f))
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+        return None, model, scaler, self._compile_engine(model, scaler)
+    
+    def _read_fast_stage(self, detector_type, extractor):
+        """Read the cascade's first stage from model_dir, or None if the cascade is off or was never trained"""
+        root = os.path.join(self.model_dir, f'{detector_type}_fast_bundle')
+        if not self.use_cascade or not bundle_exists(root):
+            return None
+        return FastStage.from_bundle(load_bundle(root, extractor.get_feature_names()))
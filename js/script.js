@@ -181,6 +181,7 @@ if (generateChartBtn) {
     generateChartBtn.addEventListener('click', async () => {
         const dataset = document.getElementById('dataset-select').value;
         const chart = document.getElementById('chart-select').value;
+        const days = parseInt(document.getElementById('period-select').value, 10);
         const chartArea = document.getElementById('chart-area');
 
         chartArea.innerHTML = '<div class="loading"><i class="fas fa-spinner"></i><p>Generating chart...</p></div>';
@@ -189,7 +190,7 @@ if (generateChartBtn) {
             const response = await fetch('/analytics', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ filter_type: dataset, chart_type: chart })
+                body: JSON.stringify({ filter_type: dataset, chart_type: chart, days: days })
             });
             const data = await response.json();
             if (!data.success) {
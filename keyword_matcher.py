@@ -0,0 +1,89 @@
+"""
+Keyword Matcher
+Aho-Corasick automaton that finds the keywords of several lists in one pass over a text
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """Counts how many keywords of each category occur in a text"""
+
+    def __init__(self, categories):
+        """
+        Build the automaton for all keyword lists at once
+
+        Args:
+            categories: Mapping of category name to list of keywords
+        """
+        self.categories = list(categories)
+        self._empty_hits = [0] * len(self.categories)
+
+        # Trie over the distinct keywords; a keyword listed in several
+        # categories (or twice in one list) counts once per listing
+        goto = [{}]
+        keyword_categories = []
+        keyword_ids = {}
+        for index, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                if not keyword:
+                    # '' in text is always True
+                    self._empty_hits[index] += 1
+                    continue
+                if keyword not in keyword_ids:
+                    state = 0
+                    for ch in keyword:
+                        if ch not in goto[state]:
+                            goto.append({})
+                            goto[state][ch] = len(goto) - 1
+                        state = goto[state][ch]
+                    keyword_ids[keyword] = (state, len(keyword_categories))
+                    keyword_categories.append([])
+                keyword_categories[keyword_ids[keyword][1]].append(index)
+
+        outputs = [() for _ in goto]
+        for state, keyword_id in keyword_ids.values():
+            outputs[state] = (keyword_id,)
+
+        # Breadth-first pass: resolve failure links into a full transition
+        # table so scanning is one dict lookup per character
+        transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = transitions[fail[state]]
+            transitions[state] = {**fallback, **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fail[child] = fallback.get(ch, 0)
+                queue.append(child)
+
+        self._transitions = transitions
+        self._outputs = outputs
+        self._keyword_categories = keyword_categories
+
+    def count(self, text):
+        """
+        Count keyword hits per category
+
+        Same result as ``sum(1 for keyword in keywords if keyword in text)``
+        for every category, but the text is scanned only once.
+
+        Returns:
+            dict: Category name to number of its keywords found in text
+        """
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+
+        hits = list(self._empty_hits)
+        for keyword_id in found:
+            for index in self._keyword_categories[keyword_id]:
+                hits[index] += 1
+        return dict(zip(self.categories, hits))
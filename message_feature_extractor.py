@@ -3,9 +3,28 @@ Message Feature Extractor
 Extracts linguistic and structural features from messages to detect fake/spam content
 """
 
-import re
-import math
-from collections import Counter
+from keyword_matcher import KeywordMatcher
+from text_scanner import (
+    EMAIL_PATTERN, PHONE_PATTERN, SENTENCE_BREAK_PATTERN, URL_PATTERN,
+    count_repeated_runs, scan_chars, scan_words,
+)
+
+# Feature order of extract_features; models are trained against this exact
+# order, so bump FEATURE_SCHEMA_VERSION whenever it changes.
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_NAMES = (
+    'message_length', 'word_count', 'char_count', 'sentence_count',
+    'avg_word_length', 'uppercase_count', 'lowercase_count',
+    'digit_count', 'special_char_count', 'exclamation_count',
+    'question_mark_count', 'all_caps_ratio', 'url_count', 'has_url',
+    'suspicious_phrase_count', 'has_suspicious_phrase', 'suspicious_phrase_weight',
+    'urgency_word_count', 'has_urgency', 'urgency_weight',
+    'financial_keyword_count', 'has_financial_keywords',
+    'authority_keyword_count', 'has_authority_keywords', 'entropy',
+    'punctuation_density', 'max_word_repetition', 'unique_word_ratio',
+    'email_count', 'phone_count', 'typo_indicators',
+    'url_to_word_ratio', 'suspicious_to_word_ratio'
+)
 
 
 class MessageFeatureExtractor:
@@ -38,6 +57,14 @@ class MessageFeatureExtractor:
             'irs', 'fbi', 'police', 'court', 'government', 'official',
             'legal', 'warrant', 'arrest', 'lawsuit'
         ]
+        
+        # One automaton over all keyword lists, so a message is scanned once
+        self.keyword_matcher = KeywordMatcher({
+            'suspicious_phrase': self.suspicious_phrases,
+            'urgency_word': self.urgency_words,
+            'financial_keyword': self.financial_keywords,
+            'authority_keyword': self.authority_keywords,
+        })
     
     def extract_features(self, message):
         """
@@ -50,70 +77,68 @@ class MessageFeatureExtractor:
             return self._get_default_features()
         
         message_lower = message.lower()
+        chars = scan_chars(message)
+        words = scan_words(message)
         features = {}
         
         # Basic text features
         features['message_length'] = len(message)
-        features['word_count'] = len(message.split())
-        features['char_count'] = len(message.replace(' ', ''))
-        features['sentence_count'] = len(re.split(r'[.!?]+', message))
-        features['avg_word_length'] = sum(len(word) for word in message.split()) / max(len(message.split()), 1)
+        features['word_count'] = words.word_count
+        features['char_count'] = len(message) - chars.counts[' ']
+        features['sentence_count'] = len(SENTENCE_BREAK_PATTERN.split(message))
+        features['avg_word_length'] = words.total_word_length / max(words.word_count, 1)
         
         # Character type features
-        features['uppercase_count'] = sum(1 for c in message if c.isupper())
-        features['lowercase_count'] = sum(1 for c in message if c.islower())
-        features['digit_count'] = sum(1 for c in message if c.isdigit())
-        features['special_char_count'] = sum(1 for c in message if c in '!@#$%^&*()_+-=[]{}|;:,.<>?')
-        features['exclamation_count'] = message.count('!')
-        features['question_mark_count'] = message.count('?')
+        features['uppercase_count'] = chars.uppercase_count
+        features['lowercase_count'] = chars.lowercase_count
+        features['digit_count'] = chars.digit_count
+        features['special_char_count'] = chars.special_char_count
+        features['exclamation_count'] = chars.counts['!']
+        features['question_mark_count'] = chars.counts['?']
         features['all_caps_ratio'] = features['uppercase_count'] / max(len(message), 1)
         
         # URL/Link features in message
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        urls = re.findall(url_pattern, message)
+        urls = URL_PATTERN.findall(message)
         features['url_count'] = len(urls)
         features['has_url'] = 1 if len(urls) > 0 else 0
         
+        keyword_hits = self.keyword_matcher.count(message_lower)
+        
         # Suspicious phrase features (more sensitive)
-        features['suspicious_phrase_count'] = sum(1 for phrase in self.suspicious_phrases if phrase in message_lower)
+        features['suspicious_phrase_count'] = keyword_hits['suspicious_phrase']
         features['has_suspicious_phrase'] = 1 if features['suspicious_phrase_count'] > 0 else 0
         # Add weight for multiple suspicious phrases
         features['suspicious_phrase_weight'] = min(features['suspicious_phrase_count'] * 0.5, 3.0)
         
         # Urgency features (more sensitive)
-        features['urgency_word_count'] = sum(1 for word in self.urgency_words if word in message_lower)
+        features['urgency_word_count'] = keyword_hits['urgency_word']
         features['has_urgency'] = 1 if features['urgency_word_count'] > 0 else 0
         # Add weight for urgency
         features['urgency_weight'] = min(features['urgency_word_count'] * 0.3, 2.0)
         
         # Financial scam features
-        features['financial_keyword_count'] = sum(1 for keyword in self.financial_keywords if keyword in message_lower)
+        features['financial_keyword_count'] = keyword_hits['financial_keyword']
         features['has_financial_keywords'] = 1 if features['financial_keyword_count'] > 0 else 0
         
         # Authority impersonation features
-        features['authority_keyword_count'] = sum(1 for keyword in self.authority_keywords if keyword in message_lower)
+        features['authority_keyword_count'] = keyword_hits['authority_keyword']
         features['has_authority_keywords'] = 1 if features['authority_keyword_count'] > 0 else 0
         
         # Linguistic features
-        features['entropy'] = self._calculate_entropy(message)
+        features['entropy'] = chars.entropy
         features['punctuation_density'] = features['special_char_count'] / max(len(message), 1)
         
         # Repetition features (spam often has repeated words)
-        words = message_lower.split()
-        if words:
-            word_freq = Counter(words)
-            most_common_count = word_freq.most_common(1)[0][1] if word_freq else 0
-            features['max_word_repetition'] = most_common_count
-            features['unique_word_ratio'] = len(set(words)) / max(len(words), 1)
+        if words.word_count:
+            features['max_word_repetition'] = words.max_word_repetition
+            features['unique_word_ratio'] = words.unique_word_count / words.word_count
         else:
             features['max_word_repetition'] = 0
             features['unique_word_ratio'] = 0
         
         # Email/phone pattern features
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-        features['email_count'] = len(re.findall(email_pattern, message))
-        features['phone_count'] = len(re.findall(phone_pattern, message))
+        features['email_count'] = len(EMAIL_PATTERN.findall(message))
+        features['phone_count'] = len(PHONE_PATTERN.findall(message))
         
         # Grammar/spelling indicators (very basic - high ratio might indicate issues)
         features['typo_indicators'] = self._count_potential_typos(message)
@@ -130,18 +155,12 @@ class MessageFeatureExtractor:
     
     def _calculate_entropy(self, text):
         """Calculate Shannon entropy of text"""
-        if not text:
-            return 0
-        
-        prob = [float(text.count(c)) / len(text) for c in dict.fromkeys(list(text))]
-        entropy = -sum([p * math.log2(p) for p in prob if p > 0])
-        return entropy
+        return scan_chars(text).entropy
     
     def _count_potential_typos(self, text):
         """Count potential typo indicators (repeated characters, unusual patterns)"""
         # Count repeated characters (like "loooook", "freeee")
-        repeated_chars = len(re.findall(r'(.)\1{2,}', text))
-        return repeated_chars
+        return count_repeated_runs(text)
     
     def _get_default_features(self):
         """Return default feature values for invalid messages"""
@@ -150,8 +169,9 @@ class MessageFeatureExtractor:
             'avg_word_length': 0, 'uppercase_count': 0, 'lowercase_count': 0,
             'digit_count': 0, 'special_char_count': 0, 'exclamation_count': 0,
             'question_mark_count': 0, 'all_caps_ratio': 0, 'url_count': 0, 'has_url': 0,
-            'suspicious_phrase_count': 0, 'has_suspicious_phrase': 0, 'urgency_word_count': 0,
-            'has_urgency': 0, 'financial_keyword_count': 0, 'has_financial_keywords': 0,
+            'suspicious_phrase_count': 0, 'has_suspicious_phrase': 0, 'suspicious_phrase_weight': 0,
+            'urgency_word_count': 0, 'has_urgency': 0, 'urgency_weight': 0,
+            'financial_keyword_count': 0, 'has_financial_keywords': 0,
             'authority_keyword_count': 0, 'has_authority_keywords': 0, 'entropy': 0,
             'punctuation_density': 0, 'max_word_repetition': 0, 'unique_word_ratio': 0,
             'email_count': 0, 'phone_count': 0, 'typo_indicators': 0,
@@ -160,5 +180,5 @@ class MessageFeatureExtractor:
     
     def get_feature_names(self):
         """Get list of all feature names"""
-        return list(self._get_default_features().keys())
+        return list(FEATURE_NAMES)
 
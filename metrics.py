@@ -0,0 +1,363 @@
+"""
+Metrics
+Latency histograms and counters for the detection path, exported in Prometheus text format
+"""
+
+import contextlib
+import itertools
+import json
+import math
+import os
+import threading
+import time
+
+# Upper bounds in seconds; most stages take well under a millisecond, DB writes up to seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_enabled = os.getenv('METRICS', '1') != '0'
+# Shared no-op timer: with metrics disabled a timed stage costs one function call
+_NOOP = contextlib.nullcontext()
+# Per-thread durations of the current request (or micro-batch), for the Server-Timing header
+_local = threading.local()
+
+
+def enabled():
+    """True if timers and counters are recording"""
+    return _enabled
+
+
+def set_enabled(flag):
+    """Turn recording on or off for the whole process (default: METRICS env var, on unless '0')"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+class Histogram:
+    """Cumulative latency histogram per label combination"""
+
+    def __init__(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name: Metric name
+            help: One-line description for the HELP line
+            label_names: Names of the label values passed to observe()
+            buckets: Bucket upper bounds in seconds, ascending (+Inf is added)
+        """
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, seconds, labels=()):
+        """Record one duration for a tuple of label values"""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += seconds
+
+    def time(self, labels=(), timing_name=None):
+        """
+        Context manager timing its block (a shared no-op while metrics are disabled)
+
+        Args:
+            labels: Label values of the observation
+            timing_name: Also add the duration to the current Server-Timing under this name
+        """
+        if not _enabled:
+            return _NOOP
+        return _Timer(self, labels, timing_name)
+
+    def dump(self):
+        """Raw series as JSON-able lists, for adding up across processes (see Registry.share)"""
+        with self._lock:
+            return [[list(labels), list(counts), total] for labels, (counts, total) in self._series.items()]
+
+    def collect(self, dumps=()):
+        """
+        Args:
+            dumps: dump() results of other processes to add in
+
+        Returns:
+            tuple: (name, 'histogram', help, list of (labels dict, suffix, value) samples)
+        """
+        merged = {}
+        for labels, counts, total in itertools.chain(self.dump(), *dumps):
+            labels = tuple(labels)
+            if labels in merged:
+                series = merged[labels]
+                merged[labels] = [[a + b for a, b in zip(series[0], counts)], series[1] + total]
+            else:
+                merged[labels] = [list(counts), total]
+        samples = []
+        for labels, (counts, total) in sorted(merged.items()):
+            labels = dict(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((dict(labels, le=_format_bound(bound)), '_bucket', cumulative))
+            samples.append((labels, '_sum', total))
+            samples.append((labels, '_count', cumulative))
+        return self.name, 'histogram', self.help, samples
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dump(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def collect(self, dumps=()):
+        merged = {}
+        for labels, value in itertools.chain(self.dump(), *dumps):
+            labels = tuple(labels)
+            merged[labels] = merged.get(labels, 0) + value
+        samples = [(dict(zip(self.label_names, labels)), '', value) for labels, value in sorted(merged.items())]
+        return self.name, 'counter', self.help, samples
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'timing_name', 'start')
+
+    def __init__(self, histogram, labels, timing_name):
+        self.histogram = histogram
+        self.labels = labels
+        self.timing_name = timing_name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        self.histogram.observe(seconds, self.labels)
+        if self.timing_name is not None:
+            add_timing(self.timing_name, seconds)
+        return False
+
+
+class Registry:
+    """
+    Metrics and stats collectors rendered together by render()
+
+    Each process counts on its own. Pre-forked workers (serve.py) share() a
+    directory: every worker writes its values to <directory>/<pid>.json and
+    render() adds up the histograms and counters of all files, so whichever
+    worker answers a scrape reports totals for the whole server. Collector
+    values describe one process's cache, pools and queues, so they are
+    reported per worker with a 'worker' label instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = []
+        self._directory = None
+
+    def share(self, directory):
+        """Add up the metrics of every process writing to directory (None: this process only)"""
+        self._directory = directory
+
+    def write(self):
+        """Write this process's values to the shared directory (no-op unless shared)"""
+        directory = self._directory
+        if directory is None:
+            return
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        values = {
+            'metrics': {metric.name: metric.dump() for metric in metrics},
+            'collected': [family for collect in collectors for family in collect()],
+        }
+        _write_json(os.path.join(directory, f'{os.getpid()}.json'), values)
+
+    def retire(self, pid):
+        """
+        Keep only the histograms and counters of an exited worker
+
+        Its requests stay in the totals, so counters never go backwards
+        when a worker is replaced; its collector values are dropped.
+        """
+        if self._directory is None:
+            return
+        path = os.path.join(self._directory, f'{pid}.json')
+        values = _read_json(path)
+        if values is not None and values['collected']:
+            _write_json(path, dict(values, collected=[]))
+
+    def register(self, metric):
+        """Add a Histogram or Counter; returns it"""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        Add a callable run on every scrape, returning a list of
+        (name, type, help, list of (labels dict, value)) for values kept elsewhere
+        (e.g. the verdict cache or connection pool counters)
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        others = self._other_processes()
+        families = [
+            metric.collect([values['metrics'].get(metric.name, []) for values in others.values()])
+            for metric in metrics
+        ]
+        collected = [(None, family) for collect in collectors for family in collect()]
+        collected += [(pid, family) for pid, values in sorted(others.items()) for family in values['collected']]
+        if self._directory is None:
+            for _, (name, kind, help, samples) in collected:
+                families.append((name, kind, help, [(labels, '', value) for labels, value in samples]))
+        else:
+            # One family per name, holding the samples of every live worker
+            by_name = {}
+            for pid, (name, kind, help, samples) in collected:
+                worker = str(pid or os.getpid())
+                family = by_name.setdefault(name, (name, kind, help, []))
+                family[3].extend((dict(labels, worker=worker), '', value) for labels, value in samples)
+            families.extend(by_name.values())
+
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, suffix, value in samples:
+                lines.append(f'{name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _other_processes(self):
+        """{pid: written values} of the other processes sharing the directory"""
+        if self._directory is None:
+            return {}
+        others = {}
+        for filename in os.listdir(self._directory):
+            pid, extension = os.path.splitext(filename)
+            if extension != '.json' or pid == str(os.getpid()):
+                continue
+            values = _read_json(os.path.join(self._directory, filename))
+            if values is not None:
+                others[int(pid)] = values
+        return others
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, values):
+    # Written aside and renamed, so a scrape never reads half a file
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(values, f)
+    os.replace(temporary, path)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'fake_detection_stage_seconds', 'Time spent in each stage of scoring a batch of inputs', ('detector', 'stage')
+))
+DB_SECONDS = REGISTRY.register(Histogram(
+    'fake_detection_db_seconds', 'Time spent in detection database writes', ('operation',)
+))
+
+
+def stage(detector_type, name):
+    """Time one stage of a detection batch (STAGE_SECONDS), also reported in Server-Timing"""
+    if not _enabled:
+        return _NOOP
+    return _Timer(STAGE_SECONDS, (detector_type, name), name)
+
+
+def begin_timing():
+    """Start collecting Server-Timing durations in this thread"""
+    if _enabled:
+        _local.timings = {}
+
+
+def end_timing():
+    """
+    Stop collecting in this thread
+
+    Returns:
+        dict: {name: seconds} recorded since begin_timing(), empty if none
+    """
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings or {}
+
+
+def add_timing(name, seconds):
+    """Add a duration to this thread's Server-Timing, if one is being collected"""
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def add_timings(timings):
+    """Add durations recorded in another thread (e.g. the micro-batch that scored a request)"""
+    for name, seconds in timings.items():
+        add_timing(name, seconds)
+
+
+def server_timing_header(timings):
+    """Server-Timing header value, durations in milliseconds"""
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in timings.items())
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
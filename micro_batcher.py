@@ -0,0 +1,192 @@
+"""
+Micro Batcher
+Coalesces concurrent single-item requests into one batched model call
+"""
+
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+
+class BatchTimeout(RuntimeError):
+    """Raised when a submitted item was not scored within the batcher's timeout"""
+
+
+class _Pending:
+    """One submitted item waiting for its result"""
+
+    __slots__ = ('item', 'queued_at', 'done', 'result', 'error', 'timings')
+
+    def __init__(self, item):
+        self.item = item
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Stage durations of the batch that scored the item, plus its queue wait
+        self.timings = None
+
+
+class MicroBatcher:
+    """
+    Gather items submitted by concurrent threads and score them together
+
+    A batch closes when it holds ``max_batch_size`` items or when its first
+    item has waited ``max_wait`` seconds, whichever comes first. One worker
+    thread per process scores batches; items arriving while a batch is being
+    scored form the next one, so under load batches grow without any extra
+    wait, and a lone request waits at most ``max_wait``.
+    """
+
+    def __init__(self, score_batch, max_batch_size=32, max_wait=0.002, name='micro-batcher', timeout=30.0):
+        """
+        Args:
+            score_batch: Called with a list of items, returns a list of results in the same order
+            max_batch_size: Items per batch; 1 or less scores every item in its caller's thread
+            max_wait: Seconds the first item of a batch waits for others to join
+            name: Worker thread name
+            timeout: Seconds submit() waits for a result before raising BatchTimeout
+        """
+        self._score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._queue = queue.Queue()
+        # Batch size histogram: upper bounds 1, 2, 4, ... up to max_batch_size
+        self._size_bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            self._size_bounds.append(bound)
+            bound *= 2
+        self._size_bounds.append(max(max_batch_size, 1))
+        self._size_counts = [0] * len(self._size_bounds)
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def enabled(self):
+        return self.max_batch_size > 1
+
+    def submit(self, item):
+        """
+        Score one item as part of the next batch, blocking until its result is ready
+
+        Raises:
+            BatchTimeout: If the item was not scored within the timeout
+            Exception: Whatever score_batch raised for the batch holding this item
+        """
+        if not self.enabled:
+            result, = self._score_batch([item])
+            self._record(1, [0.0])
+            return result
+
+        pending = _Pending(item)
+        with self._lock:
+            self._ensure_thread()
+            self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise BatchTimeout(f"{self.name}: no result within {self.timeout:g}s")
+        if pending.timings:
+            # Reported in the submitting request's Server-Timing header
+            metrics.add_timings(pending.timings)
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _ensure_thread(self):
+        # Called with the lock held; a forked worker starts its own thread and queue,
+        # and a thread that died is replaced, picking up the items still queued
+        if self._pid == os.getpid():
+            if self._thread.is_alive():
+                return
+            self.restarts += 1
+        else:
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(self._queue,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self, pending_queue):
+        while True:
+            batch = [pending_queue.get()]
+            deadline = batch[0].queued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, still take whatever is already queued
+                    if remaining > 0:
+                        batch.append(pending_queue.get(timeout=remaining))
+                    else:
+                        batch.append(pending_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        metrics.begin_timing()
+        try:
+            results = self._score_batch([pending.item for pending in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"score_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as exc:  # every waiting request sees the error; the worker keeps going
+            with self._lock:
+                self.failed_batches += 1
+            for pending in batch:
+                pending.error = exc
+        else:
+            for pending, result in zip(batch, results):
+                pending.result = result
+        timings = metrics.end_timing()
+        waits = [started - pending.queued_at for pending in batch]
+        if metrics.enabled():
+            for pending, wait in zip(batch, waits):
+                pending.timings = dict(timings, batch_wait=wait)
+        self._record(len(batch), waits)
+        for pending in batch:
+            pending.done.set()
+
+    def _record(self, size, waits):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            for i, bound in enumerate(self._size_bounds):
+                if size <= bound:
+                    self._size_counts[i] += 1
+                    break
+            self.wait_seconds += sum(waits)
+            self.max_wait_seconds = max(self.max_wait_seconds, *waits)
+
+    def stats(self):
+        """Batch size distribution and queue wait of the items scored so far"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize() if self._pid == os.getpid() else 0,
+                'batches': self.batches,
+                'items': self.items,
+                'failed_batches': self.failed_batches,
+                'timeouts': self.timeouts,
+                'restarts': self.restarts,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+                # {upper bound: batches with at most that many items (and more than the previous bound)}
+                'batch_sizes': dict(zip(self._size_bounds, self._size_counts)),
+                'mean_queue_wait_ms': self.wait_seconds / self.items * 1000 if self.items else 0.0,
+                'max_queue_wait_ms': self.max_wait_seconds * 1000,
+            }
@@ -0,0 +1,290 @@
+"""
+Model Bundle
+Versioned on-disk format holding a detector's model, scaler, feature schema and flat engine
+
+Layout of a bundle root (e.g. models/url_bundle/):
+
+    CURRENT                 version of the active bundle
+    <version>/manifest.json format version, feature names, engine layout
+    <version>/model.pkl     the scikit-learn model (only unpickled when needed)
+    <version>/scaler.pkl    the fitted StandardScaler
+    <version>/engine/*.npy  flattened tree arrays, memory-mapped read-only on load
+    .leases/                one file per loaded bundle: <version>.<pid>.<suffix>
+
+Versions are content hashes, and CURRENT is replaced atomically, so a
+reader never sees a half-written bundle. A loaded bundle holds a lease
+on its version until it is garbage collected (every snapshot using it is
+gone) or its process exits, and saving never prunes a leased version:
+the model and scaler are unpickled lazily, possibly long after loading.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from parallelism import reset_n_jobs
+from tree_engine import FlatEnsemble
+
+# 2: engine arrays include the scaler ('input_mean', 'input_scale')
+BUNDLE_FORMAT_VERSION = 2
+CURRENT_FILE = 'CURRENT'
+LEASES_DIR = '.leases'
+
+
+class ModelSchemaError(ValueError):
+    """Raised when a bundle cannot be used with the current feature extractor"""
+
+
+class ModelBundle:
+    """
+    A loaded bundle
+
+    The scikit-learn model and scaler are unpickled on first use, so
+    scoring with the engine never imports scikit-learn.
+    """
+
+    def __init__(self, directory, manifest, engine):
+        self.directory = directory
+        self.manifest = manifest
+        self.version = manifest['model_version']
+        self.detector_type = manifest['detector_type']
+        self.feature_names = manifest['feature_names']
+        self.engine = engine
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The scikit-learn model (unpickled once, on first access, with its training n_jobs cleared)"""
+        return self._unpickle('model.pkl', prepare=reset_n_jobs)
+
+    @property
+    def scaler(self):
+        """The fitted StandardScaler (unpickled once, on first access)"""
+        return self._unpickle('scaler.pkl')
+
+    def _unpickle(self, filename, prepare=None):
+        if filename not in self._objects:
+            with self._lock:
+                if filename not in self._objects:
+                    with open(os.path.join(self.directory, filename), 'rb') as f:
+                        value = pickle.load(f)
+                    self._objects[filename] = prepare(value) if prepare is not None else value
+        return self._objects[filename]
+
+
+def bundle_exists(root):
+    """Check if a bundle root has an active version"""
+    return os.path.exists(os.path.join(root, CURRENT_FILE))
+
+
+def current_version(root):
+    """Version string of the active bundle, or None"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_bundle(root, detector_type, model, scaler, feature_names, schema_version=None, keep=2, metadata=None):
+    """
+    Write a model as a new bundle version and make it the active one
+
+    Args:
+        root: Bundle root directory (e.g. models/url_bundle)
+        detector_type: 'url' or 'message'
+        model: Fitted VotingClassifier
+        scaler: Fitted StandardScaler
+        feature_names: Feature column order the model was trained with
+        schema_version: Feature schema version of the extractor
+        keep: Number of most recent versions to keep on disk
+        metadata: Optional JSON-serializable dict stored in the manifest
+
+    Returns:
+        str: The new bundle version
+    """
+    import sklearn
+
+    model_bytes = pickle.dumps(model)
+    scaler_bytes = pickle.dumps(scaler)
+    digest = hashlib.sha256(model_bytes + scaler_bytes)
+    if metadata:
+        digest.update(json.dumps(metadata, sort_keys=True).encode('utf-8'))
+    version = digest.hexdigest()[:16]
+
+    try:
+        engine = FlatEnsemble.from_voting_classifier(model, scaler=scaler)
+    except ValueError:
+        engine = None
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'detector_type': detector_type,
+        'model_version': version,
+        'feature_names': list(feature_names),
+        'feature_schema_version': schema_version,
+        'sklearn_version': sklearn.__version__,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'engine': None,
+        'metadata': metadata or {},
+    }
+
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, version)
+    if not os.path.isdir(target):
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+        os.chmod(staging, 0o755)
+        with open(os.path.join(staging, 'model.pkl'), 'wb') as f:
+            f.write(model_bytes)
+        with open(os.path.join(staging, 'scaler.pkl'), 'wb') as f:
+            f.write(scaler_bytes)
+        if engine is not None:
+            os.makedirs(os.path.join(staging, 'engine'))
+            for name, array in engine.arrays.items():
+                np.save(os.path.join(staging, 'engine', name + '.npy'), np.ascontiguousarray(array))
+            manifest['engine'] = {
+                'arrays': sorted(engine.arrays),
+                'members': engine.members,
+                'classes': engine.classes_.tolist(),
+                'depth': engine.depth,
+            }
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(staging, target)
+
+    _write_current(root, version)
+    _prune(root, version, keep)
+    return version
+
+
+def load_bundle(root, feature_names, mmap=True, version=None):
+    """
+    Load the active (or a given) bundle version
+
+    Args:
+        root: Bundle root directory
+        feature_names: Feature column order of the current extractor
+        mmap: Memory-map the engine arrays read-only instead of reading them
+        version: Specific version to load (default: the one in CURRENT)
+
+    Returns:
+        ModelBundle: The loaded bundle
+
+    Raises:
+        ModelSchemaError: If the bundle format or feature schema does not match
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model bundle in {root}")
+    directory = os.path.join(root, version)
+    with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ModelSchemaError(
+            f"Model bundle {directory} has format version {manifest.get('format_version')}, "
+            f"expected {BUNDLE_FORMAT_VERSION}"
+        )
+    if manifest['feature_names'] != list(feature_names):
+        raise ModelSchemaError(
+            f"Model bundle {directory} was trained on a different feature schema "
+            f"(schema version {manifest.get('feature_schema_version')}); retrain the model"
+        )
+
+    engine = None
+    if manifest.get('engine'):
+        layout = manifest['engine']
+        arrays = {}
+        for name in layout['arrays']:
+            path = os.path.join(directory, 'engine', name + '.npy')
+            if mmap:
+                arrays[name] = np.load(path, mmap_mode='r').view(np.ndarray)
+            else:
+                arrays[name] = np.load(path)
+        engine = FlatEnsemble(arrays, layout['members'], layout['classes'], layout['depth'])
+
+    bundle = ModelBundle(directory, manifest, engine)
+    lease = _take_lease(root, version)
+    if lease is not None:
+        weakref.finalize(bundle, _release_lease, lease)
+    return bundle
+
+
+def _write_current(root, version):
+    fd, tmp_path = tempfile.mkstemp(prefix='.current-', dir=root)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _take_lease(root, version):
+    """Lease file marking a version as in use by this process, or None if it cannot be written"""
+    try:
+        leases = os.path.join(root, LEASES_DIR)
+        os.makedirs(leases, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f'{version}.{os.getpid()}.', dir=leases)
+        os.close(fd)
+        return path
+    except OSError:
+        # A read-only model directory: nothing can be pruned from it either
+        return None
+
+
+def _release_lease(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _leased_versions(root):
+    """Versions leased by a running process; leases of exited processes are removed"""
+    leases = os.path.join(root, LEASES_DIR)
+    try:
+        entries = os.listdir(leases)
+    except FileNotFoundError:
+        return set()
+    leased = set()
+    for entry in entries:
+        version, _, rest = entry.partition('.')
+        pid = rest.partition('.')[0]
+        if not pid.isdigit() or _process_alive(int(pid)):
+            leased.add(version)
+        else:
+            _release_lease(os.path.join(leases, entry))
+    return leased
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows; keep the lease
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _prune(root, current, keep):
+    """Remove all but the ``keep`` most recent versions (never the current one or a leased one)"""
+    versions = [
+        entry for entry in os.listdir(root)
+        if not entry.startswith('.') and entry != CURRENT_FILE and os.path.isdir(os.path.join(root, entry))
+    ]
+    versions.sort(key=lambda entry: os.path.getmtime(os.path.join(root, entry)), reverse=True)
+    leased = _leased_versions(root)
+    for entry in versions[keep:]:
+        if entry != current and entry not in leased:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
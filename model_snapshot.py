@@ -0,0 +1,93 @@
+"""
+Model Snapshot
+Immutable set of the model, scaler, engine and first stage that score one detector type
+"""
+
+import time
+
+_FIELDS = ('detector_type', 'generation', 'source', 'bundle', 'model', 'scaler', 'engine', 'fast_stage')
+
+
+class ModelSnapshot:
+    """
+    Everything one detector type scores with, replaced as a unit
+
+    A detection reads the detector's snapshot once and uses it for the whole
+    batch, so a reload that swaps in a new snapshot can never pair a new
+    model with an old scaler; requests already scoring finish on the old one.
+
+    The model and scaler of a bundle snapshot are unpickled from the bundle
+    on first access (the flat engine never needs them).
+    """
+
+    __slots__ = tuple('_' + field for field in _FIELDS) + ('loaded_at',)
+
+    def __init__(self, detector_type, generation=0, source=None, bundle=None, model=None, scaler=None,
+                 engine=None, fast_stage=None):
+        """
+        Args:
+            detector_type: 'url' or 'message'
+            generation: Bumped on every swap; part of the verdict cache keys
+            source: On-disk versions the snapshot was read from (see FakeDetector.reload_models)
+            bundle: Loaded ModelBundle, None for trained or legacy models
+            model: Fitted VotingClassifier (default: the bundle's, unpickled when needed)
+            scaler: Fitted StandardScaler (default: the bundle's)
+            engine: FlatEnsemble to score with, if enabled
+            fast_stage: Cascade first stage (cascade.FastStage)
+        """
+        values = dict(detector_type=detector_type, generation=generation, source=source, bundle=bundle,
+                      model=model, scaler=scaler, engine=engine, fast_stage=fast_stage)
+        for field in _FIELDS:
+            object.__setattr__(self, '_' + field, values[field])
+        object.__setattr__(self, 'loaded_at', time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelSnapshot is immutable; use replace()")
+
+    detector_type = property(lambda self: self._detector_type)
+    generation = property(lambda self: self._generation)
+    source = property(lambda self: self._source)
+    bundle = property(lambda self: self._bundle)
+    engine = property(lambda self: self._engine)
+    fast_stage = property(lambda self: self._fast_stage)
+
+    @property
+    def model(self):
+        if self._model is None and self._bundle is not None:
+            return self._bundle.model
+        return self._model
+
+    @property
+    def scaler(self):
+        if self._scaler is None and self._bundle is not None:
+            return self._bundle.scaler
+        return self._scaler
+
+    @property
+    def loaded(self):
+        """True if the snapshot can score inputs"""
+        return self._engine is not None or self._model is not None or self._bundle is not None
+
+    @property
+    def version(self):
+        """Bundle version, or None for trained or legacy models"""
+        return self._bundle.version if self._bundle is not None else None
+
+    def replace(self, **changes):
+        """New snapshot with some fields changed"""
+        values = {field: getattr(self, '_' + field) for field in _FIELDS}
+        unknown = set(changes) - set(values)
+        if unknown:
+            raise TypeError(f"Unknown snapshot fields: {', '.join(sorted(unknown))}")
+        values.update(changes)
+        return ModelSnapshot(**values)
+
+    def state(self):
+        """Load state as reported by the health endpoints"""
+        return {
+            'loaded': self.loaded,
+            'version': self.version,
+            'generation': self._generation,
+            'flat_engine': self._engine is not None,
+            'loaded_at': self.loaded_at if self.loaded else None,
+        }
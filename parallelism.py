@@ -0,0 +1,161 @@
+"""
+Inference Parallelism
+Chooses how many threads one predict call may use, from its batch size
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Written by "python benchmark.py parallel" next to the models
+POLICY_FILE = 'parallelism.json'
+
+
+class ParallelismPolicy:
+    """
+    Serial scoring for small batches, up to ``max_workers`` threads for large ones
+
+    Single requests are the common case under a threaded web server, where
+    every request thread fanning out to all cores only oversubscribes the
+    CPU; only batches of at least ``min_parallel_rows`` rows are split.
+    """
+
+    def __init__(self, min_parallel_rows=4096, max_workers=None):
+        """
+        Args:
+            min_parallel_rows: Smallest batch that is scored in parallel
+            max_workers: Threads for a parallel batch (default: CPU count)
+        """
+        self.min_parallel_rows = min_parallel_rows
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def workers(self, n_rows):
+        """Threads to use for a batch of n_rows"""
+        if self.max_workers <= 1 or n_rows < self.min_parallel_rows:
+            return 1
+        return self.max_workers
+
+    def to_dict(self):
+        """Settings as saved in POLICY_FILE"""
+        return {'min_parallel_rows': self.min_parallel_rows, 'max_workers': self.max_workers}
+
+    def save(self, path):
+        """Write the settings as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Policy saved by a calibration run, or the defaults if there is none"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        return cls(settings['min_parallel_rows'], settings['max_workers'])
+
+
+def reset_n_jobs(model):
+    """
+    Clear the n_jobs a model's estimators were trained with (in place)
+
+    Forests are trained with n_jobs=-1, and that setting is pickled with them;
+    left in place, every predict call would use all cores. Called once when
+    a model is trained or loaded, so that the n_jobs given to
+    sklearn_predict_proba decides.
+
+    Returns:
+        The model
+    """
+    for estimator in [model] + list(getattr(model, 'estimators_', ())):
+        if getattr(estimator, 'n_jobs', None) is not None:
+            estimator.n_jobs = None
+    return model
+
+
+def sklearn_predict_proba(model, scaler, rows, n_jobs=1):
+    """
+    predict_proba of a scikit-learn VotingClassifier with explicit parallelism
+
+    The model must have been passed through reset_n_jobs(); n_jobs is then
+    applied through joblib's thread-local configuration, without touching
+    the (possibly shared) model.
+
+    Pass scaler=None for rows that are already scaled.
+    """
+    import joblib
+
+    X = scaler.transform(np.asarray(rows)) if scaler is not None else rows
+    with joblib.parallel_config(n_jobs=n_jobs):
+        return model.predict_proba(X)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+_executors_pid = None
+
+
+def thread_pool(workers):
+    """Shared thread pool of the given size for this process"""
+    global _executors_pid
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _executors_lock:
+        if _executors_pid != os.getpid():
+            _executors.clear()
+            _executors_pid = os.getpid()
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        return _executors[workers]
+
+
+def calibrate(predict, rows, batch_sizes, worker_counts, repeat=5, min_speedup=1.1):
+    """
+    Time predict(batch, n_jobs) serially and in parallel and derive a policy
+
+    The parallel threshold is the smallest batch size from which the best
+    parallel setting beats serial by at least ``min_speedup`` for every
+    larger size too.
+
+    Args:
+        predict: Callable(rows, n_jobs) scoring a batch
+        rows: Feature matrix to draw batches from (repeated as needed)
+        batch_sizes: Batch sizes to time, ascending
+        worker_counts: Thread counts > 1 to try
+
+    Returns:
+        tuple: (ParallelismPolicy, list of {'rows', 'serial_ms', 'parallel_ms': {workers: ms}})
+    """
+    def best_ms(batch, n_jobs):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            predict(batch, n_jobs)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    rows = np.asarray(rows)
+    timings = []
+    for size in batch_sizes:
+        batch = rows[np.arange(size) % len(rows)]
+        timings.append({
+            'rows': size,
+            'serial_ms': best_ms(batch, 1),
+            'parallel_ms': {workers: best_ms(batch, workers) for workers in worker_counts},
+        })
+
+    # Stays serial unless parallel scoring pays off for the largest batches
+    min_parallel_rows, max_workers = 2 ** 31, 1
+    for timing in reversed(timings):
+        if not timing['parallel_ms']:
+            break
+        workers, ms = min(timing['parallel_ms'].items(), key=lambda item: item[1])
+        if timing['serial_ms'] < ms * min_speedup:
+            break
+        if max_workers == 1:
+            max_workers = workers
+        min_parallel_rows = timing['rows']
+    return ParallelismPolicy(min_parallel_rows, max_workers), timings
@@ -1,19 +1,48 @@
 """
 Quick Detect - Command line tool for simple detection
 Usage: python quick_detect.py link "url" or python quick_detect.py message "text"
+       python quick_detect.py scan link urls.csv --output results.jsonl
 """
 
-from fake_detector import FakeDetector
+from detector_registry import get_detector
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
 import sys
+import time
+from collections import deque
+
+# Field names tried (in order) when a CSV/JSONL column is not given
+DEFAULT_COLUMNS = ('url', 'link', 'message', 'text')
+
+_worker_detector = None
+
+class InputError(ValueError):
+    """The input as a whole cannot be read (e.g. a CSV file without a header row)"""
+
+class BadRecord:
+    """A record that could not be read; written to the output as {"line": n, "error": ...}"""
+    
+    __slots__ = ('error',)
+    
+    def __init__(self, error):
+        self.error = error
 
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1].lower() == 'scan':
+        sys.exit(scan_main(sys.argv[2:]))
+    
     if len(sys.argv) < 3:
         print("Usage:")
         print('  python quick_detect.py link "https://www.example.com"')
         print('  python quick_detect.py message "Your message text"')
+        print('  python quick_detect.py scan <link|message> <file|-> [options]   (see scan --help)')
         return
     
-    detector = FakeDetector()
+    detector = get_detector()
     check_type = sys.argv[1].lower()
     text = sys.argv[2]
     
@@ -33,6 +62,214 @@ def main():
         print("Error: First argument must be 'link' or 'message'")
         print("Usage: python quick_detect.py <link|message> <text>")
 
+def scan_main(argv):
+    """
+    Bulk mode: score every record of a file (or stdin) and write JSONL results
+    
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog='quick_detect.py scan',
+        description='Score a CSV, JSONL or line-delimited file of links or messages.'
+    )
+    parser.add_argument('type', choices=['link', 'url', 'message', 'msg'], help='What the records contain')
+    parser.add_argument('input', help="Input file, or '-' for stdin")
+    parser.add_argument('--format', choices=['auto', 'lines', 'csv', 'jsonl'], default='auto',
+                        help='Input format (default: from the file extension, lines for stdin)')
+    parser.add_argument('--column', help=f"CSV column / JSON field to score (default: first of {', '.join(DEFAULT_COLUMNS)})")
+    parser.add_argument('--output', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--batch-size', type=int, default=1000, help='Records scored per batch (default: 1000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes, each loading the model once (default: CPU count; 1 = in-process)')
+    parser.add_argument('--reasons', action='store_true', help='Include the explanation of each verdict')
+    parser.add_argument('--model-dir', default='models', help='Directory holding the trained models')
+    parser.add_argument('--quiet', action='store_true', help='No progress reporting on stderr')
+    args = parser.parse_args(argv)
+    
+    detector_type = 'url' if args.type in ('link', 'url') else 'message'
+    if not get_detector(args.model_dir)._ensure_model(detector_type):
+        print("Error: Models not found. Please run 'python train_models.py' first.", file=sys.stderr)
+        return 1
+    
+    fmt = args.format
+    if fmt == 'auto':
+        extension = os.path.splitext(args.input)[1].lower()
+        fmt = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension, 'lines')
+    
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        records = read_records(source, fmt, args.column)
+        stats = scan(records, sink, detector_type, batch_size=args.batch_size, workers=args.workers,
+                     model_dir=args.model_dir, include_reasons=args.reasons,
+                     progress=None if args.quiet else sys.stderr)
+    except InputError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    
+    if not args.quiet:
+        print(f"Scanned {stats['records']} records in {stats['seconds']:.1f}s "
+              f"({stats['records_per_second']:.0f}/s), {stats['fake']} flagged as fake, "
+              f"{stats['errors']} unreadable", file=sys.stderr)
+    return 0
+
+def read_records(stream, fmt, column=None):
+    """
+    Stream (line_number, text) records from a file, skipping blank records
+    
+    A record that cannot be read (invalid JSON, a missing field or a value
+    that is not a string) is yielded as (line_number, BadRecord) so the scan
+    reports it and goes on.
+    
+    Args:
+        stream: Text file object
+        fmt: 'lines', 'csv' or 'jsonl'
+        column: CSV column / JSON field holding the text (default: DEFAULT_COLUMNS)
+    
+    Raises:
+        InputError: If a CSV file has no header row or lacks the requested column
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        field = _pick_column(reader.fieldnames or [], column)
+        for row in reader:
+            text = (row.get(field) or '').strip()
+            if text:
+                yield reader.line_num, text
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                yield line_number, BadRecord(f"invalid JSON: {e}")
+                continue
+            if isinstance(value, dict):
+                names = (column,) if column else DEFAULT_COLUMNS
+                name = next((name for name in names if name in value), None)
+                if name is None:
+                    yield line_number, BadRecord(f"no {' / '.join(names)} field")
+                    continue
+                value = value[name]
+            if not isinstance(value, str):
+                yield line_number, BadRecord(f"expected a string, got {type(value).__name__}")
+            elif value.strip():
+                yield line_number, value.strip()
+    else:
+        for line_number, line in enumerate(stream, 1):
+            text = line.strip()
+            if text:
+                yield line_number, text
+
+def _pick_column(fieldnames, column=None):
+    if not fieldnames:
+        raise InputError("CSV input is empty or has no header row")
+    if column:
+        if column not in fieldnames:
+            raise InputError(f"CSV input has no column {column!r} (columns: {', '.join(fieldnames)})")
+        return column
+    for name in DEFAULT_COLUMNS:
+        if name in fieldnames:
+            return name
+    return fieldnames[0]
+
+def scan(records, sink, detector_type, batch_size=1000, workers=1, model_dir='models',
+         include_reasons=False, progress=None, progress_interval=2.0):
+    """
+    Score records in fixed-size batches and write one JSON line per record, in input order
+    
+    At most two batches per worker are in flight at a time, so memory stays
+    bounded no matter how large the input is.
+    
+    Args:
+        records: Iterable of (line_number, text or BadRecord); bad records become error lines
+        sink: Text file object receiving JSONL results
+        detector_type: 'url' or 'message'
+        batch_size: Records per batch
+        workers: Worker processes; 1 scores in this process
+        progress: Optional stream for periodic progress lines
+    
+    Returns:
+        dict: Record count, fake count, error count, elapsed seconds and throughput
+    """
+    batches = _batches(records, batch_size)
+    stats = {'records': 0, 'fake': 0, 'errors': 0}
+    start = last_report = time.perf_counter()
+    
+    def write(batch, results):
+        nonlocal last_report
+        for (line_number, text), result in zip(batch, results):
+            if isinstance(text, BadRecord):
+                sink.write(json.dumps({'line': line_number, 'error': text.error}, ensure_ascii=False) + '\n')
+                stats['errors'] += 1
+                continue
+            record = {
+                'line': line_number,
+                'input': text,
+                'is_fake': result['is_fake'],
+                'confidence': round(result['confidence'], 4),
+            }
+            if include_reasons:
+                record['reasons'] = result['reasons']
+            sink.write(json.dumps(record, ensure_ascii=False) + '\n')
+            stats['fake'] += result['is_fake']
+        stats['records'] += len(batch)
+        now = time.perf_counter()
+        if progress is not None and now - last_report >= progress_interval:
+            last_report = now
+            print(f"  {stats['records']} records, {stats['records'] / (now - start):.0f}/s", file=progress)
+    
+    if workers <= 1:
+        _init_worker(model_dir)
+        for batch in batches:
+            write(batch, _score_batch(detector_type, batch))
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model_dir,)) as pool:
+            in_flight = deque()
+            for batch in itertools.chain(batches, [None]):
+                if batch is not None:
+                    in_flight.append((batch, pool.apply_async(_score_batch, (detector_type, batch))))
+                # Write finished batches in order; block only when the window is full or input ended
+                while in_flight and (batch is None or len(in_flight) >= 2 * workers or in_flight[0][1].ready()):
+                    done, result = in_flight.popleft()
+                    write(done, result.get())
+    
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = elapsed
+    stats['records_per_second'] = stats['records'] / elapsed if elapsed else 0.0
+    return stats
+
+def _batches(records, batch_size):
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _init_worker(model_dir):
+    """Load the detector once per worker process"""
+    global _worker_detector
+    _worker_detector = get_detector(model_dir)
+
+def _score_batch(detector_type, batch):
+    """Results in batch order, None for bad records"""
+    texts = [text for _, text in batch if not isinstance(text, BadRecord)]
+    if not texts:
+        scored = iter(())
+    elif detector_type == 'url':
+        scored = iter(_worker_detector.detect_urls(texts))
+    else:
+        scored = iter(_worker_detector.detect_messages(texts))
+    return [None if isinstance(text, BadRecord) else next(scored) for _, text in batch]
+
 if __name__ == "__main__":
     main()
 
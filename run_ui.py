@@ -2,12 +2,13 @@
 Run the Web UI for Fake Detection System
 """
 
-import os
 import sys
 
+from fake_detector import models_available
+
 def check_models():
     """Check if models exist"""
-    if not os.path.exists('models/url_model.pkl') or not os.path.exists('models/message_model.pkl'):
+    if not models_available():
         print("=" * 70)
         print("WARNING: Models not found!")
         print("=" * 70)
@@ -30,6 +31,7 @@ def main():
     print("\nStarting web server...")
     print("Open your browser and go to: http://localhost:5000")
     print("\nPress Ctrl+C to stop the server")
+    print("For production, use: python serve.py --workers N")
     print("=" * 70)
     
     from app import app
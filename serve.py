@@ -0,0 +1,151 @@
+"""
+Production Server
+Loads the models once, then forks worker processes that share them copy-on-write
+Usage: python serve.py [--host 0.0.0.0] [--port 5000] [--workers N]
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+import detector_registry
+import metrics
+from background_job import PeriodicJob
+from fake_detector import models_available
+
+# A worker that dies sooner than this after starting is restarted only after this delay
+MIN_WORKER_UPTIME = 1.0
+# Seconds between a worker's metrics writes; a scrape sees the other workers this far behind
+METRICS_WRITE_INTERVAL = 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the web app with pre-forked worker processes')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on; 0 picks a free one (default: 5000)')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)),
+                        help='Worker processes (default: WEB_CONCURRENCY or the CPU count)')
+    parser.add_argument('--backlog', type=int, default=128, help='Listen queue length (default: 128)')
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        print("Error: serve.py needs os.fork (Linux or macOS); use run_ui.py instead.", file=sys.stderr)
+        return 1
+    if not models_available():
+        print("Error: Models not found. Please run 'python train_models.py' first.", file=sys.stderr)
+        return 1
+
+    # Bound once in the parent; every worker accepts connections from the same socket
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog)
+    host, port = listener.getsockname()[:2]
+
+    import app as webapp
+
+    # Workers write their metrics here, so /metrics on any of them covers the whole server
+    metrics_dir = tempfile.mkdtemp(prefix='fake-detection-metrics-') if metrics.enabled() else None
+    metrics.REGISTRY.share(metrics_dir)
+
+    start = time.perf_counter()
+    loaded = detector_registry.warm_up(**webapp.detector_options)
+    print(f"Loaded models in {(time.perf_counter() - start) * 1000:.0f} ms: {loaded}", flush=True)
+    # Loaded objects are never collected; freezing them keeps the workers' GC passes
+    # from writing to (and so copying) the shared pages
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            _signal_worker(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Listening on http://{host}:{port} with {args.workers} workers", flush=True)
+    for _ in range(args.workers):
+        _spawn(listener, host, port, workers)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        metrics.REGISTRY.retire(pid)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}; starting a new one", file=sys.stderr, flush=True)
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            time.sleep(MIN_WORKER_UPTIME)
+        if not stopping:
+            _spawn(listener, host, port, workers)
+
+    listener.close()
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    return 0
+
+
+def _signal_worker(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _spawn(listener, host, port, workers):
+    """Fork one worker; the child never returns into the parent's code"""
+    pid = os.fork()
+    if pid:
+        workers[pid] = time.monotonic()
+        return
+    code = 1
+    try:
+        code = _run_worker(listener, host, port)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _run_worker(listener, host, port):
+    """Warm up, then serve requests with a thread per connection until SIGTERM"""
+    import app as webapp
+
+    # Ctrl+C reaches the whole process group; the parent turns it into SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = make_server(host, port, webapp.app, threaded=True, fd=listener.fileno())
+    # shutdown() waits for serve_forever() to return, so it cannot run in the handler's thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+    timings = webapp.warm_up()
+    PeriodicJob('metrics-writer', metrics.REGISTRY.write, METRICS_WRITE_INTERVAL).start()
+    print(f"Worker {os.getpid()} ready (warm-up: {timings} ms)", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        metrics.REGISTRY.write()
+        # os._exit skips atexit; write queued detections and stop chart workers here
+        webapp.db.close()
+        webapp.chart_renderer.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,9 @@ import sys
 import subprocess
 import platform
 
+# joblib.parallel_config, used for scikit-learn predictions, is new in joblib 1.3
+MIN_JOBLIB_VERSION = '1.3.0'
+
 def create_virtual_env():
     """Create virtual environment"""
     venv_name = 'venv'
@@ -47,6 +50,8 @@ def install_dependencies(venv_name):
         
         # Install requirements
         subprocess.check_call([pip_path, 'install', '-r', 'requirements.txt'])
+        # An existing older joblib may be kept by pip; parallelism.py needs joblib.parallel_config
+        subprocess.check_call([pip_path, 'install', f'joblib>={MIN_JOBLIB_VERSION}'])
         print("[OK] All dependencies installed successfully!")
         return True
     except subprocess.CalledProcessError as e:
@@ -4,11 +4,11 @@ Uses machine learning to analyze URL/message characteristics
 Works for all links, not just known domains
 """
 
-from fake_detector import FakeDetector
+from detector_registry import get_detector
 
 def detect_link(url):
     """Detect if a link is fake - returns simple result"""
-    detector = FakeDetector()
+    detector = get_detector()
     result = detector.detect_url(url)
     
     if result['is_fake']:
@@ -18,7 +18,7 @@ def detect_link(url):
 
 def detect_message(message):
     """Detect if a message is fake - returns simple result"""
-    detector = FakeDetector()
+    detector = get_detector()
     result = detector.detect_message(message)
     
     if result['is_fake']:
@@ -32,7 +32,7 @@ def main():
     print("Simple Fake Detection - Messages and Links")
     print("=" * 70)
     
-    detector = FakeDetector()
+    detector = get_detector()
     
     while True:
         print("\nWhat do you want to check?")
@@ -0,0 +1,44 @@
+"""
+Analytics Rollup Tests
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analytics_rollup import HISTOGRAM_BINS, RollupBucket, by_day, total
+
+
+def test_merged_buckets_match_raw_statistics():
+    rng = np.random.RandomState(0)
+    confidences = rng.beta(8, 2, size=5000)
+    start = datetime(2024, 3, 1)
+    buckets = []
+    for hour, chunk in enumerate(np.array_split(confidences, 48)):
+        bucket = RollupBucket()
+        for confidence in chunk:
+            bucket.add(float(confidence))
+        buckets.append((start + timedelta(hours=hour), bucket))
+
+    daily = by_day(buckets)
+    summary = total(daily)
+
+    assert [day for day, _ in daily] == [datetime(2024, 3, 1), datetime(2024, 3, 2)]
+    assert summary.count == len(confidences)
+    assert summary.mean == pytest.approx(confidences.mean())
+    assert summary.std == pytest.approx(confidences.std())
+    assert summary.minimum == confidences.min() and summary.maximum == confidences.max()
+    for q in (0.1, 0.5, 0.9):
+        assert abs(summary.quantile(q) - np.quantile(confidences, q)) < 1 / HISTOGRAM_BINS
+
+
+def test_row_round_trip():
+    bucket = RollupBucket()
+    for confidence in (0.0, 0.42, 1.0):
+        bucket.add(confidence)
+
+    restored = RollupBucket.from_row(bucket.values())
+
+    assert restored.values() == bucket.values()
+    assert restored.histogram[0] == 1 and restored.histogram[-1] == 1
@@ -0,0 +1,56 @@
+"""
+Analytics Endpoint Tests
+Rollups come from a stubbed database, so no MySQL server is needed
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as webapp
+from analytics_rollup import RollupBucket
+
+
+@pytest.fixture
+def client(monkeypatch):
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    bucket = RollupBucket()
+    for confidence in (0.7, 0.8, 0.95):
+        bucket.add(confidence)
+    rollups = [(now - timedelta(hours=3), bucket)]
+    monkeypatch.setattr(webapp.db, "fetch_rollups", lambda *args, **kwargs: list(rollups))
+    monkeypatch.setattr(webapp.chart_prerender, "interval", 0)
+    monkeypatch.setattr(webapp.chart_renderer, "workers", 0)
+    webapp.chart_cache.invalidate()
+
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    client.rollups = rollups
+    return client
+
+
+def test_chart_is_cached_until_new_detections_land(client):
+    request = {"filter_type": "fake_link", "chart_type": "histogram", "days": 7}
+
+    first = client.post("/analytics", json=request)
+    second = client.post("/analytics", json=request)
+
+    assert first.headers["X-Chart-Cache"] == "miss"
+    assert second.headers["X-Chart-Cache"] == "hit"
+    assert second.get_json()["image"] == first.get_json()["image"]
+    assert first.get_json()["image_bytes"] == int(first.headers["X-Chart-Bytes"]) > 0
+    assert first.get_json()["summary"]["count"] == 3
+
+    client.rollups[0][1].add(0.99)
+    third = client.post("/analytics", json=request)
+
+    assert third.headers["X-Chart-Cache"] == "miss"
+    assert third.get_json()["summary"]["count"] == 4
+
+
+def test_prerender_fills_cache(client):
+    webapp._prerender_charts()
+
+    response = client.post("/analytics", json={"filter_type": "legit_message", "chart_type": "box"})
+    assert response.headers["X-Chart-Cache"] == "hit"
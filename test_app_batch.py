@@ -0,0 +1,74 @@
+"""
+Batch Endpoint Tests
+Scores with a freshly trained model; the database is stubbed
+"""
+
+import json
+
+import pytest
+
+import app as webapp
+from fake_detector import FakeDetector
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, train_url_detector):
+    train_url_detector(str(tmp_path))
+    monkeypatch.setattr(webapp, "detector", FakeDetector(model_dir=str(tmp_path), use_flat_engine=True))
+    monkeypatch.setattr(webapp, "BATCH_CHUNK_SIZE", 3)
+    inserts = []
+    monkeypatch.setattr(webapp.db, "insert_detections", lambda rows: inserts.append(list(rows)))
+
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    client.inserts = inserts
+    return client
+
+
+def _records(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_ndjson_batch_streams_results_and_logs_each_chunk(client, urls):
+    body = "\n".join(json.dumps({"url": url}) for url in urls)
+
+    response = client.post("/detect/batch?type=url", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    records = _records(response)
+    expected = webapp.detector.detect_urls(urls)
+    assert [r["index"] for r in records] == list(range(len(urls)))
+    assert [r["url"] for r in records] == urls
+    assert [r["is_fake"] for r in records] == [e["is_fake"] for e in expected]
+    assert [len(rows) for rows in client.inserts] == [3, 3, 2]
+    assert client.inserts[0][0][3] == "link"
+
+
+def test_chunks_are_logged_before_they_are_streamed(client, urls):
+    response = client.post("/detect/batch", json=urls, buffered=False)
+
+    first = next(iter(response.response))
+    response.close()
+
+    assert len(first.splitlines()) == 3
+    assert [len(rows) for rows in client.inserts] == [3]
+
+
+def test_json_array_with_invalid_items(client, urls):
+    response = client.post("/detect/batch", json=[urls[0], "", {"link": urls[1]}, urls[2]])
+
+    records = _records(response)
+    assert [("error" in r) for r in records] == [False, True, True, False]
+    assert [len(rows) for rows in client.inserts] == [1, 1]
+
+
+def test_batch_limits(client, monkeypatch, urls):
+    monkeypatch.setattr(webapp, "BATCH_MAX_ITEMS", 2)
+    assert client.post("/detect/batch", json=urls[:3]).status_code == 413
+    assert client.post("/detect/batch?type=image", json=urls[:1]).status_code == 400
+    assert client.post("/detect/batch", data="{not json", content_type="application/x-ndjson").status_code == 400
+
+    monkeypatch.setattr(webapp, "BATCH_MAX_BYTES", 10)
+    assert client.post("/detect/batch", json=urls[:1]).status_code == 413
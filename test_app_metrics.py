@@ -0,0 +1,42 @@
+"""
+Metrics Endpoint Tests
+Scores with a freshly trained model; the database is stubbed
+"""
+
+import app as webapp
+from fake_detector import FakeDetector
+from micro_batcher import MicroBatcher
+
+
+def test_detect_reports_server_timing_and_metrics(tmp_path, monkeypatch, train_url_detector, urls):
+    train_url_detector(str(tmp_path))
+    detector = FakeDetector(model_dir=str(tmp_path), use_flat_engine=True)
+    monkeypatch.setattr(webapp, "detector", detector)
+    monkeypatch.setattr(webapp, "url_batcher", MicroBatcher(detector.detect_urls))
+    monkeypatch.setattr(webapp.db, "_writer", None)
+    monkeypatch.setattr(webapp.db, "insert_detections", lambda rows: None)
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+
+    response = client.post("/detect/url", json={"url": urls[2]})
+
+    assert response.status_code == 200
+    timing = dict(entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", "))
+    assert {"extract_features", "predict_proba", "explain", "batch_wait", "db", "total"} <= set(timing)
+    assert all(float(ms) >= 0 for ms in timing.values())
+
+    scrape = client.get("/metrics")
+    assert scrape.content_type == webapp.metrics.CONTENT_TYPE
+    text = scrape.get_data(as_text=True)
+    assert 'fake_detection_stage_seconds_count{detector="url",stage="extract_features"}' in text
+    assert 'fake_detection_db_seconds_count{operation="insert_detection"}' in text
+    assert 'fake_detection_http_requests_total{endpoint="detect_url",status="200"}' in text
+    assert 'fake_detection_db_pool_in_use{pool="write"} 0' in text
+    assert 'fake_detection_verdict_cache_hits_total' in text
+
+
+def test_metrics_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(webapp.metrics, "_enabled", False)
+
+    assert webapp.app.test_client().get("/metrics").status_code == 404
@@ -0,0 +1,42 @@
+"""
+Model Cascade Tests
+"""
+
+import numpy as np
+
+from cascade import choose_gate
+from fake_detector import FakeDetector
+
+
+def test_gate_is_the_lowest_threshold_within_the_accuracy_bound():
+    labels = np.array([1, 1, 0, 0, 1])
+    full_proba = np.array([[0.1, 0.9], [0.2, 0.8], [0.9, 0.1], [0.7, 0.3], [0.4, 0.6]])
+    # First stage is sure (and right) on rows 0-2, unsure and wrong on rows 3-4
+    fast_proba = np.array([[0.05, 0.95], [0.1, 0.9], [0.9, 0.1], [0.4, 0.6], [0.6, 0.4]])
+
+    gate = choose_gate(labels, full_proba, fast_proba, [0, 1], max_accuracy_loss=0.0)
+
+    assert gate['threshold'] == 0.9
+    assert gate['escalation_rate'] == 0.4
+    assert gate['cascade_accuracy'] == gate['full_accuracy'] == 1.0
+
+    loose = choose_gate(labels, full_proba, fast_proba, [0, 1], max_accuracy_loss=0.5)
+    assert loose['threshold'] == 0.6 and loose['escalation_rate'] == 0.0
+
+
+def test_training_saves_both_stages_and_escalates_uncertain_inputs(tmp_path, capsys, urls):
+    model_dir = str(tmp_path)
+    labels = [0, 0, 1, 1, 0, 1, 0, 1] * 5
+    FakeDetector(model_dir=model_dir).train_url_model(urls * 5, labels)
+    assert 'cascade gate' in capsys.readouterr().out
+
+    detector = FakeDetector(model_dir=model_dir, use_flat_engine=True, use_cascade=True)
+    results = detector.detect_urls(urls)
+
+    stats = detector.cascade_stats()['url']
+    assert len(results) == len(urls)
+    assert stats['answered'] + stats['escalated'] == len(urls)
+    assert stats['threshold'] == stats['gate']['threshold']
+    assert 'latency_saved' in stats['gate']
+    assert set(stats['gate']['test']) == {'escalation_rate', 'full_accuracy', 'cascade_accuracy'}
+    assert FakeDetector(model_dir=model_dir, use_flat_engine=True)._ensure_model('url')
@@ -0,0 +1,48 @@
+"""
+Chart Renderer Tests
+"""
+
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics_rollup import RollupBucket
+from chart_renderer import ChartQueueFull, ChartRenderPool, ChartRenderTimeout, chart_data
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _data():
+    buckets = []
+    for day in range(5):
+        bucket = RollupBucket()
+        for confidence in (0.55, 0.7, 0.9 - day / 20):
+            bucket.add(confidence)
+        buckets.append((datetime(2024, 3, 1) + timedelta(days=day), bucket))
+    return chart_data(buckets)
+
+
+def test_worker_process_renders_every_chart_type():
+    pool = ChartRenderPool(workers=1, max_pending=2, timeout=60)
+    try:
+        for chart_type in ('bar', 'histogram', 'scatter', 'box', 'line'):
+            image = pool.render(_data(), chart_type, f"{chart_type} chart")
+            assert base64.b64decode(image).startswith(PNG_SIGNATURE)
+
+        with pytest.raises(ChartRenderTimeout):
+            pool.timeout = 0.001
+            pool.render(_data(), 'bar', "too slow")
+    finally:
+        pool.shutdown()
+
+    assert pool.stats()['rendered'] == 5 and pool.stats()['timeouts'] == 1
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    pool = ChartRenderPool(workers=0, max_pending=1)
+    pool._slots.acquire()  # one render already in flight
+
+    with pytest.raises(ChartQueueFull):
+        pool.render(_data(), 'bar', "rejected")
+    assert pool.stats()['rejected'] == 1
@@ -0,0 +1,77 @@
+"""
+Detector Registry Tests
+"""
+
+import threading
+
+import pytest
+
+import check_my_input
+import detector_registry
+import simple_detect
+from fake_detector import FakeDetector
+from verdict_cache import VerdictCache
+
+
+@pytest.fixture
+def reads(tmp_path, monkeypatch, train_url_detector):
+    """Trained models in ./models of a temporary working directory; yields the model reads"""
+    train_url_detector(str(tmp_path / 'models'))
+    monkeypatch.chdir(tmp_path)
+    detector_registry.clear()
+    reads = []
+    read_model = FakeDetector._read_model
+
+    def counting_read_model(self, detector_type, extractor):
+        reads.append(detector_type)
+        return read_model(self, detector_type, extractor)
+
+    monkeypatch.setattr(FakeDetector, '_read_model', counting_read_model)
+    yield reads
+    detector_registry.clear()
+
+
+def test_helpers_load_the_model_once(reads, capsys, urls):
+    for url in urls:
+        simple_detect.detect_link(url)
+        check_my_input.check_url(url, simple=True)
+
+    assert reads == ['url']
+    assert detector_registry.get_detector() is detector_registry.get_detector('models')
+
+
+def test_concurrent_first_use_loads_once(reads, urls):
+    threads = [threading.Thread(target=simple_detect.detect_link, args=(url,)) for url in urls * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert reads == ['url']
+
+
+def test_warm_up_and_reload(reads, urls):
+    assert detector_registry.warm_up(detector_types=('url',)) == {'url': True}
+    shared = detector_registry.get_detector()
+    expected = [r['is_fake'] for r in shared.detect_urls(urls)]
+    generation = shared.model_state()['url']['generation']
+
+    reloaded = detector_registry.reload()
+
+    assert reloaded is shared
+    assert reads.count('url') == 2
+    assert shared.model_state()['url']['generation'] == generation + 1
+    assert [r['is_fake'] for r in shared.detect_urls(urls)] == expected
+
+
+def test_options_get_their_own_detector(reads):
+    cache = VerdictCache()
+    configured = detector_registry.get_detector(verdict_cache=cache, url_rules='audit', use_cascade=True)
+    default = detector_registry.get_detector()
+
+    assert configured is not default
+    assert configured is detector_registry.get_detector(verdict_cache=cache, url_rules='audit', use_cascade=True)
+    assert configured.url_rules.audit and configured.verdict_cache is cache and configured.use_cascade
+    assert default.url_rules is None and default.verdict_cache is None and not default.use_cascade
+    with pytest.raises(ValueError):
+        detector_registry.get_detector(url_rules='sometimes')
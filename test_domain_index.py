@@ -0,0 +1,47 @@
+"""
+Domain Index Tests
+"""
+
+from domain_index import DomainIndex
+from url_feature_extractor import URLFeatureExtractor
+
+LEGITIMATE = ['google.com', 'docs.google.com', 'zoom.us', 'wikipedia.org']
+DOMAINS = [
+    'google.com', 'mail.google.com', 'evilgoogle.com', 'google.com.evil.tk',
+    'a.b.zoom.us', 'zoom.us:443', 'com', '', 'wikipedia.org.', 'x..google.com',
+]
+
+
+def test_matches_same_as_endswith_scan(tmp_path):
+    path = str(tmp_path / 'legitimate.npy')
+    DomainIndex.from_domains(LEGITIMATE).save(path)
+
+    for index in (DomainIndex.from_domains(LEGITIMATE), DomainIndex.load(path)):
+        for domain in DOMAINS:
+            expected = any(domain == d or domain.endswith('.' + d) for d in LEGITIMATE)
+            assert index.matches(domain) == expected, domain
+
+
+def test_saved_index_is_memory_mapped(tmp_path):
+    source = tmp_path / 'allow.txt'
+    source.write_text('# allow list\nExample.org\n\nsub.example.net  # trailing comment\n', encoding='utf-8')
+    path = str(tmp_path / 'allow.npy')
+    DomainIndex.from_file(str(source)).save(path)
+
+    index = DomainIndex.load(path)
+    assert not index._hashes.flags.writeable
+    assert len(index) == 2
+    assert index.matches('www.example.org')
+    assert index.contains('sub.example.net')
+    assert not index.matches('example.net')
+
+
+def test_extractor_uses_loaded_domain_lists(tmp_path):
+    path = tmp_path / 'shorteners.txt'
+    path.write_text('lnk.example\n', encoding='utf-8')
+    extractor = URLFeatureExtractor()
+    assert extractor.extract_features('https://go.lnk.example/abc')['is_short_url'] == 0
+
+    extractor.load_domain_list('short_url', str(path))
+    assert extractor.extract_features('https://go.lnk.example/abc')['is_short_url'] == 1
+    assert extractor.extract_features('https://docs.google.com/x')['is_known_legitimate'] == 1
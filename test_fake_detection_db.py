@@ -0,0 +1,261 @@
+"""
+Detection Database Tests
+Run against an in-memory stand-in for the MySQL connection
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import mysql.connector
+import pytest
+
+from connection_pool import ConnectionPool, PoolTimeout
+from fake_detection_db import FakeDetectionDB
+from write_behind import WriteBehindQueue
+
+
+class StandInCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.statements.append((" ".join(query.split()), params))
+
+    def executemany(self, query, rows):
+        if "detection_rollups" in query:
+            self.conn.rollups.extend(rows)
+        else:
+            self.conn.batches.append(list(rows))
+
+    def fetchall(self):
+        return self.conn.result
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self):
+        self.statements = []
+        self.batches = []
+        self.commits = 0
+        self.result = []
+        self.rollups = []
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def cursor(self, dictionary=False):
+        return StandInCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _db(**kwargs):
+    conn = StandInConnection()
+    return FakeDetectionDB(connect=lambda **config: conn, **kwargs), conn
+
+
+def test_no_connection_until_first_query():
+    connects = []
+    db = FakeDetectionDB(connect=lambda **config: connects.append(config) or StandInConnection())
+    assert connects == []
+
+    db.insert_detection("https://example.com", "LEGITIMATE", 0.9)
+    db.fetch_by_filter()
+
+    stats = db.pool_stats()
+    assert len(connects) == 2
+    assert stats["write"]["created"] == 1 and stats["read"]["created"] == 1
+
+
+def test_synchronous_insert_writes_immediately():
+    db, conn = _db()
+    db.insert_detection("https://example.com", "LEGITIMATE", 0.9)
+
+    assert conn.batches == [[("https://example.com", "LEGITIMATE", 0.9, "link")]]
+    assert db.writer_stats() is None
+
+
+def test_schema_has_composite_index_and_only_migrate_adds_it():
+    db, conn = _db()
+    db.fetch_by_filter()
+
+    statements = [query for query, _ in conn.statements]
+    assert any("INDEX idx_type_label_created (detection_type, prediction_label, created_at)" in q
+               for q in statements if q.startswith("CREATE TABLE"))
+    assert not any(q.startswith("ALTER TABLE detections ADD INDEX") for q in statements)
+
+    conn.result = [("PRIMARY",), ("idx_created",)]
+    assert db.migrate() == ["idx_type_label_created"]
+    assert conn.statements[-1][0] == "ALTER TABLE detections ADD INDEX idx_type_label_created " \
+                                     "(detection_type, prediction_label, created_at);"
+
+
+def test_keyset_pagination_and_time_range():
+    db, conn = _db()
+    since, last_seen = datetime(2024, 1, 1), datetime(2024, 3, 5, 12, 0)
+    conn.result = [{"id": 42, "created_at": last_seen}, {"id": 41, "created_at": last_seen}]
+
+    rows = db.fetch_by_filter("link", "FAKE", limit=2, since=since)
+    cursor = db.next_page_cursor(rows, limit=2)
+    assert cursor == (last_seen, 41)
+
+    conn.result = []
+    db.fetch_by_filter("link", "FAKE", limit=2, since=since, before=cursor)
+    query, params = conn.statements[-1]
+    assert "WHERE detection_type = %s AND prediction_label = %s AND created_at >= %s " \
+           "AND (created_at < %s OR (created_at = %s AND id < %s))" in query
+    assert "ORDER BY created_at DESC, id DESC LIMIT %s" in query
+    assert "OFFSET" not in query
+    assert params == ("link", "FAKE", since, last_seen, last_seen, 41, 2)
+    assert db.next_page_cursor([], limit=2) is None
+
+
+def test_inserts_update_rollups_in_same_commit():
+    db, conn = _db()
+    db._ensure_table_once()
+    commits = conn.commits
+    db.insert_detections([
+        ("a", "FAKE", 0.91, "link"), ("b", "FAKE", 0.97, "link"), ("c", "LEGITIMATE", 0.6, "message"),
+    ])
+
+    assert conn.commits == commits + 1
+    fake_links = next(row for row in conn.rollups if row[:2] == ("link", "FAKE"))
+    assert fake_links[2] == 2 and fake_links[3] == pytest.approx(1.88)
+    assert sum(fake_links[7:]) == 2 and fake_links[7 + 18] == 1 and fake_links[7 + 19] == 1
+
+
+def test_rollups_rebuild_in_one_transaction_on_the_database_clock():
+    connects = []
+    conn = StandInConnection()
+    db = FakeDetectionDB(connect=lambda **config: connects.append(config) or conn)
+    db._ensure_table_once()
+    conn.statements.clear()
+    commits = conn.commits
+
+    db.rebuild_rollups()
+    db.fetch_rollups("link", "FAKE", last_hours=24)
+
+    rebuild = [query for query, _ in conn.statements[:3]]
+    assert rebuild[0].endswith("FROM detections LOCK IN SHARE MODE")
+    assert rebuild[1] == "DELETE FROM detection_rollups"
+    assert rebuild[2].startswith("INSERT INTO detection_rollups")
+    assert conn.commits == commits + 1
+    query, params = conn.statements[-1]
+    assert "UNIX_TIMESTAMP() DIV 3600 + 1 - %s" in query and params == ("link", "FAKE", 24)
+    assert all(config["time_zone"] == "+00:00" for config in connects)
+
+
+def test_rollups_are_upserted_in_key_order_and_deadlocks_retried_once(monkeypatch):
+    db, conn = _db()
+    db._ensure_table_once()
+    executemany = StandInCursor.executemany
+    deadlocks = []
+
+    def deadlock_once(cursor, query, rows):
+        if "detection_rollups" in query and not deadlocks:
+            deadlocks.append(query)
+            raise mysql.connector.DatabaseError("Deadlock found", errno=1213)
+        executemany(cursor, query, rows)
+
+    monkeypatch.setattr(StandInCursor, "executemany", deadlock_once)
+    db.insert_detections([
+        ("a", "LEGITIMATE", 0.6, "message"), ("b", "FAKE", 0.9, "link"), ("c", "LEGITIMATE", 0.7, "link"),
+    ])
+
+    assert len(deadlocks) == 1 and len(conn.batches) == 2
+    assert [row[:2] for row in conn.rollups] == [("link", "FAKE"), ("link", "LEGITIMATE"), ("message", "LEGITIMATE")]
+
+
+def test_write_behind_batches_rows_and_flushes_on_close():
+    db, conn = _db(write_behind=True, batch_size=3, flush_interval=60)
+    for i in range(7):
+        db.insert_detection(f"msg {i}", "FAKE", 0.5, detection_type="message")
+
+    db.close()
+
+    assert [len(batch) for batch in conn.batches] == [3, 3, 1]
+    assert [row[0] for batch in conn.batches for row in batch] == [f"msg {i}" for i in range(7)]
+    stats = db.writer_stats()
+    assert stats["written"] == 7 and stats["queue_depth"] == 0 and stats["dropped"] == 0
+
+
+def test_fetch_flushes_queued_rows_only_when_asked():
+    db, conn = _db(write_behind=True, batch_size=100, flush_interval=60)
+    db.insert_detection("https://example.com", "FAKE", 0.99)
+
+    db.fetch_by_filter(detection_type="link")
+    assert conn.batches == []
+
+    db.fetch_by_filter(detection_type="link", flush_first=True)
+    assert len(conn.batches) == 1
+    db.close()
+
+
+def test_full_queue_drops_rows_and_failed_writes_are_counted():
+    release = threading.Event()
+
+    def write_batch(rows):
+        release.wait(5)
+        raise RuntimeError("database unavailable")
+
+    writer = WriteBehindQueue(write_batch, max_size=2, batch_size=1, flush_interval=0.01)
+    results = [writer.submit(i) for i in range(6)]
+    release.set()
+    writer.close(timeout=5)
+
+    stats = writer.stats()
+    assert results.count(False) == stats["dropped"] >= 3
+    assert stats["failed"] == stats["enqueued"] and stats["written"] == 0
+    assert "database unavailable" in stats["last_error"]
+    assert not writer.submit(99)
+
+
+def test_pool_waits_for_free_connection_and_records_wait_time():
+    pool = ConnectionPool(lambda **config: StandInConnection(), {}, size=1, timeout=5)
+    checked_out = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            checked_out.set()
+            time.sleep(0.05)
+
+    holder = threading.Thread(target=hold_connection)
+    holder.start()
+    checked_out.wait(5)
+    with pool.connection():
+        pass
+    holder.join()
+
+    stats = pool.stats()
+    assert stats["created"] == 1 and stats["acquisitions"] == 2
+    assert stats["waits"] == 1 and stats["max_wait_seconds"] > 0.01
+
+    pool.timeout = 0.01
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_pool_opens_new_connections_after_fork():
+    pool = ConnectionPool(lambda **config: StandInConnection(), {}, size=1)
+    with pool.connection() as parent_conn:
+        pass
+
+    pool._pid = -1  # as seen from a forked child
+    with pool.connection() as child_conn:
+        pass
+
+    assert child_conn is not parent_conn
+    assert pool.stats()["created"] == 1
@@ -0,0 +1,107 @@
+"""
+Feature Extractor Tests
+Checks that the fast extraction paths agree with the per-input feature dictionaries
+"""
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher
+from message_feature_extractor import MessageFeatureExtractor, FEATURE_NAMES as MESSAGE_FEATURE_NAMES
+from url_feature_extractor import URLFeatureExtractor, FEATURE_NAMES
+
+SAMPLE_URLS = [
+    'https://www.google.com/search?q=python',
+    'https://docs.google.com/document/d/abc-123_x',
+    'http://bit.ly/verify-account-now',
+    'https://verify-payment.tk/urgent?id=1&ref=2',
+    'http://192.168.0.1:8080/login',
+    'example.com/café/²?x=1',
+    'http/malformed.com',
+    '',
+    None,
+]
+
+SAMPLE_MESSAGES = [
+    'Hello, how are you doing today?',
+    'URGENT! Your account has been SUSPENDED! Click here NOW to verify: http://bit.ly/verify-now',
+    'CONGRATULATIONS! You won $1,000,000! Claim now at the IRS official refund portal.',
+    'nownownow, act fast act fast - credit card payment debit transfer',
+    '',
+]
+
+
+def test_keyword_matcher_matches_substring_semantics():
+    categories = {
+        'a': ['he', 'she', 'his', 'hers', 'she'],
+        'b': ['hers', 'e', ''],
+        'c': ['not there'],
+    }
+    matcher = KeywordMatcher(categories)
+    for text in ['ushers', 'she sells', 'h', '', 'hishers not ther']:
+        expected = {name: sum(1 for keyword in keywords if keyword in text)
+                    for name, keywords in categories.items()}
+        assert matcher.count(text) == expected
+
+
+def test_message_keyword_counts_match_substring_semantics():
+    extractor = MessageFeatureExtractor()
+    keyword_lists = {
+        'suspicious_phrase_count': extractor.suspicious_phrases,
+        'urgency_word_count': extractor.urgency_words,
+        'financial_keyword_count': extractor.financial_keywords,
+        'authority_keyword_count': extractor.authority_keywords,
+    }
+    for message in SAMPLE_MESSAGES[:-1]:
+        features = extractor.extract_features(message)
+        for name, keywords in keyword_lists.items():
+            assert features[name] == sum(1 for keyword in keywords if keyword in message.lower())
+
+
+def test_message_feature_order_matches_schema():
+    extractor = MessageFeatureExtractor()
+    for message in SAMPLE_MESSAGES + [None]:
+        assert list(extractor.extract_features(message)) == list(MESSAGE_FEATURE_NAMES)
+    assert extractor.get_feature_names() == list(MESSAGE_FEATURE_NAMES)
+
+
+def test_url_feature_order_matches_schema():
+    extractor = URLFeatureExtractor()
+    for url in SAMPLE_URLS:
+        assert list(extractor.extract_features(url)) == list(FEATURE_NAMES)
+    assert extractor.get_feature_names() == list(FEATURE_NAMES)
+
+
+def test_url_matrix_matches_feature_dicts():
+    extractor = URLFeatureExtractor()
+    matrix = extractor.extract_matrix(SAMPLE_URLS)
+
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (len(SAMPLE_URLS), len(FEATURE_NAMES))
+    for url, row in zip(SAMPLE_URLS, matrix):
+        expected = np.array(list(extractor.extract_features(url).values()), dtype=np.float32)
+        np.testing.assert_array_equal(row, expected)
+
+
+def test_url_features_from_row_round_trip():
+    extractor = URLFeatureExtractor()
+    # special_char_ratio is exactly 0.15, the explanation threshold, for the last two
+    urls = ['http://bit.ly/verify-account-now', 'paypalpaypal_192.168.0.1 http://', '-www.xgoogle.comverifybit.ly/.tk']
+    matrix = extractor.extract_matrix(urls, dtype=np.float64)
+
+    for url, row in zip(urls, matrix):
+        assert extractor.features_from_row(row) == extractor.extract_features(url)
+    assert isinstance(extractor.features_from_row(matrix[0])['suspicious_keyword_count'], int)
+    assert extractor.extract_matrix([]).shape == (0, len(FEATURE_NAMES))
+
+
+def test_batch_explanations_match_single_url_at_a_threshold(tmp_path, monkeypatch, train_url_detector):
+    detector = train_url_detector(str(tmp_path))
+    url = 'paypalpaypal_192.168.0.1 http://'
+    features = detector.url_extractor.extract_features(url)
+    assert features['special_char_ratio'] == 0.15
+    # Explain as fake, the branch holding the special character check
+    monkeypatch.setattr(detector, '_predict_batch', lambda snapshot, rows: ([1] * len(rows), [0.9] * len(rows)))
+
+    expected = detector._explain_url_result(features, 1, 0.9)
+    assert detector.detect_url(url)['reasons'] == expected
+    assert detector.detect_urls(['https://example.com', url])[1]['reasons'] == expected
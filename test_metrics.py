@@ -0,0 +1,75 @@
+"""
+Metrics Tests
+"""
+
+import os
+
+import metrics
+from micro_batcher import MicroBatcher
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.register(metrics.Histogram('stage_seconds', 'Stage time', ('stage',), buckets=(0.1, 1.0)))
+    for seconds in (0.05, 0.5, 5.0):
+        histogram.observe(seconds, ('predict_proba',))
+    registry.add_collector(lambda: [('cache_size', 'gauge', 'Cached verdicts', [({'kind': 'url "a"'}, 3)])])
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE stage_seconds histogram' in lines
+    assert 'stage_seconds_bucket{stage="predict_proba",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="predict_proba",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="predict_proba",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="predict_proba"} 3' in lines
+    assert 'cache_size{kind="url \\"a\\""} 3' in lines
+
+
+def test_shared_registries_add_up_worker_processes(tmp_path):
+    def worker_registry(directory, seconds):
+        registry = metrics.Registry()
+        registry.share(str(directory))
+        histogram = registry.register(metrics.Histogram('stage_seconds', 'Stage time', ('stage',), buckets=(1.0,)))
+        histogram.observe(seconds, ('explain',))
+        registry.add_collector(lambda: [('cache_size', 'gauge', 'Cached verdicts', [({}, 3)])])
+        return registry
+
+    # Another worker's file, as written by its own process
+    other = tmp_path / 'other'
+    other.mkdir()
+    worker_registry(other, 0.5).write()
+    os.replace(other / f'{os.getpid()}.json', tmp_path / '4242.json')
+    registry = worker_registry(tmp_path, 2.0)
+
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="explain",le="1.0"} 1' in lines
+    assert 'stage_seconds_count{stage="explain"} 2' in lines
+    assert 'cache_size{worker="4242"} 3' in lines
+    assert f'cache_size{{worker="{os.getpid()}"}} 3' in lines
+
+    registry.retire(4242)
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_count{stage="explain"} 2' in lines
+    assert 'cache_size{worker="4242"} 3' not in lines
+
+
+def test_disabled_timers_are_shared_no_ops(monkeypatch):
+    monkeypatch.setattr(metrics, '_enabled', False)
+
+    assert metrics.stage('url', 'explain') is metrics.stage('message', 'extract_features')
+    metrics.begin_timing()
+    with metrics.stage('url', 'explain'):
+        pass
+    assert metrics.end_timing() == {}
+
+
+def test_batched_stage_timings_reach_the_submitting_thread():
+    def score(items):
+        with metrics.stage('url', 'predict_proba'):
+            return items
+
+    batcher = MicroBatcher(score, max_batch_size=4)
+    metrics.begin_timing()
+    assert batcher.submit('x') == 'x'
+
+    assert set(metrics.end_timing()) == {'predict_proba', 'batch_wait'}
@@ -0,0 +1,94 @@
+"""
+Micro Batcher Tests
+"""
+
+import threading
+
+import pytest
+
+from micro_batcher import BatchTimeout, MicroBatcher
+
+
+def _submit_concurrently(batcher, items):
+    results = [None] * len(items)
+    errors = []
+
+    def call(i):
+        try:
+            results[i] = batcher.submit(items[i])
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_items_share_a_batch_and_get_their_own_results():
+    batches = []
+
+    def score(items):
+        batches.append(len(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(score, max_batch_size=4, max_wait=0.5)
+    results, errors = _submit_concurrently(batcher, list(range(8)))
+
+    assert errors == []
+    assert results == [item * 10 for item in range(8)]
+    assert sum(batches) == 8 and max(batches) == 4 and len(batches) < 8
+    stats = batcher.stats()
+    assert stats['items'] == 8 and stats['batches'] == len(batches)
+    assert sum(stats['batch_sizes'].values()) == len(batches)
+    assert stats['max_queue_wait_ms'] >= stats['mean_queue_wait_ms'] > 0
+
+
+def test_batch_error_reaches_every_caller():
+    def score(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait=0.05)
+    results, errors = _submit_concurrently(batcher, ['a', 'b', 'c'])
+
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    assert batcher.stats()['failed_batches'] >= 1
+    # The worker survives a failed batch
+    batcher._score_batch = lambda items: [item.upper() for item in items]
+    assert batcher.submit('d') == 'D'
+
+
+def test_batch_size_one_scores_in_the_calling_thread():
+    callers = []
+
+    def score(items):
+        callers.append(threading.current_thread())
+        return items
+
+    batcher = MicroBatcher(score, max_batch_size=1)
+
+    assert batcher.submit('x') == 'x'
+    assert callers == [threading.current_thread()]
+    assert batcher.stats()['batch_sizes'] == {1: 1}
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_submit_times_out_and_a_dead_worker_is_restarted():
+    release = threading.Event()
+
+    def score(items):
+        if not release.is_set():
+            # Escapes the batch's error handling and kills the worker thread
+            raise SystemExit
+        return items
+
+    batcher = MicroBatcher(score, max_batch_size=4, max_wait=0.001, timeout=0.2)
+    with pytest.raises(BatchTimeout):
+        batcher.submit('a')
+    batcher._thread.join(timeout=5)
+
+    release.set()
+    assert batcher.submit('b') == 'b'
+    assert (batcher.stats()['timeouts'], batcher.stats()['restarts']) == (1, 1)
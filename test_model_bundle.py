@@ -0,0 +1,68 @@
+"""
+Model Bundle Tests
+"""
+
+import gc
+import os
+
+import pytest
+
+from fake_detector import FakeDetector, models_available
+from model_bundle import ModelSchemaError, current_version, load_bundle, save_bundle
+
+def test_flat_engine_loads_without_unpickling_model(tmp_path, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    expected = train_url_detector(model_dir).detect_urls(urls)
+
+    detector = FakeDetector(model_dir=model_dir, use_flat_engine=True)
+    results = detector.detect_urls(urls)
+
+    assert 'model.pkl' not in detector.url_bundle._objects
+    assert not detector.url_engine.arrays['threshold'].flags.writeable
+    for result, reference in zip(results, expected):
+        assert result['is_fake'] == reference['is_fake']
+        assert result['confidence'] == pytest.approx(reference['confidence'], abs=1e-9)
+
+    # The scikit-learn path unpickles the model from the same bundle
+    assert FakeDetector(model_dir=model_dir).detect_urls(urls) == expected
+    assert not models_available(model_dir)
+
+
+def test_schema_mismatch_is_rejected(tmp_path, train_url_detector):
+    detector = train_url_detector(str(tmp_path))
+    root = str(tmp_path / 'url_bundle')
+    names = detector.url_extractor.get_feature_names()
+
+    with pytest.raises(ModelSchemaError):
+        load_bundle(root, names[1:] + names[:1])
+
+
+def test_same_model_saves_same_version(tmp_path, train_url_detector):
+    detector = train_url_detector(str(tmp_path))
+    root = str(tmp_path / 'url_bundle')
+    version = current_version(root)
+
+    assert save_bundle(root, 'url', detector.url_model, detector.url_scaler,
+                       detector.url_extractor.get_feature_names()) == version
+    assert load_bundle(root, detector.url_extractor.get_feature_names()).version == version
+
+
+def test_versions_in_use_are_not_pruned(tmp_path, train_url_detector):
+    detector = train_url_detector(str(tmp_path))
+    root = str(tmp_path / 'url_bundle')
+    names = detector.url_extractor.get_feature_names()
+
+    def save(n):
+        return save_bundle(root, 'url', detector.url_model, detector.url_scaler, names, metadata={'n': n})
+
+    in_use = load_bundle(root, names)
+    os.utime(os.path.join(root, in_use.version), (0, 0))
+    for n in range(3):
+        save(n)
+    # Still serving from the old version, which is unpickled lazily
+    assert in_use.model is not None and in_use.scaler is not None
+
+    del in_use
+    gc.collect()
+    save(3)
+    assert len([entry for entry in os.listdir(root) if not entry.startswith('.') and entry != 'CURRENT']) == 2
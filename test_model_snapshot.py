@@ -0,0 +1,88 @@
+"""
+Model Snapshot and Hot-Reload Tests
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.preprocessing import StandardScaler
+
+from fake_detector import FakeDetector
+from model_bundle import ModelSchemaError
+from model_snapshot import ModelSnapshot
+
+
+def _retrain_inverted(model_dir, urls):
+    """Save a new URL bundle version whose model flips every label of train_url_detector's"""
+    detector = FakeDetector(model_dir=model_dir)
+    X = detector.url_extractor.extract_matrix(urls * 5)
+    detector.url_scaler = StandardScaler().fit(X)
+    detector.url_model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=10, random_state=0))], voting='soft'
+    ).fit(detector.url_scaler.transform(X), 1 - np.array([0, 0, 1, 1, 0, 1, 0, 1] * 5))
+    detector._save_url_model()
+
+
+def test_snapshot_is_immutable():
+    snapshot = ModelSnapshot('url', model='model', scaler='scaler')
+
+    with pytest.raises(AttributeError):
+        snapshot.model = 'other'
+    replaced = snapshot.replace(scaler='new scaler')
+    assert (replaced.model, replaced.scaler, snapshot.scaler) == ('model', 'new scaler', 'scaler')
+
+
+def test_reload_swaps_changed_models_and_pins_in_flight_batches(tmp_path, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    train_url_detector(model_dir)
+    detector = FakeDetector(model_dir=model_dir, use_flat_engine=True)
+    before = [r['is_fake'] for r in detector.detect_urls(urls)]
+    in_flight = detector._snapshot('url')
+
+    assert detector.reload_models() == []
+    _retrain_inverted(model_dir, urls)
+    assert detector.reload_models() == ['url']
+
+    assert [r['is_fake'] for r in detector.detect_urls(urls)] == [not is_fake for is_fake in before]
+    assert [r['is_fake'] for r in detector._score_urls(urls, in_flight)] == before
+    assert detector.model_state()['url']['generation'] == in_flight.generation + 1
+    assert detector.model_state()['message']['loaded'] is False
+
+
+def test_concurrent_batches_never_mix_snapshots(tmp_path, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    train_url_detector(model_dir)
+    detector = FakeDetector(model_dir=model_dir, use_flat_engine=True)
+    before = [r['is_fake'] for r in detector.detect_urls(urls)]
+    seen = []
+    stop = threading.Event()
+
+    def score():
+        while not stop.is_set():
+            seen.append([r['is_fake'] for r in detector.detect_urls(urls)])
+
+    threads = [threading.Thread(target=score) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _retrain_inverted(model_dir, urls)
+    detector.reload_models()
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert seen and all(verdicts in (before, [not is_fake for is_fake in before]) for verdicts in seen)
+
+
+def test_failed_reload_keeps_serving_the_old_snapshot(tmp_path, monkeypatch, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    train_url_detector(model_dir)
+    detector = FakeDetector(model_dir=model_dir, use_flat_engine=True)
+    before = detector.detect_urls(urls)
+    _retrain_inverted(model_dir, urls)
+    monkeypatch.setattr(detector.url_extractor, 'get_feature_names', lambda: ['renamed'])
+
+    with pytest.raises(ModelSchemaError):
+        detector.reload_models()
+    assert detector.detect_urls(urls) == before
@@ -0,0 +1,50 @@
+"""
+Inference Parallelism Tests
+"""
+
+import time
+
+import numpy as np
+
+from fake_detector import FakeDetector
+from parallelism import POLICY_FILE, ParallelismPolicy, calibrate
+
+
+def test_policy_is_serial_for_small_batches(tmp_path):
+    policy = ParallelismPolicy(min_parallel_rows=100, max_workers=4)
+    assert [policy.workers(n) for n in (1, 99, 100, 5000)] == [1, 1, 4, 4]
+    assert ParallelismPolicy(min_parallel_rows=1, max_workers=1).workers(5000) == 1
+
+    path = str(tmp_path / POLICY_FILE)
+    assert ParallelismPolicy.load(path).min_parallel_rows == ParallelismPolicy().min_parallel_rows
+    policy.save(path)
+    assert ParallelismPolicy.load(path).to_dict() == policy.to_dict()
+    assert FakeDetector(model_dir=str(tmp_path)).parallelism.to_dict() == policy.to_dict()
+
+
+def test_calibration_finds_the_parallel_threshold():
+    def predict(rows, n_jobs):
+        # Fixed fan-out cost per extra thread, work split across threads
+        time.sleep(0.0005 * (n_jobs - 1) + len(rows) * 1e-6 / n_jobs)
+
+    policy, timings = calibrate(predict, np.zeros((10, 3)), [1, 100, 5000, 20000], [2, 4], repeat=2)
+
+    assert [timing['rows'] for timing in timings] == [1, 100, 5000, 20000]
+    assert policy.min_parallel_rows == 5000 and policy.max_workers == 4
+
+
+def test_threaded_engine_matches_serial(tmp_path, train_url_detector, urls):
+    engine = train_url_detector(str(tmp_path)).export_flat_engine('url')
+    X = FakeDetector(model_dir=str(tmp_path)).url_extractor.extract_matrix(urls * 50)
+
+    assert np.array_equal(engine.predict_proba(X, n_jobs=3), engine.predict_proba(X))
+
+
+def test_loaded_models_have_their_training_n_jobs_cleared(tmp_path, train_url_detector, urls):
+    detector = train_url_detector(str(tmp_path))
+    detector.url_model.estimators_[0].n_jobs = -1
+    detector._save_url_model()
+
+    loaded = FakeDetector(model_dir=str(tmp_path))
+    loaded.detect_urls(urls)
+    assert loaded.url_model.estimators_[0].n_jobs is None
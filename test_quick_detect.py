@@ -0,0 +1,61 @@
+"""
+Quick Detect Scan Tests
+"""
+
+import io
+import json
+
+import pytest
+
+from quick_detect import read_records, scan, scan_main
+
+
+def test_read_records_formats():
+    csv_input = io.StringIO("id,url\n1,https://a.com\n2,\n3,http://b.tk\n")
+    jsonl_input = io.StringIO('{"link": "https://a.com"}\n\n{"link": "http://b.tk"}\n')
+    lines_input = io.StringIO("https://a.com\n\nhttp://b.tk\n")
+
+    assert list(read_records(csv_input, 'csv')) == [(2, 'https://a.com'), (4, 'http://b.tk')]
+    assert list(read_records(jsonl_input, 'jsonl')) == [(1, 'https://a.com'), (3, 'http://b.tk')]
+    assert list(read_records(lines_input, 'lines')) == [(1, 'https://a.com'), (3, 'http://b.tk')]
+
+
+def test_scan_reports_unreadable_records_and_continues(tmp_path, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    train_url_detector(model_dir)
+    jsonl_input = io.StringIO(f'{{"url": "{urls[0]}"}}\n{{"url": \n{{"url": 42}}\n"{urls[1]}"\n')
+    sink = io.StringIO()
+
+    stats = scan(read_records(jsonl_input, 'jsonl'), sink, 'url', batch_size=2, model_dir=model_dir)
+
+    results = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert [r['line'] for r in results] == [1, 2, 3, 4]
+    assert 'invalid JSON' in results[1]['error'] and 'int' in results[2]['error']
+    assert [r['input'] for r in (results[0], results[3])] == urls[:2]
+    assert (stats['records'], stats['errors']) == (4, 2)
+
+
+def test_scan_rejects_csv_without_header(tmp_path, capsys, train_url_detector):
+    model_dir = str(tmp_path)
+    train_url_detector(model_dir)
+    empty = tmp_path / 'empty.csv'
+    empty.write_text('')
+
+    assert scan_main(['url', str(empty), '--model-dir', model_dir, '--workers', '1', '--quiet']) == 1
+    assert capsys.readouterr().err.startswith('Error: ')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_scan_keeps_input_order(tmp_path, workers, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    expected = train_url_detector(model_dir).detect_urls(urls * 3)
+    records = [(number, url) for number, url in enumerate(urls * 3, 1)]
+    sink = io.StringIO()
+
+    stats = scan(records, sink, 'url', batch_size=5, workers=workers, model_dir=model_dir)
+
+    results = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert stats['records'] == len(results) == len(records)
+    assert [r['line'] for r in results] == list(range(1, len(records) + 1))
+    assert [r['is_fake'] for r in results] == [e['is_fake'] for e in expected]
+    assert stats['fake'] == sum(e['is_fake'] for e in expected)
@@ -0,0 +1,75 @@
+"""
+Production Server Tests
+Starts serve.py with two workers against freshly trained models
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.preprocessing import StandardScaler
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MESSAGES = ['Hello, how are you?', 'URGENT! Verify your account NOW: http://bit.ly/x',
+            'See you at 3 PM tomorrow.', 'You WON $1,000,000! Claim your prize now!']
+
+
+def _train_message_model(detector):
+    X = np.array([list(detector.message_extractor.extract_features(m).values()) for m in MESSAGES * 5])
+    y = np.array([0, 1, 0, 1] * 5)
+    detector.message_scaler = StandardScaler().fit(X)
+    detector.message_model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=5, random_state=0))], voting='soft'
+    ).fit(detector.message_scaler.transform(X), y)
+    detector._save_message_model()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="serve.py needs os.fork")
+def test_workers_preload_warm_up_and_stop_on_sigterm(tmp_path, train_url_detector):
+    _train_message_model(train_url_detector(str(tmp_path / 'models')))
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, DB_WRITE_BEHIND='1', URL_RULES='off')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, 'serve.py'), '--host', '127.0.0.1', '--port', '0', '--workers', '2'],
+        cwd=str(tmp_path), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        lines = []
+        while sum('ready (warm-up' in line for line in lines) < 2:
+            line = server.stdout.readline()
+            assert line, ''.join(lines)
+            lines.append(line)
+        port = next(line for line in lines if line.startswith('Listening on')).split(':')[2].split()[0]
+
+        status, ready = _get(f'http://127.0.0.1:{port}/readyz')
+        assert status == 200 and ready['ready']
+        assert ready['models']['url']['loaded'] and ready['models']['url']['flat_engine']
+        assert set(ready['warmup_ms']) == {'url', 'message'}
+        status, health = _get(f'http://127.0.0.1:{port}/healthz')
+        assert status == 200 and health['status'] == 'ok'
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+
+
+def test_readyz_before_warm_up():
+    import app as webapp
+
+    response = webapp.app.test_client().get('/readyz')
+    if webapp.warmup_state['pid'] != os.getpid():
+        assert response.status_code == 503
+        assert response.get_json()['warmed_up'] is False
@@ -0,0 +1,61 @@
+"""
+Startup Tests
+Import-graph budget for the inference path, measured with python -X importtime
+"""
+
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Training and analytics only; none of these may load when serving detections
+HEAVY_MODULES = ('sklearn', 'scipy', 'matplotlib', 'seaborn', 'pandas')
+# Cumulative import time of app.py; scikit-learn alone takes about a second
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '1000'))
+
+
+def _run(code, cwd=REPO_DIR):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=cwd, env=env, check=True
+    )
+
+
+def _imported_modules(stderr):
+    """{module: cumulative microseconds} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def _heavy(modules):
+    return sorted(name for name in modules if name.split('.')[0] in HEAVY_MODULES)
+
+
+def test_entry_points_skip_training_and_analytics_stack():
+    for module in ('fake_detector', 'quick_detect', 'app'):
+        modules = _imported_modules(_run(f'import {module}').stderr)
+        assert _heavy(modules) == [], module
+
+    app_ms = _imported_modules(_run('import app').stderr)['app'] / 1000
+    assert app_ms < IMPORT_BUDGET_MS, f"import app took {app_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_flat_engine_detection_never_imports_sklearn(tmp_path, train_url_detector, urls):
+    train_url_detector(str(tmp_path))
+
+    result = _run(
+        "import sys\n"
+        "from fake_detector import FakeDetector\n"
+        f"detector = FakeDetector(model_dir={str(tmp_path)!r}, use_flat_engine=True)\n"
+        f"print(len(detector.detect_urls({urls!r})), detector.url_engine is not None)\n"
+        f"print(sorted(name for name in sys.modules if name.split('.')[0] in {HEAVY_MODULES!r}))",
+        cwd=str(tmp_path)
+    )
+
+    assert result.stdout.split('\n')[:2] == [f'{len(urls)} True', '[]']
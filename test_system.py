@@ -3,8 +3,7 @@ Quick Test Script
 Tests the fake detection system with sample inputs
 """
 
-from fake_detector import FakeDetector
-import os
+from fake_detector import FakeDetector, models_available
 
 def test_system():
     """Test the detection system"""
@@ -12,7 +11,7 @@ def test_system():
     print("=" * 60)
     
     # Check if models exist
-    if not os.path.exists('models/url_model.pkl') or not os.path.exists('models/message_model.pkl'):
+    if not models_available():
         print("⚠️  Models not found. Please run 'python train_models.py' first.")
         return False
     
@@ -0,0 +1,50 @@
+"""
+Tree Engine Tests
+Checks that the flat-array engine reproduces VotingClassifier.predict_proba
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from tree_engine import FlatEnsemble
+
+
+def _training_data():
+    rng = np.random.RandomState(0)
+    X = rng.normal(loc=3.0, scale=2.0, size=(400, 6))
+    y = (X[:, 0] + X[:, 1] ** 2 + rng.normal(size=400) > 6).astype(int)
+    return X, y
+
+
+def test_flat_engine_matches_voting_classifier():
+    X, y = _training_data()
+    scaler = StandardScaler().fit(X)
+    model = VotingClassifier(
+        estimators=[
+            ('rf', RandomForestClassifier(n_estimators=30, max_depth=8, class_weight='balanced', random_state=0)),
+            ('gb', GradientBoostingClassifier(n_estimators=25, max_depth=4, subsample=0.8, random_state=0)),
+        ],
+        voting='soft',
+        weights=[3, 2]
+    ).fit(scaler.transform(X), y)
+
+    engine = FlatEnsemble.from_voting_classifier(model, scaler=scaler)
+    X_new = np.random.RandomState(1).normal(loc=3.0, scale=2.5, size=(2500, 6))
+    expected = model.predict_proba(scaler.transform(X_new))
+
+    np.testing.assert_allclose(engine.predict_proba(X_new), expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(engine.predict_proba(X_new[:1]), expected[:1], rtol=0, atol=1e-12)
+
+
+def test_flat_engine_rejects_non_tree_members():
+    X, y = _training_data()
+    model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=5, random_state=0)), ('lr', LogisticRegression())],
+        voting='soft'
+    ).fit(X, y)
+
+    with pytest.raises(ValueError):
+        FlatEnsemble.from_voting_classifier(model)
@@ -0,0 +1,54 @@
+"""
+URL Rule Pre-classifier Tests
+"""
+
+from fake_detector import FakeDetector
+from url_feature_extractor import URLFeatureExtractor
+from url_rules import URLRuleClassifier
+
+
+def test_rules_decide_only_clear_cut_urls():
+    rules = URLRuleClassifier(URLFeatureExtractor())
+    decided = {
+        'http/evil.com': ('malformed', True),
+        'https://www.github.com/user/repo': ('known_legitimate', False),
+        'http://192.168.1.1/bank/login.php': ('ip_login', True),
+        'https://bit.ly/abc123': ('short_url', True),
+    }
+    undecided = ['https://github.com.evil.tk', 'https://google.com@evil.tk/', 'http://192.168.1.1/', 'example.org']
+
+    for url, (rule, is_fake) in decided.items():
+        name, result = rules.classify(url)
+        assert (name, result['is_fake']) == (rule, is_fake), url
+        assert result['url'] == url and result['reasons']
+    for url in undecided:
+        assert rules.classify(url) is None, url
+
+    stats = rules.stats()
+    assert stats['checked'] == len(decided) + len(undecided)
+    assert {rule: counts['fired'] for rule, counts in stats['rules'].items()} == dict.fromkeys(stats['rules'], 1)
+
+
+def test_rules_skip_the_model_unless_auditing(tmp_path, monkeypatch, train_url_detector, urls):
+    model_dir = str(tmp_path)
+    expected = train_url_detector(model_dir).detect_urls(urls)
+    scored = []
+    score_urls = FakeDetector._score_urls
+    monkeypatch.setattr(FakeDetector, '_score_urls',
+                        lambda self, urls, snapshot: scored.extend(urls) or score_urls(self, urls, snapshot))
+
+    detector = FakeDetector(model_dir=model_dir)
+    detector.url_rules = URLRuleClassifier(detector.url_extractor, audit=True)
+    audited = detector.detect_urls(urls)
+
+    assert audited == expected and scored == urls
+    stats = detector.url_rules.stats()['rules']
+    assert sum(counts['audited'] for counts in stats.values()) == sum(counts['fired'] for counts in stats.values()) > 0
+
+    scored.clear()
+    detector.url_rules = URLRuleClassifier(detector.url_extractor)
+    results = detector.detect_urls(urls)
+
+    decided = [url for url in urls if detector.url_rules.classify(url) is not None]
+    assert decided and scored == [url for url in urls if url not in decided]
+    assert [result['url'] for result in results] == urls
@@ -0,0 +1,105 @@
+"""
+Verdict Cache Tests
+"""
+
+import pytest
+
+from fake_detector import FakeDetector
+from verdict_cache import VerdictCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = VerdictCache(max_size=2, ttl_seconds=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = VerdictCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.put('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_invalidate_drops_everything():
+    cache = VerdictCache()
+    cache.put('a', 1)
+    cache.invalidate()
+    assert cache.get('a') is None
+
+
+@pytest.fixture
+def cached_detector(tmp_path, monkeypatch, train_url_detector):
+    """Detector with a verdict cache, plus a list of the URL batches it actually scored"""
+    train_url_detector(str(tmp_path))
+    detector = FakeDetector(model_dir=str(tmp_path), use_flat_engine=True, verdict_cache=VerdictCache())
+    scored = []
+    score = detector._score_urls
+
+    def counting_score(urls, snapshot):
+        scored.append(list(urls))
+        return score(urls, snapshot)
+
+    monkeypatch.setattr(detector, '_score_urls', counting_score)
+    return detector, scored
+
+
+def test_urls_with_and_without_protocol_share_an_entry(cached_detector):
+    detector, scored = cached_detector
+
+    first, = detector.detect_urls(['example.com'])
+    second, = detector.detect_urls(['https://example.com'])
+
+    assert scored == [['example.com']]
+    assert second['url'] == 'https://example.com'
+    assert (second['is_fake'], second['confidence'], second['reasons']) == (
+        first['is_fake'], first['confidence'], first['reasons'])
+
+
+def test_snapshot_swaps_invalidate_cached_verdicts(cached_detector):
+    detector, scored = cached_detector
+    detector.detect_urls(['https://example.com'])
+    old_snapshot = detector._snapshot('url')
+
+    detector.reload_models(changed_only=False)
+    # A batch still scoring on the old snapshot stores its verdict after the swap
+    detector.verdict_cache.put(detector._cache_key(old_snapshot, 'https://example.com'), (True, 1.0, ()))
+    detector.detect_urls(['https://example.com'])
+    detector._install(detector._snapshot('url'))
+    detector.detect_urls(['https://example.com'])
+
+    assert len(scored) == 3
+    assert detector._snapshot('url').generation == old_snapshot.generation + 2
+
+
+def test_callers_cannot_change_cached_verdicts(cached_detector):
+    detector, scored = cached_detector
+    first, = detector.detect_urls(['https://example.com'])
+    expected = dict(first, reasons=list(first['reasons']))
+
+    for result in (first, detector.detect_urls(['https://example.com'])[0]):
+        result['reasons'].append('changed by the caller')
+        result['is_fake'] = not result['is_fake']
+
+    assert detector.detect_urls(['https://example.com'])[0] == expected
+    assert len(scored) == 1
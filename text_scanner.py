@@ -0,0 +1,84 @@
+"""
+Text Scanner
+Shared character and word statistics for the URL and message feature extractors
+"""
+
+import math
+import re
+from collections import Counter, namedtuple
+
+SPECIAL_CHARS = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+
+# Patterns are compiled once at import instead of on every extract_features call
+URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+SENTENCE_BREAK_PATTERN = re.compile(r'[.!?]+')
+REPEATED_CHAR_PATTERN = re.compile(r'(.)\1{2,}')
+
+CharScan = namedtuple('CharScan', [
+    'counts', 'uppercase_count', 'lowercase_count', 'digit_count',
+    'letter_count', 'special_char_count', 'entropy'
+])
+
+WordScan = namedtuple('WordScan', [
+    'word_count', 'total_word_length', 'max_word_repetition', 'unique_word_count'
+])
+
+
+def scan_chars(text):
+    """
+    Compute character-class counts and Shannon entropy of a text
+
+    The text is walked once (by Counter, in C) to build a character
+    histogram; everything else is derived from its distinct characters.
+
+    Returns:
+        CharScan: Histogram, class counts and entropy
+    """
+    counts = Counter(text)
+    uppercase_count = lowercase_count = digit_count = letter_count = special_char_count = 0
+    for ch, n in counts.items():
+        if ch.isupper():
+            uppercase_count += n
+        if ch.islower():
+            lowercase_count += n
+        if ch.isdigit():
+            digit_count += n
+        if ch.isalpha():
+            letter_count += n
+        if ch in SPECIAL_CHARS:
+            special_char_count += n
+    return CharScan(
+        counts, uppercase_count, lowercase_count, digit_count,
+        letter_count, special_char_count, entropy_from_counts(counts, len(text))
+    )
+
+
+def entropy_from_counts(counts, length):
+    """Shannon entropy from a character histogram (in first-occurrence order)"""
+    if not length:
+        return 0
+    prob = [float(n) / length for n in counts.values()]
+    return -sum([p * math.log2(p) for p in prob if p > 0])
+
+
+def scan_words(text):
+    """
+    Split a text into words once and compute word statistics
+
+    Repetition is counted case-insensitively, like ``text.lower().split()``.
+
+    Returns:
+        WordScan: Word count, total word length, max repetition and unique words
+    """
+    words = text.split()
+    if not words:
+        return WordScan(0, 0, 0, 0)
+    word_freq = Counter(word.lower() for word in words)
+    return WordScan(len(words), sum(map(len, words)), max(word_freq.values()), len(word_freq))
+
+
+def count_repeated_runs(text):
+    """Count runs of 3+ identical characters (like "loooook", "freeee")"""
+    return len(REPEATED_CHAR_PATTERN.findall(text))
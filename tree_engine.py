@@ -0,0 +1,196 @@
+"""
+Tree Engine
+Flat-array inference for the soft-voting Random Forest + Gradient Boosting ensembles
+"""
+
+import numpy as np
+
+TREE_LEAF = -1
+
+
+class FlatEnsemble:
+    """
+    Every tree of a VotingClassifier flattened into contiguous NumPy arrays
+
+    All trees are walked together, one vectorized step per tree level, and
+    the per-member probabilities are combined with the same soft-voting
+    weights as the original model. Leaves point to themselves, so trees
+    shallower than the deepest one simply stay put.
+
+    Only NumPy is needed for prediction; scikit-learn is imported just to
+    flatten a fitted model.
+    """
+
+    # Row chunk size, bounds the (rows x trees) working arrays
+    CHUNK_ROWS = 1024
+
+    def __init__(self, arrays, members, classes, depth, scaler=None):
+        """
+        Args:
+            arrays: dict of node arrays ('feature', 'threshold', 'left', 'right',
+                    'forest_value', 'boosting_value'), tree 'roots' and optionally
+                    the scaling arrays 'input_mean' and 'input_scale'; may be
+                    read-only memory-mapped arrays
+            members: List of dicts describing each voting member
+                     (kind, weight, first_tree, last_tree, init)
+            classes: Class labels, like VotingClassifier.classes_
+            depth: Depth of the deepest tree
+            scaler: Optional fitted StandardScaler applied before the trees
+                    (stored as the 'input_mean' and 'input_scale' arrays)
+        """
+        if scaler is not None:
+            n_features = scaler.n_features_in_
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+            arrays = dict(
+                arrays,
+                input_mean=np.asarray(mean, dtype=np.float64),
+                input_scale=np.asarray(scale, dtype=np.float64),
+            )
+        self.arrays = arrays
+        self.members = members
+        self.classes_ = np.asarray(classes)
+        self.n_classes = len(self.classes_)
+        self.depth = int(depth)
+
+    @classmethod
+    def from_voting_classifier(cls, model, scaler=None):
+        """
+        Flatten a fitted soft-voting VotingClassifier of tree ensembles
+
+        Raises:
+            ValueError: If the model uses members or settings the engine cannot reproduce
+        """
+        from sklearn.dummy import DummyClassifier
+        from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+        if model.voting != 'soft':
+            raise ValueError("Only soft voting can be flattened")
+        n_classes = len(model.classes_)
+
+        active = [est for _, est in model.estimators if est != 'drop']
+        weights = model.weights
+        if weights is not None:
+            weights = [w for (_, est), w in zip(model.estimators, weights) if est != 'drop']
+        else:
+            weights = [1] * len(active)
+
+        trees = []
+        members = []
+        for estimator, weight in zip(model.estimators_, weights):
+            first_tree = len(trees)
+            if isinstance(estimator, RandomForestClassifier):
+                for tree in estimator.estimators_:
+                    value = tree.tree_.value[:, 0, :n_classes]
+                    normalizer = value.sum(axis=1, keepdims=True)
+                    normalizer[normalizer == 0] = 1
+                    trees.append((tree.tree_, value / normalizer, None))
+                members.append({'kind': 'forest', 'weight': float(weight)})
+            elif isinstance(estimator, GradientBoostingClassifier) and n_classes == 2:
+                if not (estimator.init_ == 'zero' or isinstance(estimator.init_, DummyClassifier)):
+                    raise ValueError("Gradient boosting with a custom init estimator cannot be flattened")
+                sample = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+                init = float(estimator._raw_predict_init(sample)[0, 0])
+                for stage in estimator.estimators_[:, 0]:
+                    trees.append((stage.tree_, None, stage.tree_.value[:, 0, 0] * estimator.learning_rate))
+                members.append({'kind': 'boosting', 'weight': float(weight), 'init': init})
+            else:
+                raise ValueError(f"Cannot flatten estimator {type(estimator).__name__}")
+            members[-1]['first_tree'] = first_tree
+            members[-1]['last_tree'] = len(trees)
+
+        arrays, depth = cls._flatten(trees, n_classes)
+        return cls(arrays, members, model.classes_, depth, scaler=scaler)
+
+    @staticmethod
+    def _flatten(trees, n_classes):
+        node_count = sum(tree.node_count for tree, _, _ in trees)
+        feature = np.zeros(node_count, dtype=np.int32)
+        threshold = np.full(node_count, np.inf, dtype=np.float64)
+        left = np.zeros(node_count, dtype=np.int32)
+        right = np.zeros(node_count, dtype=np.int32)
+        forest_value = np.zeros((node_count, n_classes), dtype=np.float64)
+        boosting_value = np.zeros(node_count, dtype=np.float64)
+        roots = np.zeros(len(trees), dtype=np.int32)
+        depth = 0
+
+        offset = 0
+        for i, (tree, proba, raw) in enumerate(trees):
+            nodes = np.arange(offset, offset + tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left == TREE_LEAF
+            roots[i] = offset
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+            left[nodes] = np.where(is_leaf, nodes, tree.children_left + offset)
+            right[nodes] = np.where(is_leaf, nodes, tree.children_right + offset)
+            if proba is not None:
+                forest_value[nodes] = proba
+            if raw is not None:
+                boosting_value[nodes] = raw
+            depth = max(depth, tree.max_depth)
+            offset += tree.node_count
+
+        arrays = {
+            'feature': feature, 'threshold': threshold, 'left': left, 'right': right,
+            'forest_value': forest_value, 'boosting_value': boosting_value, 'roots': roots,
+        }
+        return arrays, depth
+
+    def predict_proba(self, X, n_jobs=1):
+        """
+        Soft-vote class probabilities, like VotingClassifier.predict_proba
+
+        Args:
+            X: Feature matrix (unscaled if the engine was built with a scaler)
+            n_jobs: Threads scoring row chunks concurrently (NumPy releases the GIL)
+
+        Returns:
+            numpy.ndarray: Array of shape (n_samples, n_classes)
+        """
+        X = np.array(X, dtype=np.float64)
+        if 'input_mean' in self.arrays:
+            X -= self.arrays['input_mean']
+            X /= self.arrays['input_scale']
+        # Trees compare float32 features against float64 thresholds
+        X = X.astype(np.float32)
+
+        proba = np.empty((len(X), self.n_classes), dtype=np.float64)
+        if n_jobs > 1 and len(X) > 1:
+            from parallelism import thread_pool
+
+            # At least one chunk per thread, none larger than CHUNK_ROWS
+            chunk_rows = min(self.CHUNK_ROWS, -(-len(X) // n_jobs))
+            starts = range(0, len(X), chunk_rows)
+            chunks = thread_pool(n_jobs).map(lambda start: self._predict_chunk(X[start:start + chunk_rows]), starts)
+            for start, chunk_proba in zip(starts, chunks):
+                proba[start:start + len(chunk_proba)] = chunk_proba
+            return proba
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            chunk = X[start:start + self.CHUNK_ROWS]
+            proba[start:start + len(chunk)] = self._predict_chunk(chunk)
+        return proba
+
+    def _predict_chunk(self, X):
+        a = self.arrays
+        feature, threshold, left, right = a['feature'], a['threshold'], a['left'], a['right']
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(a['roots'][None, :], len(X), axis=0)
+        for _ in range(self.depth):
+            go_left = X[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+
+        weighted = np.zeros((len(X), self.n_classes), dtype=np.float64)
+        total_weight = 0.0
+        for member in self.members:
+            leaves = nodes[:, member['first_tree']:member['last_tree']]
+            if member['kind'] == 'forest':
+                member_proba = a['forest_value'][leaves].mean(axis=1)
+            else:
+                raw = member['init'] + a['boosting_value'][leaves].sum(axis=1)
+                # Logistic sigmoid (scipy.special.expit) without importing SciPy
+                with np.errstate(over='ignore'):
+                    positive = 1.0 / (1.0 + np.exp(-raw))
+                member_proba = np.column_stack([1 - positive, positive])
+            weighted += member['weight'] * member_proba
+            total_weight += member['weight']
+        return weighted / total_weight
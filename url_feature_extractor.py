@@ -4,9 +4,82 @@ Extracts various features from URLs to detect fake/malicious links
 """
 
 import re
+from collections import Counter
 from urllib.parse import urlparse
 import ipaddress
-import math
+
+import numpy as np
+
+from domain_index import DomainIndex
+from keyword_matcher import KeywordMatcher
+from text_scanner import SPECIAL_CHARS, entropy_from_counts, scan_chars
+
+# Column layout of the URL feature matrix. Models are trained against this
+# exact order, so bump FEATURE_SCHEMA_VERSION whenever it changes.
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_NAMES = (
+    'url_length', 'domain_length', 'path_length', 'query_length',
+    'has_https', 'has_http', 'subdomain_count', 'has_ip',
+    'has_port', 'tld_length', 'suspicious_tld', 'suspicious_keyword_count',
+    'has_click', 'has_verify', 'has_update', 'has_account',
+    'has_login', 'special_char_count', 'digit_count', 'letter_count',
+    'hyphen_count', 'underscore_count', 'dot_count', 'slash_count',
+    'equal_count', 'question_mark_count', 'ampersand_count',
+    'url_entropy', 'domain_entropy', 'digit_ratio', 'letter_ratio',
+    'special_char_ratio', 'is_short_url', 'path_depth',
+    'query_param_count', 'is_known_legitimate'
+)
+
+# Features derived from the parsed URL, in the order _structural_features returns them
+STRUCTURAL_FEATURES = (
+    'url_length', 'domain_length', 'path_length', 'query_length',
+    'has_https', 'has_http', 'subdomain_count', 'has_ip', 'has_port',
+    'tld_length', 'suspicious_tld', 'suspicious_keyword_count',
+    'has_click', 'has_verify', 'has_update', 'has_account', 'has_login',
+    'url_entropy', 'domain_entropy', 'is_short_url', 'path_depth',
+    'query_param_count', 'is_known_legitimate'
+)
+
+# Character-count features, in the order _count_chars returns them
+COUNT_FEATURES = (
+    'special_char_count', 'digit_count', 'letter_count', 'hyphen_count',
+    'underscore_count', 'dot_count', 'slash_count', 'equal_count',
+    'question_mark_count', 'ampersand_count'
+)
+
+# (ratio feature, count feature) pairs; ratios are count / url_length
+RATIO_FEATURES = (
+    ('digit_ratio', 'digit_count'),
+    ('letter_ratio', 'letter_count'),
+    ('special_char_ratio', 'special_char_count'),
+)
+
+FLOAT_FEATURES = frozenset(['url_entropy', 'domain_entropy'] + [ratio for ratio, _ in RATIO_FEATURES])
+
+# URLs with http/ or https/ instead of http:// or https://
+MALFORMED_PROTOCOL_PATTERN = re.compile(r'^https?/[^/]')
+
+_SINGLE_CHAR_COUNTS = '-_./=?&'
+
+_COLUMN = {name: i for i, name in enumerate(FEATURE_NAMES)}
+_STRUCTURAL_COLUMNS = np.array([_COLUMN[name] for name in STRUCTURAL_FEATURES])
+_COUNT_COLUMNS = np.array([_COLUMN[name] for name in COUNT_FEATURES])
+
+
+def _build_ascii_count_table():
+    """Per-character membership table for COUNT_FEATURES over the ASCII range"""
+    table = np.zeros((128, len(COUNT_FEATURES)), dtype=np.uint8)
+    for code in range(128):
+        ch = chr(code)
+        table[code, 0] = ch in SPECIAL_CHARS
+        table[code, 1] = ch.isdigit()
+        table[code, 2] = ch.isalpha()
+        for offset, counted in enumerate(_SINGLE_CHAR_COUNTS):
+            table[code, 3 + offset] = ch == counted
+    return table
+
+
+_ASCII_COUNT_TABLE = _build_ascii_count_table()
 
 
 class URLFeatureExtractor:
@@ -37,6 +110,24 @@ class URLFeatureExtractor:
             'snapchat.com', 'whatsapp.com', 'telegram.org', 'discord.com',
             'zoom.us', 'slack.com', 'dropbox.com', 'onedrive.com'
         ]
+        
+        # Short URL services (only actual short URL services, not paths)
+        self.short_url_services = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'short.link', 'tiny.cc']
+        
+        # Domain reputation indexes; large lists are added with load_domain_list()
+        self.suspicious_tld_index = DomainIndex.from_domains(self.suspicious_tlds)
+        self.domain_indexes = {
+            'legitimate': [DomainIndex.from_domains(self.legitimate_domains)],
+            'short_url': [],
+            'blocked': [],
+        }
+        
+        # One automaton for the keyword count and the has_* flags
+        self.keyword_matcher = KeywordMatcher({
+            'suspicious_keyword': self.suspicious_keywords,
+            'click': ['click'], 'verify': ['verify'], 'update': ['update'],
+            'account': ['account'], 'login': ['login'],
+        })
     
     def extract_features(self, url):
         """
@@ -45,13 +136,101 @@ class URLFeatureExtractor:
         Returns:
             dict: Dictionary of features
         """
-        if not url or not isinstance(url, str):
+        normalized = self._normalize_url(url)
+        if normalized is None:
             return self._get_default_features()
+        url, parsed = normalized
+        
+        chars = scan_chars(url)
+        values = dict(zip(STRUCTURAL_FEATURES, self._structural_features(url, parsed, chars.entropy)))
+        values.update(zip(COUNT_FEATURES, (chars.special_char_count, chars.digit_count, chars.letter_count)))
+        values.update(zip(COUNT_FEATURES[3:], (chars.counts[ch] for ch in _SINGLE_CHAR_COUNTS)))
+        
+        # Ratio features
+        for ratio_name, count_name in RATIO_FEATURES:
+            values[ratio_name] = values[count_name] / len(url) if len(url) > 0 else 0
+        
+        return {name: values[name] for name in FEATURE_NAMES}
+    
+    def extract_matrix(self, urls, dtype=np.float32):
+        """
+        Extract features for a batch of URLs into one matrix
+        
+        Columns follow FEATURE_NAMES (schema FEATURE_SCHEMA_VERSION). The
+        character-count columns of all ASCII URLs are computed in one
+        vectorized pass over the concatenated batch.
+        
+        Args:
+            urls: List of URLs (strings)
+            dtype: float32 for model input; float64 rows hold the same values
+                   as extract_features (use them for features_from_row)
+        
+        Returns:
+            numpy.ndarray: Array of shape (len(urls), len(FEATURE_NAMES))
+        """
+        matrix = np.empty((len(urls), len(FEATURE_NAMES)), dtype=dtype)
+        default_row = [self._get_default_features()[name] for name in FEATURE_NAMES]
+        valid_rows = []
+        ascii_rows = []
+        ascii_urls = []
+        
+        for i, url in enumerate(urls):
+            normalized = self._normalize_url(url)
+            if normalized is None:
+                matrix[i] = default_row
+                continue
+            url, parsed = normalized
+            valid_rows.append(i)
+            counts = Counter(url)
+            url_entropy = entropy_from_counts(counts, len(url))
+            matrix[i, _STRUCTURAL_COLUMNS] = self._structural_features(url, parsed, url_entropy)
+            if url.isascii():
+                ascii_rows.append(i)
+                ascii_urls.append(url)
+            else:
+                matrix[i, _COUNT_COLUMNS] = self._count_chars(counts)
+        
+        if ascii_urls:
+            codes = np.frombuffer(''.join(ascii_urls).encode('ascii'), dtype=np.uint8)
+            lengths = np.fromiter(map(len, ascii_urls), dtype=np.intp, count=len(ascii_urls))
+            starts = np.concatenate(([0], np.cumsum(lengths[:-1])))
+            counts = np.add.reduceat(_ASCII_COUNT_TABLE[codes], starts, axis=0, dtype=np.int64)
+            matrix[np.array(ascii_rows)[:, None], _COUNT_COLUMNS] = counts
+        
+        if valid_rows:
+            rows = np.array(valid_rows)
+            url_lengths = matrix[rows, _COLUMN['url_length']].astype(np.float64)
+            for ratio_name, count_name in RATIO_FEATURES:
+                matrix[rows, _COLUMN[ratio_name]] = matrix[rows, _COLUMN[count_name]] / url_lengths
+        
+        return matrix
+    
+    def features_from_row(self, row):
+        """
+        Convert a row of extract_matrix back into a feature dictionary
+        
+        Only a float64 row gives the values of extract_features: float32
+        rounds ratios such as 0.15 up past the explanation thresholds.
+        """
+        return {
+            name: float(value) if name in FLOAT_FEATURES else int(value)
+            for name, value in zip(FEATURE_NAMES, row)
+        }
+    
+    def _normalize_url(self, url):
+        """
+        Validate a URL and add a missing protocol
+        
+        Returns:
+            tuple: (url, parsed) or None if the URL is invalid/malformed
+        """
+        if not url or not isinstance(url, str):
+            return None
         
         # Check for malformed URL patterns (like http/domain.com instead of http://domain.com)
-        if re.match(r'^https?/[^/]', url):
+        if MALFORMED_PROTOCOL_PATTERN.match(url):
             # URL has http/ or https/ instead of http:// or https://
-            return self._get_default_features()
+            return None
         
         # Ensure URL has protocol
         if not url.startswith(('http://', 'https://')):
@@ -61,86 +240,103 @@ class URLFeatureExtractor:
             parsed = urlparse(url)
             # Validate that the parsed URL has a proper netloc (domain)
             if not parsed.netloc or not parsed.scheme:
-                return self._get_default_features()
+                return None
         except Exception:
-            return self._get_default_features()
-        
-        features = {}
+            return None
         
-        # Basic URL features
-        features['url_length'] = len(url)
-        features['domain_length'] = len(parsed.netloc) if parsed.netloc else 0
-        features['path_length'] = len(parsed.path) if parsed.path else 0
-        features['query_length'] = len(parsed.query) if parsed.query else 0
+        return url, parsed
+    
+    def _structural_features(self, url, parsed, url_entropy):
+        """
+        Compute the features derived from the parsed URL
         
-        # Protocol features
-        features['has_https'] = 1 if parsed.scheme == 'https' else 0
-        features['has_http'] = 1 if parsed.scheme == 'http' else 0
+        Args:
+            url: Normalized URL
+            parsed: urlparse() result for the URL
+            url_entropy: Shannon entropy of the URL (from its character scan)
         
+        Returns:
+            tuple: Feature values in STRUCTURAL_FEATURES order
+        """
         # Domain features
         domain = parsed.netloc.lower() if parsed.netloc else ''
-        features['subdomain_count'] = domain.count('.')
-        features['has_ip'] = self._is_ip_address(domain)
-        features['has_port'] = 1 if ':' in domain else 0
-        
-        # TLD features
         tld = self._extract_tld(domain)
-        features['tld_length'] = len(tld)
-        features['suspicious_tld'] = 1 if any(tld.endswith(stld) for stld in self.suspicious_tlds) else 0
-        
-        # Suspicious keyword features
-        url_lower = url.lower()
-        features['suspicious_keyword_count'] = sum(1 for keyword in self.suspicious_keywords if keyword in url_lower)
-        features['has_click'] = 1 if 'click' in url_lower else 0
-        features['has_verify'] = 1 if 'verify' in url_lower else 0
-        features['has_update'] = 1 if 'update' in url_lower else 0
-        features['has_account'] = 1 if 'account' in url_lower else 0
-        features['has_login'] = 1 if 'login' in url_lower else 0
-        
-        # URL structure features
-        features['special_char_count'] = sum(1 for c in url if c in '!@#$%^&*()_+-=[]{}|;:,.<>?')
-        features['digit_count'] = sum(1 for c in url if c.isdigit())
-        features['letter_count'] = sum(1 for c in url if c.isalpha())
-        features['hyphen_count'] = url.count('-')
-        features['underscore_count'] = url.count('_')
-        features['dot_count'] = url.count('.')
-        features['slash_count'] = url.count('/')
-        features['equal_count'] = url.count('=')
-        features['question_mark_count'] = url.count('?')
-        features['ampersand_count'] = url.count('&')
-        
-        # Entropy (randomness measure - higher entropy might indicate random/obfuscated URLs)
-        features['url_entropy'] = self._calculate_entropy(url)
-        features['domain_entropy'] = self._calculate_entropy(domain)
+        keyword_hits = self.keyword_matcher.count(url.lower())
         
-        # Ratio features
-        if len(url) > 0:
-            features['digit_ratio'] = features['digit_count'] / len(url)
-            features['letter_ratio'] = features['letter_count'] / len(url)
-            features['special_char_ratio'] = features['special_char_count'] / len(url)
-        else:
-            features['digit_ratio'] = 0
-            features['letter_ratio'] = 0
-            features['special_char_ratio'] = 0
-        
-        # Short URL detection (only check actual short URL services, not paths)
-        short_url_services = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'short.link', 'tiny.cc']
-        features['is_short_url'] = 1 if any(short in domain for short in short_url_services) else 0
-        
-        # Path depth
-        features['path_depth'] = parsed.path.count('/') - 1 if parsed.path else 0
-        
-        # Query parameters count
-        features['query_param_count'] = len(parsed.query.split('&')) if parsed.query else 0
-        
-        # Domain legitimacy check - check if domain matches or is a subdomain of legitimate domains
-        features['is_known_legitimate'] = 0
-        for leg_domain in self.legitimate_domains:
-            if domain == leg_domain or domain.endswith('.' + leg_domain):
-                features['is_known_legitimate'] = 1
-                break
-        
-        return features
+        return (
+            # Basic URL features
+            len(url),
+            len(parsed.netloc) if parsed.netloc else 0,
+            len(parsed.path) if parsed.path else 0,
+            len(parsed.query) if parsed.query else 0,
+            # Protocol features
+            1 if parsed.scheme == 'https' else 0,
+            1 if parsed.scheme == 'http' else 0,
+            # Domain features
+            domain.count('.'),
+            self._is_ip_address(domain),
+            1 if ':' in domain else 0,
+            # TLD features
+            len(tld),
+            1 if tld and self.suspicious_tld_index.contains(tld[1:]) else 0,
+            # Suspicious keyword features
+            keyword_hits['suspicious_keyword'],
+            1 if keyword_hits['click'] else 0,
+            1 if keyword_hits['verify'] else 0,
+            1 if keyword_hits['update'] else 0,
+            1 if keyword_hits['account'] else 0,
+            1 if keyword_hits['login'] else 0,
+            # Entropy (randomness measure - higher entropy might indicate random/obfuscated URLs)
+            url_entropy,
+            self._calculate_entropy(domain),
+            1 if self._is_short_url(domain) else 0,
+            # Path depth
+            parsed.path.count('/') - 1 if parsed.path else 0,
+            # Query parameters count
+            len(parsed.query.split('&')) if parsed.query else 0,
+            # Domain legitimacy check - domain or a parent domain is a known legitimate domain
+            1 if self.is_listed('legitimate', domain) else 0,
+        )
+    
+    def load_domain_list(self, kind, path):
+        """
+        Add a domain list loaded from a file
+        
+        Args:
+            kind: 'legitimate' (allow list), 'short_url' or 'blocked'
+            path: Index saved by domain_index.py (.npy, memory-mapped) or a
+                  text file with one domain per line
+        """
+        if kind not in self.domain_indexes:
+            raise ValueError(f"Unknown domain list kind: {kind}")
+        self.domain_indexes[kind].append(DomainIndex.load(path))
+    
+    def is_listed(self, kind, domain):
+        """Check if the domain or one of its parent domains is in a domain list"""
+        return any(index.matches(domain) for index in self.domain_indexes[kind])
+    
+    def _is_short_url(self, domain):
+        """Check if the domain belongs to a URL shortener"""
+        if any(short in domain for short in self.short_url_services):
+            return True
+        return self.is_listed('short_url', domain)
+    
+    def _count_chars(self, counts):
+        """
+        Count character classes of a URL from its character histogram
+        
+        Returns:
+            tuple: Counts in COUNT_FEATURES order
+        """
+        special_count = digit_count = letter_count = 0
+        for ch, n in counts.items():
+            if ch in SPECIAL_CHARS:
+                special_count += n
+            if ch.isdigit():
+                digit_count += n
+            if ch.isalpha():
+                letter_count += n
+        return (special_count, digit_count, letter_count) + tuple(counts[ch] for ch in _SINGLE_CHAR_COUNTS)
     
     def _is_ip_address(self, domain):
         """Check if domain is an IP address"""
@@ -159,12 +355,7 @@ class URLFeatureExtractor:
     
     def _calculate_entropy(self, string):
         """Calculate Shannon entropy of a string"""
-        if not string:
-            return 0
-        
-        prob = [float(string.count(c)) / len(string) for c in dict.fromkeys(list(string))]
-        entropy = -sum([p * math.log2(p) for p in prob if p > 0])
-        return entropy
+        return entropy_from_counts(Counter(string), len(string))
     
     def _get_default_features(self):
         """Return default feature values for invalid URLs"""
@@ -183,5 +374,5 @@ class URLFeatureExtractor:
     
     def get_feature_names(self):
         """Get list of all feature names"""
-        return list(self._get_default_features().keys())
+        return list(FEATURE_NAMES)
 
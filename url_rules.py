@@ -0,0 +1,142 @@
+"""
+URL Rules
+Cheap pre-classifier that decides clear-cut URLs without running the ensemble
+"""
+
+import re
+import threading
+
+# Rules in the order they are tried
+URL_RULES = ('malformed', 'known_legitimate', 'ip_login', 'short_url')
+
+# Confidence reported for a verdict decided by each rule
+RULE_CONFIDENCE = {
+    'malformed': 0.99,
+    'known_legitimate': 0.99,
+    'ip_login': 0.97,
+    'short_url': 0.9,
+}
+
+# Path or query words that make a raw-IP URL a credential-phishing page
+LOGIN_PATH_PATTERN = re.compile(r'log-?[io]n|sign-?in|auth|passw|verify|account|banking', re.IGNORECASE)
+
+RULE_MODES = ('off', 'audit', 'on')
+
+
+class URLRuleClassifier:
+    """
+    Decide URLs that need no model: malformed URLs, exact hits in the known
+    legitimate domain index, raw IP hosts with a login path and links on
+    known URL shorteners
+
+    In audit mode the rules are evaluated but the model still scores every
+    URL and its verdict is returned; the counters record how often each rule
+    fired and how often it agreed with the model, so a rule can be checked
+    on real traffic before it is trusted.
+    """
+
+    def __init__(self, extractor, rules=URL_RULES, audit=False):
+        """
+        Args:
+            extractor: URLFeatureExtractor whose domain lists the rules use
+            rules: Names of the enabled rules (subset of URL_RULES)
+            audit: Only record rule verdicts, always return the model's
+        """
+        unknown = set(rules) - set(URL_RULES)
+        if unknown:
+            raise ValueError(f"Unknown URL rules: {', '.join(sorted(unknown))}")
+        self.extractor = extractor
+        self.rules = tuple(rule for rule in URL_RULES if rule in rules)
+        self.audit = audit
+        self._short_url_services = frozenset(extractor.short_url_services)
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.fired = dict.fromkeys(self.rules, 0)
+        self.audited = dict.fromkeys(self.rules, 0)
+        self.agreed = dict.fromkeys(self.rules, 0)
+
+    def classify(self, url):
+        """
+        Apply the rules to one URL
+
+        Returns:
+            tuple: (rule name, detection result), or None if no rule decides the URL
+        """
+        decision = self._decide(url)
+        with self._lock:
+            self.checked += 1
+            if decision is not None:
+                self.fired[decision[0]] += 1
+        return decision
+
+    def _decide(self, url):
+        normalized = self.extractor._normalize_url(url)
+        if normalized is None:
+            if 'malformed' in self.rules:
+                return 'malformed', self._result(url, True, 'malformed', [
+                    "[ERROR] Invalid or malformed URL format detected. Please check the URL and try again."
+                ])
+            return None
+
+        _, parsed = normalized
+        try:
+            host = (parsed.hostname or '').rstrip('.')
+        except ValueError:
+            return None
+        if host.startswith('www.'):
+            host = host[4:]
+
+        # User info ('https://bank.com@evil.example') is a classic disguise; leave it to the model
+        if 'known_legitimate' in self.rules and '@' not in parsed.netloc and any(
+                index.contains(host) for index in self.extractor.domain_indexes['legitimate']):
+            return 'known_legitimate', self._result(url, False, 'known_legitimate', [
+                "[OK] Domain is from a known legitimate source."
+            ])
+
+        if ('ip_login' in self.rules and self.extractor._is_ip_address(host)
+                and LOGIN_PATH_PATTERN.search(f'{parsed.path}?{parsed.query}')):
+            return 'ip_login', self._result(url, True, 'ip_login', [
+                "[WARNING] Uses an IP address instead of a domain name, which is unusual and suspicious.",
+                "[WARNING] Asks for a login or account details on a raw IP address.",
+            ])
+
+        if 'short_url' in self.rules and (host in self._short_url_services
+                                          or self.extractor.is_listed('short_url', host)):
+            return 'short_url', self._result(url, True, 'short_url', [
+                "[WARNING] Contains a URL shortener (bit.ly, tinyurl, etc.) which can hide malicious destinations."
+            ])
+        return None
+
+    def _result(self, url, is_fake, rule, reasons):
+        confidence = RULE_CONFIDENCE[rule]
+        verdict = "FAKE" if is_fake else "LEGITIMATE"
+        return {
+            'is_fake': is_fake,
+            'confidence': confidence,
+            'reasons': [f"Detected as {verdict} with {confidence:.1%} confidence."] + reasons,
+            'url': url
+        }
+
+    def record_audit(self, rule, rule_result, model_result):
+        """Count whether a rule's verdict matched the model's"""
+        with self._lock:
+            self.audited[rule] += 1
+            if rule_result['is_fake'] == model_result['is_fake']:
+                self.agreed[rule] += 1
+
+    def stats(self):
+        """How often each rule fired and, in audit mode, how often it agreed with the model"""
+        with self._lock:
+            return {
+                'mode': 'audit' if self.audit else 'on',
+                'checked': self.checked,
+                'rules': {
+                    rule: {
+                        'fired': self.fired[rule],
+                        'audited': self.audited[rule],
+                        'agreed': self.agreed[rule],
+                        'agreement': self.agreed[rule] / self.audited[rule] if self.audited[rule] else None,
+                    }
+                    for rule in self.rules
+                },
+            }
@@ -0,0 +1,81 @@
+"""
+Verdict Cache
+Bounded LRU + TTL cache for detection verdicts of repeated inputs
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerdictCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live"""
+
+    def __init__(self, max_size=10000, ttl_seconds=600, clock=time.monotonic):
+        """
+        Args:
+            max_size: Maximum number of cached verdicts (least recently used are evicted)
+            ttl_seconds: Seconds a verdict stays valid after it was stored
+            clock: Time source, returns seconds (monotonic by default)
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached verdict (e.g. after models are reloaded)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
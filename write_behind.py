@@ -0,0 +1,168 @@
+"""
+Write-behind queue for detection logging.
+Rows are buffered in memory and written in batches by a background thread.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue drained by a writer thread in batches by size or time.
+
+    The writer thread starts with the first row, in the process that submits
+    it, so a queue created before a server forks works in every worker.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Any]], None],
+        max_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+    ) -> None:
+        """
+        Args:
+            write_batch: Called from the writer thread with a list of rows
+            max_size: Rows buffered before new rows are dropped
+            batch_size: Maximum rows per write_batch call
+            flush_interval: Seconds a row may wait for its batch to fill up
+        """
+        if max_size < 1 or batch_size < 1:
+            raise ValueError("max_size and batch_size must be at least 1")
+        self._write_batch = write_batch
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._pending = 0
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error: Optional[str] = None
+
+    def _ensure_thread(self) -> None:
+        # Called with the lock held; rows queued by a parent process are its own to write
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._pending = 0
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._queue,), name="detection-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, row: Any) -> bool:
+        """Queue a row without blocking; returns False if it was dropped."""
+        with self._lock:
+            if not self._closed:
+                self._ensure_thread()
+                try:
+                    self._queue.put_nowait(row)
+                except queue.Full:
+                    pass
+                else:
+                    self._pending += 1
+                    self.enqueued += 1
+                    return True
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; returns False if the timeout ran out first."""
+        with self._lock:
+            if not self._pending or self._pid != os.getpid():
+                return True
+            pending_queue = self._queue
+        if not self._closed:
+            try:
+                pending_queue.put_nowait(_FLUSH)
+            except queue.Full:
+                pass  # a full queue is written in whole batches without being asked
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting rows, write the queued ones and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._pid != os.getpid():
+                return
+            pending_queue, thread = self._queue, self._thread
+        pending_queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Queue depth and row counters."""
+        with self._lock:
+            return {
+                "queue_depth": self._pending,
+                "max_size": self.max_size,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_error": self.last_error,
+            }
+
+    def _run(self, pending_queue: queue.Queue) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = pending_queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    if item is _FLUSH:
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = pending_queue.get(timeout=remaining)
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            self._write_batch(batch)
+        except Exception as exc:  # keep the writer alive; the rows are counted as failed
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = repr(exc)
+        else:
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        with self._lock:
+            self._pending -= len(batch)
+            if not self._pending:
+                self._idle.notify_all()